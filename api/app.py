@@ -0,0 +1,156 @@
+"""案件検索の JSON API（ASGI）。Streamlit を通さず、案件カタログと同じ条件で検索できる。
+
+    python -m api.app --port 8510        # 標準ライブラリのHTTPサーバで起動（ローカル確認用）
+    uvicorn api.app:app --port 8510      # ASGIサーバがあればそちらで
+
+    GET /v1/opportunities?region=東京&need_level=A&headcount_min=2&keyword=python&limit=50
+    GET /v1/opportunities?region=東京&...&cursor=<前の応答の next_cursor>
+    GET /healthz
+
+Authorization: Bearer <HC_API_ADMIN_TOKEN> のときだけ社名・企業IDを返す（それ以外は派遣会社扱い）。
+応答には ETag を付け、If-None-Match が一致すれば 304 を返す。
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import sys
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from api.search import BadRequest, etag_matches, parse_query, search
+from data.bootstrap import ensure_db
+from data.db import DB_PATH
+
+ADMIN_TOKEN_ENV = "HC_API_ADMIN_TOKEN"
+SEARCH_PATH = "/v1/opportunities"
+JSON_TYPE = "application/json; charset=utf-8"
+# 応答は Authorization（社名を出すか）で変わるため、共有キャッシュには載せない
+CACHE_HEADERS = [("cache-control", "private, no-cache"), ("vary", "Authorization")]
+
+
+def caller_role(authorization: str) -> str:
+    token = os.environ.get(ADMIN_TOKEN_ENV, "")
+    if token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return "Admin"
+    return "Agency"
+
+
+def _json(status: int, payload: dict, headers=()) -> tuple:
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    return status, [("content-type", JSON_TYPE), *headers], body
+
+
+def _error(status: int, code: str, message: str, headers=()) -> tuple:
+    return _json(status, {"error": code, "message": message}, headers)
+
+
+# =============================================================================
+# Request handling (HTTPサーバに依存しない)
+# =============================================================================
+def handle(method: str, path: str, query_string: str, headers: dict, db_path: str = DB_PATH) -> tuple:
+    """1リクエストを処理して (ステータス, ヘッダのリスト, 本文) を返す。headers のキーは小文字。"""
+    if path == "/healthz":
+        return _json(200, {"status": "ok"})
+    if path != SEARCH_PATH:
+        return _error(404, "not_found", f"{path} はありません。")
+    if method not in ("GET", "HEAD"):
+        return _error(405, "method_not_allowed", "GET のみ使えます。", [("allow", "GET, HEAD")])
+    try:
+        ensure_db(db_path)
+        q = parse_query(query_string, caller_role(headers.get("authorization", "")))
+        body, etag = search(q, db_path)
+    except BadRequest as e:
+        return _error(400, "bad_request", str(e))
+    except Exception:
+        traceback.print_exc()
+        return _error(500, "internal_error", "検索できませんでした。時間をおいて再度お試しください。")
+    validators = [("etag", etag), *CACHE_HEADERS]
+    if etag_matches(headers.get("if-none-match", ""), etag):
+        return 304, validators, b""
+    return 200, [("content-type", JSON_TYPE), *validators], body
+
+
+# =============================================================================
+# ASGI
+# =============================================================================
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await asyncio.to_thread(ensure_db, DB_PATH)
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    # SQLite の読み出しはブロックするため、イベントループの外（スレッド）で処理する
+    status, out_headers, body = await asyncio.to_thread(
+        handle, scope["method"], scope["path"], scope.get("query_string", b"").decode("utf-8", "replace"), headers,
+    )
+    out_headers = [*out_headers, ("content-length", str(len(body)))]
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in out_headers],
+    })
+    await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+# =============================================================================
+# Local server (標準ライブラリのみ。ASGIサーバが無い環境での確認用)
+# =============================================================================
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _serve(self):
+        url = urlsplit(self.path)
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        status, out_headers, body = handle(self.command, url.path, url.query, headers)
+        self.send_response(status)
+        for k, v in out_headers:
+            self.send_header(k, v)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = _serve
+
+    def log_message(self, fmt, *args):
+        sys.stderr.write(f"{self.address_string()} {fmt % args}\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="案件検索 JSON API（ローカル起動）")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8510)
+    args = ap.parse_args(argv)
+    ensure_db(DB_PATH)
+    server = ThreadingHTTPServer((args.host, args.port), _Handler)
+    print(f"listening on http://{args.host}:{args.port}{SEARCH_PATH}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
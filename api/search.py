@@ -0,0 +1,217 @@
+"""案件検索APIの中身（HTTPに依存しない部分）。
+
+クエリ文字列を正規化して CatalogFilter にし、案件カタログと同じ検索条件・並び順で
+1ページ分をJSONにする。ページ送りは直前ページ末尾の (rank, rowid) を詰めた cursor で行う。
+
+応答は正規化したクエリをキーにプロセス内のLRUに持ち、データ版（opportunities / companies /
+pricing の table_versions と日付）が変わるまで SQLite を読まずに返す。版の確認自体も
+VERSION_TTL 秒に1回にまとめるため、同じ検索の繰り返しは SQLite に触れない。
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+from dataclasses import astuple, dataclass
+from datetime import date
+from urllib.parse import parse_qsl
+
+from data.cache import VersionedCache, table_versions
+from data.catalog import ALL, CATALOG_TABLES, PAGE_SIZE, CatalogFilter, count_catalog, search_catalog_after
+from data.db import DB_PATH
+from data.facets import structured_count
+from data.pricing import current_pricing, price_columns
+from data.resources import process_resource
+
+MAX_LIMIT = 200
+MAX_KEYWORD = 200
+VERSION_TTL = 1.0  # データ版を確認し直すまでの秒数（この間の更新は最大この秒数遅れて反映）
+RESPONSE_TABLES = CATALOG_TABLES + ("pricing",)
+QUERY_PARAMS = ("region", "industry", "need_level", "headcount_min", "keyword", "limit", "cursor")
+
+# 派遣会社には社名を出さない（画面の mosaic_html と同じ扱い。APIでは文字列ごと伏せる）
+MASKED_COMPANY = "●●●●"
+AGENCY_HIDDEN_COLUMNS = ("company_id",)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SearchQuery:
+    filter: CatalogFilter
+    role: str = "Agency"
+    limit: int = PAGE_SIZE
+    cursor: str = ""
+
+    @property
+    def key(self) -> tuple:
+        return ("search", self.role, self.filter, self.limit, self.cursor)
+
+
+# =============================================================================
+# Query normalization
+# =============================================================================
+def _facet(value: str) -> str:
+    value = value.strip()
+    return value if value else ALL
+
+
+def _int(params: dict, name: str, default: int, lo: int, hi: int = None) -> int:
+    raw = params.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise BadRequest(f"{name} は整数で指定してください。") from None
+    if value < lo:
+        raise BadRequest(f"{name} は {lo} 以上で指定してください。")
+    if hi is not None and value > hi:
+        raise BadRequest(f"{name} は {hi} 以下で指定してください。")
+    return value
+
+
+def parse_query(query_string: str, role: str = "Agency") -> SearchQuery:
+    """クエリ文字列を正規化する。同じ条件なら書き方（順序・空白・大文字小文字）によらず同じキーになる。"""
+    params = {}
+    for name, value in parse_qsl(query_string, keep_blank_values=True):
+        if name not in QUERY_PARAMS:
+            raise BadRequest(f"不明なパラメータです: {name}")
+        if name in params:
+            raise BadRequest(f"パラメータが重複しています: {name}")
+        params[name] = value
+    keyword = " ".join(params.get("keyword", "").lower().split())
+    if len(keyword) > MAX_KEYWORD:
+        raise BadRequest(f"keyword は{MAX_KEYWORD}文字以内で指定してください。")
+    f = CatalogFilter(
+        region=_facet(params.get("region", "")),
+        industry=_facet(params.get("industry", "")),
+        need_level=_facet(params.get("need_level", "")),
+        headcount_min=_int(params, "headcount_min", 0, 0),
+        keyword=keyword,
+    )
+    return SearchQuery(f, role, _int(params, "limit", PAGE_SIZE, 1, MAX_LIMIT), params.get("cursor", "").strip())
+
+
+# =============================================================================
+# Cursor (検索条件の指紋 + 直前ページ末尾の (rank, rowid))
+# =============================================================================
+def _fingerprint(f: CatalogFilter) -> str:
+    return hashlib.blake2b(json.dumps(astuple(f), ensure_ascii=False).encode(), digest_size=6).hexdigest()
+
+
+def encode_cursor(f: CatalogFilter, after: tuple) -> str:
+    raw = json.dumps([_fingerprint(f), *after]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(f: CatalogFilter, cursor: str):
+    if not cursor:
+        return None
+    try:
+        fp, rank, rowid = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        after = (None if rank is None else float(rank), int(rowid))
+    except (ValueError, TypeError):
+        raise BadRequest("cursor が不正です。") from None
+    if fp != _fingerprint(f):
+        raise BadRequest("cursor は同じ検索条件で使ってください。")
+    return after
+
+
+# =============================================================================
+# Rendering
+# =============================================================================
+def echo_filter(f: CatalogFilter) -> dict:
+    """応答に載せる検索条件。指定のない絞り込み（内部の「すべて」・空のキーワード）は null にする。"""
+    return {
+        "region": None if f.region == ALL else f.region,
+        "industry": None if f.industry == ALL else f.industry,
+        "need_level": None if f.need_level == ALL else f.need_level,
+        "headcount_min": f.headcount_min,
+        "keyword": f.keyword or None,
+    }
+
+
+def render(q: SearchQuery, path: str = DB_PATH) -> bytes:
+    f = q.filter
+    view, next_after = search_catalog_after(f, decode_cursor(f, q.cursor), q.limit, path)
+    pricing = current_pricing(path)
+    view = view.assign(fee=price_columns(view["need_level"], pricing)["fee"].astype("Int64").to_numpy())
+    if q.role != "Admin":
+        view = view.drop(columns=list(AGENCY_HIDDEN_COLUMNS))
+        view["company_name"] = view["company_name"].where(view["company_name"].isna(), MASKED_COMPANY)
+    total = count_catalog(f, path) if f.keyword else structured_count(f, path)
+    body = {
+        "query": {**echo_filter(f), "limit": q.limit},
+        "total": total,
+        "count": len(view),
+        "items": json.loads(view.to_json(orient="records", force_ascii=False)),
+        "next_cursor": encode_cursor(f, next_after) if next_after is not None else None,
+        "pricing_version": pricing.version,
+    }
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match（カンマ区切り・弱いETag W/ も可）に etag が含まれるか。"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+# =============================================================================
+# Response cache
+# =============================================================================
+class VersionProbe:
+    """tables のデータ版を ttl 秒だけ覚えておく（その間は table_versions を読まない）。"""
+
+    def __init__(self, tables, ttl: float = VERSION_TTL):
+        self.tables = tuple(tables)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._checked = {}  # path -> (確認した時刻, 版)
+        self.reads = 0
+
+    def current(self, path: str = DB_PATH) -> tuple:
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(path)
+            if checked is not None and now - checked[0] < self.ttl:
+                return checked[1]
+        # 料金は適用開始日で切り替わるため、日付も版に含める
+        version = (table_versions(self.tables, path), date.today().isoformat())
+        with self._lock:
+            self._checked[path] = (now, version)
+            self.reads += 1
+        return version
+
+
+@process_resource
+def get_version_probe() -> VersionProbe:
+    return VersionProbe(RESPONSE_TABLES)
+
+
+@process_resource
+def get_response_cache() -> VersionedCache:
+    return VersionedCache(max_bytes=64 * 1024 * 1024, max_entries=4096)
+
+
+def search(q: SearchQuery, path: str = DB_PATH) -> tuple:
+    """(JSONの本文, ETag)。同じクエリ・同じデータ版なら前回の応答をそのまま返す。"""
+    def load():
+        body = render(q, path)
+        return body, make_etag(body)
+
+    version = get_version_probe().current(path)
+    return get_response_cache().get_or_load((path, q.key), version, load)
+
+
+def stats() -> dict:
+    return {"cache": get_response_cache().stats(), "version_reads": get_version_probe().reads}
@@ -0,0 +1,264 @@
+"""アプリの主要処理をStreamlitサーバなしで計測するベンチマーク。
+
+    python -m data.synthetic --opportunities 1000000 --db data/bench.db
+    python -m benchmarks.hot_paths --db data/bench.db --out bench.json
+
+各シナリオの p50/p95/平均レイテンシ（ms）と tracemalloc のピークメモリを
+JSONで出力する。バージョン間の比較は --label を変えて出力を並べる。
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime
+from urllib.parse import urlencode
+
+from api.app import handle
+from api.search import get_response_cache
+from data import writer
+from data.cache import get_cache
+from data.catalog import ALL, CatalogFilter, count_catalog, search_catalog
+from data.db import fetch_all, fetch_one
+from data.pricing import current_pricing
+from data.summary import connection_totals, connections_by, rank_counts, recent_connections
+from data.synthetic import BENCH_DB_PATH, INDUSTRIES, NEED_LEVELS, REGIONS, generate
+from ui.cards import build_card_html
+
+KEYWORDS = ["フォークリフト", "ピッキング", "組立・検査", "経験不問", "3交替", "清掃", "夜勤 経験必須"]
+
+
+# =============================================================================
+# Measurement
+# =============================================================================
+def percentile(sorted_ms: list, q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    k = min(len(sorted_ms) - 1, max(0, int(round(q * (len(sorted_ms) - 1)))))
+    return sorted_ms[k]
+
+
+def summarize(samples_ms: list) -> dict:
+    s = sorted(samples_ms)
+    return {
+        "n": len(s),
+        "p50_ms": round(percentile(s, 0.50), 3),
+        "p95_ms": round(percentile(s, 0.95), 3),
+        "mean_ms": round(sum(s) / len(s), 3) if s else 0.0,
+        "max_ms": round(s[-1], 3) if s else 0.0,
+    }
+
+
+def measure(fn, iterations: int, setup=None) -> dict:
+    samples = []
+    for i in range(iterations):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    # ピークメモリは計時とは別に1回だけ測る（tracemallocの分だけ遅くなるため）
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn(iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = summarize(samples)
+    result["peak_alloc_mb"] = round(peak / 1e6, 3)
+    return result
+
+
+# =============================================================================
+# Scenarios
+# =============================================================================
+def random_filter(rng: random.Random, keyword: str = "") -> CatalogFilter:
+    return CatalogFilter(
+        region=rng.choice([ALL] + list(REGIONS)),
+        industry=rng.choice([ALL, ALL] + list(INDUSTRIES)),
+        need_level=rng.choice([ALL] + list(NEED_LEVELS)),
+        headcount_min=rng.choice([0, 0, 2, 5]),
+        keyword=keyword,
+    )
+
+
+def bench_catalog_filter(path: str, iterations: int, rng: random.Random, cold: bool) -> dict:
+    filters = [random_filter(rng) for _ in range(iterations + 1)]
+
+    def run(i):
+        count_catalog(filters[i], path)
+        search_catalog(filters[i], path=path)
+
+    return measure(run, iterations, setup=get_cache().clear if cold else None)
+
+
+def bench_catalog_keyword(path: str, iterations: int, rng: random.Random) -> dict:
+    filters = [CatalogFilter(keyword=rng.choice(KEYWORDS)) for _ in range(iterations + 1)]
+
+    def run(i):
+        count_catalog(filters[i], path)
+        search_catalog(filters[i], path=path)
+
+    return measure(run, iterations, setup=get_cache().clear)
+
+
+def bench_dashboard(path: str, iterations: int) -> dict:
+    def run(i):
+        rank_counts(path)
+        connection_totals(path)
+        for dim in ("status", "agency", "day"):
+            connections_by(dim, path)
+        recent_connections(0, path=path)
+
+    return measure(run, iterations)
+
+
+def bench_render_prep(path: str, iterations: int, rng: random.Random) -> dict:
+    filters = [random_filter(rng) for _ in range(iterations + 1)]
+    pricing = current_pricing(path)
+
+    def run(i):
+        view = search_catalog(filters[i], path=path)
+        build_card_html(view, "Agency", pricing)
+
+    return measure(run, iterations, setup=get_cache().clear)
+
+
+def bench_api_search(path: str, iterations: int, rng: random.Random, cold: bool) -> dict:
+    """検索APIの1リクエスト（正規化・検索・JSON化・ETag）。warm は同じクエリの繰り返し。"""
+    queries = [
+        urlencode({k: v for k, v in asdict(random_filter(rng)).items() if v not in (ALL, 0, "")})
+        for _ in range(iterations + 1)
+    ]
+
+    def run(i):
+        handle("GET", "/v1/opportunities", queries[i if cold else 0], {}, path)
+
+    def clear():
+        get_cache().clear()
+        get_response_cache().clear()
+
+    return measure(run, iterations, setup=clear if cold else None)
+
+
+def bench_insert_connection(path: str, total: int, threads: int) -> dict:
+    """threads 本のスレッドから同時に申請を書き込み、1件ごとの完了待ち時間を測る。"""
+    per_thread = max(1, total // threads)
+    samples, lock = [], threading.Lock()
+    agency = fetch_one("SELECT agency_id FROM agencies LIMIT 1", path=path)
+    agency = agency[0] if agency else None
+    # 申請中の組は1行までなので（idx_con_open_pair）、まだ申請していない案件に1件ずつ書く
+    opps = iter([r[0] for r in fetch_all(
+        "SELECT opportunity_id FROM opportunities WHERE opportunity_id NOT IN ("
+        "SELECT opportunity_id FROM connections WHERE agency_id = ? AND status IN ('requested', 'approved')) "
+        "LIMIT ?",
+        (agency, per_thread * threads), path,
+    )])
+    row = {
+        "agency_id": agency,
+        "status": "requested",
+        "fee_amount": 50000,
+        "incentive_amount": None,
+        "notes": "bench",
+    }
+    errors = []
+
+    def worker():
+        local = []
+        for _ in range(per_thread):
+            with lock:
+                opp = next(opps, None)
+            new = dict(row, connection_id=writer.new_connection_id(), timestamp=datetime.utcnow().isoformat(),
+                       opportunity_id=opp)
+            t0 = time.perf_counter()
+            try:
+                writer.insert("connections", new, path)
+            except Exception as e:
+                errors.append(repr(e))
+            local.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            samples.extend(local)
+
+    t0 = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    result = summarize(samples)
+    result.update(
+        threads=threads,
+        writes_per_sec=round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        errors=len(errors),
+        writer=writer.get_writer(path).stats(),
+    )
+    return result
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+def table_counts(path: str) -> dict:
+    return {
+        t: fetch_one(f"SELECT COUNT(*) FROM {t}", path=path)[0]
+        for t in ("opportunities", "companies", "agencies", "connections")
+    }
+
+
+def run_all(path: str, iterations: int = 50, inserts: int = 2000, threads: int = 8,
+            seed: int = 0, label: str = "") -> dict:
+    rng = random.Random(seed)
+    results = {
+        "catalog_filter_cold": bench_catalog_filter(path, iterations, rng, cold=True),
+        "catalog_filter_warm": bench_catalog_filter(path, iterations, random.Random(seed), cold=False),
+        "catalog_keyword": bench_catalog_keyword(path, iterations, rng),
+        "dashboard": bench_dashboard(path, iterations),
+        "render_prep": bench_render_prep(path, iterations, rng),
+        "api_search_cold": bench_api_search(path, iterations, rng, cold=True),
+        "api_search_warm": bench_api_search(path, iterations, rng, cold=False),
+        "insert_connection": bench_insert_connection(path, inserts, threads),
+    }
+    return {
+        "label": label,
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "rows": table_counts(path),
+        "iterations": iterations,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="主要処理のヘッドレス・ベンチマーク")
+    ap.add_argument("--db", default=BENCH_DB_PATH)
+    ap.add_argument("--generate", type=int, default=0, help="指定件数の合成案件を先に生成する")
+    ap.add_argument("--iterations", type=int, default=50)
+    ap.add_argument("--inserts", type=int, default=2000)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--label", default="")
+    ap.add_argument("--out", default=None, help="JSONの出力先（省略時は標準出力）")
+    args = ap.parse_args(argv)
+    if args.generate:
+        generate(args.db, opportunities=args.generate, seed=args.seed, log=lambda m: print(m, file=sys.stderr))
+    report = run_all(args.db, args.iterations, args.inserts, args.threads, args.seed, args.label)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""派遣会社から案件へのアプローチ申請（重複防止と派遣会社ごとの流量制限）。
+
+同じ派遣会社・案件の申請中／承認済みの組は部分一意索引 idx_con_open_pair で1行に限る
+（data/init_db.py）。画面ではプロセス内に持つ組の一覧で「申請済み」を出し、カードごとに
+問い合わせない。一覧は change_log で他プロセスの書き込みにも追従する。
+"""
+import math
+import sqlite3
+import threading
+import time
+
+from data import db, writer
+from data.changes import changes_since, chunked, latest_seq
+from data.db import DB_PATH
+from data.init_db import OPEN_STATUSES
+from data.resources import process_resource
+
+# 派遣会社ごとに 1分あたり RATE_PER_MINUTE 件、連続 BURST 件まで
+RATE_PER_MINUTE = 20
+BURST = 5
+
+# 部分索引の条件と一致させるため、ステータスはバインド変数にせずSQLに直接書く
+_OPEN = ", ".join(f"'{s}'" for s in OPEN_STATUSES)
+
+
+class DuplicateApproach(ValueError):
+    pass
+
+
+class RateLimited(RuntimeError):
+    def __init__(self, retry_after: float):
+        # 端数は切り上げる（「0秒」と出さない）
+        super().__init__(f"申請が集中しています。{max(1, math.ceil(retry_after))}秒ほど待ってから再度お試しください。")
+        self.retry_after = retry_after
+
+
+# =============================================================================
+# Rate limiting (token bucket)
+# =============================================================================
+class TokenBucket:
+    """キーごとのトークンバケット。1件ごとに1トークンを使い、毎秒 rate ずつ capacity まで戻る。"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, 最後に補充した時刻)
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self, key) -> float:
+        """使えれば 0、足りなければ次の1トークンまでの秒数を返す（そのときは消費しない）。"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            if tokens >= 1.0:
+                self._buckets[key] = (tokens - 1.0, now)
+                self.allowed += 1
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            self.limited += 1
+            return (1.0 - tokens) / self.rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._buckets), "allowed": self.allowed, "limited": self.limited}
+
+
+@process_resource
+def get_rate_limiter() -> TokenBucket:
+    return TokenBucket(RATE_PER_MINUTE / 60.0, BURST)
+
+
+# =============================================================================
+# Open pairs (派遣会社 → 申請中・承認済みの案件ID)
+# =============================================================================
+class OpenPairs:
+    """派遣会社ごとの申請中・承認済みの案件ID。派遣会社は初めて引かれたときに読み込む。
+
+    以降は change_log の connections の変更だけを読み直して追従する。
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seq = None
+        self._agencies = {}  # agency_id -> set(opportunity_id)
+        self._by_id = {}     # connection_id -> (agency_id, opportunity_id)
+
+    def applied(self, agency_id, opportunity_ids) -> set:
+        """opportunity_ids のうち、agency_id が申請中・承認済みのもの。"""
+        with self._lock:
+            self._sync()
+            if agency_id not in self._agencies:
+                self._load(agency_id)
+            pairs = self._agencies[agency_id]
+            return {o for o in opportunity_ids if o in pairs}
+
+    def add(self, connection_id: str, agency_id, opportunity_id):
+        """自プロセスで書いた申請を、change_log を待たずに反映する。"""
+        with self._lock:
+            if agency_id in self._agencies:
+                self._agencies[agency_id].add(opportunity_id)
+                self._by_id[connection_id] = (agency_id, opportunity_id)
+
+    def _load(self, agency_id):
+        rows = db.fetch_all(
+            f"SELECT connection_id, opportunity_id FROM connections "
+            f"WHERE agency_id = ? AND status IN ({_OPEN})",
+            (agency_id,), self.path,
+        )
+        self._agencies[agency_id] = {opp for _, opp in rows}
+        self._by_id.update((cid, (agency_id, opp)) for cid, opp in rows)
+
+    def _sync(self):
+        if self._seq is None:
+            self._seq = latest_seq(self.path)
+            return
+        changes = changes_since(self._seq, ("connections",), self.path)
+        if changes is None:
+            # 追いつけない（履歴の削除・DBの作り直し）→ 読み込み済みの派遣会社を捨てて読み直す
+            self._agencies.clear()
+            self._by_id.clear()
+            self._seq = latest_seq(self.path)
+            return
+        keys = changes.get("connections")
+        if keys and self._agencies:
+            current = {}
+            for chunk in chunked(keys):
+                current.update((r[0], r[1:]) for r in db.fetch_all(
+                    f"SELECT connection_id, agency_id, opportunity_id, status FROM connections "
+                    f"WHERE connection_id IN ({','.join('?' * len(chunk))})",
+                    chunk, self.path,
+                ))
+            for cid in keys:
+                old = self._by_id.pop(cid, None)
+                if old is not None:
+                    self._agencies[old[0]].discard(old[1])
+                row = current.get(cid)
+                if row is not None and row[2] in OPEN_STATUSES and row[0] in self._agencies:
+                    self._agencies[row[0]].add(row[1])
+                    self._by_id[cid] = (row[0], row[1])
+        self._seq = changes.upto
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"agencies": len(self._agencies), "pairs": len(self._by_id), "seq": self._seq}
+
+
+@process_resource
+def get_open_pairs(path: str = DB_PATH) -> OpenPairs:
+    return OpenPairs(path)
+
+
+# =============================================================================
+# Write path
+# =============================================================================
+def submit_approach(row: dict, path: str = DB_PATH) -> int:
+    """connections に申請を1行追加する。重複なら DuplicateApproach、流量超過なら RateLimited。"""
+    agency_id, opportunity_id = row["agency_id"], row["opportunity_id"]
+    pairs = get_open_pairs(path)
+    if pairs.applied(agency_id, (opportunity_id,)):
+        raise DuplicateApproach("この案件にはすでに申請済みです。")
+    wait = get_rate_limiter().take(agency_id)
+    if wait:
+        raise RateLimited(wait)
+    try:
+        n = writer.insert("connections", row, path)
+    except sqlite3.IntegrityError as e:
+        # 画面表示後に他のセッション・プロセスが同じ組を申請していた
+        if "agency_id" not in str(e):
+            raise
+        raise DuplicateApproach("この案件にはすでに申請済みです。") from e
+    pairs.add(row["connection_id"], agency_id, opportunity_id)
+    return n
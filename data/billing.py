@@ -0,0 +1,185 @@
+"""月次の請求（派遣会社ごとのご紹介料金）と支払（企業ごとの奨励金）の締め処理。
+
+    python -m data.billing 2026-10
+    python -m data.billing --workers 4          # 未締めの分がある全ての月
+
+接続済みになった申請はトリガで billing_events に追記される（data/init_db.py）。
+締め処理は前回の締め位置（settlements.watermark）より後のイベントだけを fetchmany で
+少しずつ読み、集計結果を invoices / payouts に加算して締め位置と同じトランザクションで
+コミットする。再実行しても同じイベントが二重に計上されることはない。
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+
+from data.db import DB_PATH, open_connection
+from data.init_db import init_db
+
+CHUNK_SIZE = 50000
+EVENT_COLUMNS = ["agency_id", "company_id", "n", "fee", "incentive"]
+
+
+class SettlementConflict(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class SettlementResult:
+    period: str
+    events: int
+    watermark: int
+    agencies: int
+    companies: int
+    seconds: float
+
+
+# =============================================================================
+# Aggregation (1プロセス分。派遣会社IDの範囲 [lo, hi) で分割できる)
+# =============================================================================
+def aggregate_events(path: str, period: str, after: int, upto: int, lo: str = None, hi: str = None,
+                     chunk_size: int = CHUNK_SIZE) -> tuple:
+    """(派遣会社別 [n, fee], 企業別 [n, incentive], 件数) を返す。
+
+    読みながらチャンク単位で集計するため、メモリは派遣会社数・企業数とチャンクサイズにしか比例しない。
+    """
+    # seq（rowid）の範囲を順に読む。期間・派遣会社は索引を使わせず（+列）行ごとに絞り込む方が、
+    # 索引から本体を1行ずつ引くより速い（対象は前回の締め位置以降の追記分だけ）。
+    clauses, params = ["seq > ?", "seq <= ?", "+period = ?"], [after, upto, period]
+    if lo is not None:
+        clauses.append("+agency_id >= ?")
+        params.append(lo)
+    if hi is not None:
+        clauses.append("+agency_id < ?")
+        params.append(hi)
+    conn = open_connection(path)
+    try:
+        cur = conn.execute(
+            f"SELECT {', '.join(EVENT_COLUMNS)} FROM billing_events WHERE {' AND '.join(clauses)}", params,
+        )
+        fees = pd.DataFrame(columns=["n", "fee"], dtype="int64")
+        incentives = pd.DataFrame(columns=["n", "incentive"], dtype="int64")
+        events = 0
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = pd.DataFrame.from_records(rows, columns=EVENT_COLUMNS)
+            fees = fees.add(chunk.groupby("agency_id")[["n", "fee"]].sum(), fill_value=0)
+            incentives = incentives.add(chunk.groupby("company_id")[["n", "incentive"]].sum(), fill_value=0)
+            events += len(rows)
+    finally:
+        conn.close()
+    return fees, incentives, events
+
+
+def _partition_bounds(conn, period: str, after: int, upto: int, workers: int) -> list:
+    """対象イベントの派遣会社IDを workers 個の連続した範囲に分ける。"""
+    agencies = [r[0] for r in conn.execute(
+        "SELECT DISTINCT agency_id FROM billing_events WHERE period = ? AND seq > ? AND seq <= ? ORDER BY agency_id",
+        (period, after, upto),
+    ).fetchall()]
+    if len(agencies) < 2 or workers < 2:
+        return [(None, None)]
+    step = -(-len(agencies) // workers)
+    starts = agencies[::step]
+    return [(lo, starts[i + 1] if i + 1 < len(starts) else None) for i, lo in enumerate(starts)]
+
+
+# =============================================================================
+# Settlement
+# =============================================================================
+def settle(period: str, workers: int = 1, chunk_size: int = CHUNK_SIZE, path: str = DB_PATH) -> SettlementResult:
+    t0 = time.perf_counter()
+    conn = open_connection(path)
+    conn.isolation_level = None
+    try:
+        row = conn.execute("SELECT watermark FROM settlements WHERE period = ?", (period,)).fetchone()
+        after = row[0] if row else 0
+        # 締めの上限を先に決めておき、集計中に増えたイベントは次回に回す
+        upto = conn.execute("SELECT coalesce(MAX(seq), 0) FROM billing_events").fetchone()[0]
+        if upto <= after:
+            return SettlementResult(period, 0, after, 0, 0, time.perf_counter() - t0)
+
+        bounds = _partition_bounds(conn, period, after, upto, workers)
+        if len(bounds) == 1:
+            parts = [aggregate_events(path, period, after, upto, chunk_size=chunk_size)]
+        else:
+            with ProcessPoolExecutor(max_workers=len(bounds)) as ex:
+                parts = list(ex.map(
+                    aggregate_events,
+                    *zip(*[(path, period, after, upto, lo, hi, chunk_size) for lo, hi in bounds]),
+                ))
+        fees = pd.concat([p[0] for p in parts]).groupby(level=0).sum()
+        incentives = pd.concat([p[1] for p in parts]).groupby(level=0).sum()
+        events = sum(p[2] for p in parts)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO settlements (period) VALUES (?)", (period,))
+            moved = conn.execute(
+                "UPDATE settlements SET watermark = ?, events = events + ?, runs = runs + 1, "
+                "updated_at = strftime('%Y-%m-%dT%H:%M:%S', 'now') WHERE period = ? AND watermark = ?",
+                (upto, events, period, after),
+            ).rowcount
+            if not moved:
+                raise SettlementConflict(f"{period} は別の締め処理が先に進めました。再実行してください。")
+            conn.executemany(
+                "INSERT INTO invoices (period, agency_id, connections, fee_total, updated_at) "
+                "VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%S', 'now')) "
+                "ON CONFLICT (period, agency_id) DO UPDATE SET connections = connections + excluded.connections, "
+                "fee_total = fee_total + excluded.fee_total, updated_at = excluded.updated_at",
+                [(period, a, int(r.n), int(r.fee)) for a, r in fees.iterrows()],
+            )
+            conn.executemany(
+                "INSERT INTO payouts (period, company_id, connections, incentive_total, updated_at) "
+                "VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%S', 'now')) "
+                "ON CONFLICT (period, company_id) DO UPDATE SET connections = connections + excluded.connections, "
+                "incentive_total = incentive_total + excluded.incentive_total, updated_at = excluded.updated_at",
+                [(period, c, int(r.n), int(r.incentive)) for c, r in incentives.iterrows()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return SettlementResult(period, events, upto, len(fees), len(incentives), time.perf_counter() - t0)
+
+
+def pending_periods(path: str = DB_PATH) -> list:
+    conn = open_connection(path)
+    try:
+        return [r[0] for r in conn.execute(
+            "SELECT e.period FROM billing_events e LEFT JOIN settlements s ON s.period = e.period "
+            "GROUP BY e.period HAVING MAX(e.seq) > coalesce(MAX(s.watermark), 0) ORDER BY e.period"
+        ).fetchall()]
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="月次の請求・奨励金支払を締める")
+    ap.add_argument("period", nargs="?", help="YYYY-MM（省略時は未締めの分がある全ての月）")
+    ap.add_argument("--workers", type=int, default=1, help="派遣会社で分割して並列に集計するプロセス数")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args(argv)
+    init_db(args.db)
+    periods = [args.period] if args.period else pending_periods(args.db)
+    for period in periods:
+        try:
+            r = settle(period, args.workers, args.chunk_size, args.db)
+        except SettlementConflict as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+        print(f"{r.period}: {r.events:,} events → 請求 {r.agencies:,}社 / 支払 {r.companies:,}社 "
+              f"（締め位置 {r.watermark:,}, {r.seconds:.2f}s）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+"""案件・企業・派遣会社などをCSV/JSONLから一括取り込みするCLI。
+
+    python -m data.bulk_import opportunities exports/opportunities.csv
+    python -m data.bulk_import companies data/companies.csv --ignore-unknown
+
+- ファイルはチャンク単位で読み込み、主キーでUPSERTするため再実行しても結果は同じ。
+- コミットごとにチェックポイント（<file>.<table>.checkpoint.json）を書き、
+  中断後の再実行は続きの行から再開する。
+- 取り込み中に外す二次索引・全文索引の同期トリガは外す前にチェックポイントへ記録する。
+  途中でプロセスが落ちても、次の実行（再開・--restart とも）の最後に作り直す。
+"""
+import argparse
+import functools
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+from data.db import DB_PATH, open_connection
+from data.init_db import FTS_REBUILDS, OPEN_PAIR_DEDUPE, init_db, migrate, split_statements
+
+IMPORTABLE_TABLES = ("opportunities", "companies", "agencies", "connections")
+
+# 取り込み用接続だけに適用する（fsyncを省き、ページキャッシュを大きく取る）
+BULK_PRAGMAS = (
+    ("synchronous", "OFF"),
+    ("cache_size", -262144),
+    ("temp_store", "MEMORY"),
+)
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+# =============================================================================
+# Schema
+# =============================================================================
+def table_columns(conn, table: str) -> tuple:
+    """init_db のスキーマから {列名: 型} と主キー列を返す。"""
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = {row[1]: row[2].upper() for row in info}
+    pk = [row[1] for row in sorted(info, key=lambda r: r[5]) if row[5]]
+    return columns, pk
+
+
+def validate_columns(found, columns: dict, pk: list, ignore_unknown: bool) -> list:
+    missing = [c for c in pk if c not in found]
+    if missing:
+        raise BulkImportError(f"主キー列がありません: {', '.join(missing)}")
+    unknown = [c for c in found if c not in columns]
+    if unknown and not ignore_unknown:
+        raise BulkImportError(
+            f"スキーマにない列があります: {', '.join(unknown)}（--ignore-unknown で無視できます）"
+        )
+    return [c for c in found if c in columns]
+
+
+def upsert_sql(table: str, cols: list, pk: list) -> str:
+    placeholders = ",".join(["?"] * len(cols))
+    updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c not in pk)
+    action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+    return (
+        f"INSERT INTO {table} ({','.join(cols)}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({','.join(pk)}) {action}"
+    )
+
+
+# =============================================================================
+# Secondary indexes
+# =============================================================================
+def secondary_indexes(conn, table: str) -> dict:
+    # 主キー等の自動索引（sql IS NULL）は除き、CREATE INDEX で作った索引だけ {名前: DDL} で返す
+    return dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+        (table,),
+    ).fetchall())
+
+
+def drop_secondary_indexes(conn, table: str) -> list:
+    indexes = secondary_indexes(conn, table)
+    for name in indexes:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    return list(indexes.values())
+
+
+# 一意索引は取り込み中は外れているため、作り直す前に索引に反する行を整える
+# （申請中・承認済みの重複申請は1行を残して却下にする）
+REBUILD_FIXUPS = {"connections": OPEN_PAIR_DEDUPE}
+
+
+def rebuild_indexes(conn, index_sql: list, table: str = None):
+    if index_sql and table in REBUILD_FIXUPS:
+        conn.execute(REBUILD_FIXUPS[table])
+    for sql in index_sql:
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+
+
+# 全文索引（opportunities_fts / opportunities_bigram）は行単位のトリガ更新だと大量投入時に
+# 極端に遅いため、取り込み中は同期トリガを外し、最後に作り直す
+FTS_TRIGGERS = {"opportunities": ("opportunities_fts", "opportunities_bigram")}
+
+
+def fts_triggers(conn, table: str) -> dict:
+    triggers = {}
+    for fts in FTS_TRIGGERS.get(table, ()):
+        triggers.update(conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name=? AND name LIKE ?",
+            (table, f"{fts}_%"),
+        ).fetchall())
+    return triggers
+
+
+def suspend_fts_sync(conn, table: str) -> list:
+    triggers = fts_triggers(conn, table)
+    for name in triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    return list(triggers.values())
+
+
+def resume_fts_sync(conn, table: str, trigger_sql: list):
+    if not trigger_sql:
+        return
+    for sql in trigger_sql:
+        conn.execute(sql)
+    for fts in FTS_TRIGGERS[table]:
+        for stmt in split_statements(FTS_REBUILDS[fts]):
+            conn.execute(stmt)
+
+
+# =============================================================================
+# Suspended schema (取り込み中に外した索引・トリガ)
+# =============================================================================
+@functools.lru_cache(maxsize=None)
+def schema_objects(table: str) -> dict:
+    """init_db のスキーマで table に付くはずの二次索引・同期トリガ（空のメモリDBに流して調べる）。"""
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    try:
+        migrate(conn)
+        return {"indexes": secondary_indexes(conn, table), "triggers": fts_triggers(conn, table)}
+    finally:
+        conn.close()
+
+
+def missing_schema(conn, table: str, recorded: dict = None) -> dict:
+    """DBに無い二次索引・同期トリガの {"indexes": {名前: DDL}, "triggers": {...}}。
+
+    前回の取り込みが索引を外したまま落ちた場合に残る。DDLはチェックポイントの記録
+    （recorded）を優先し、記録の無いものは init_db のスキーマから補う。
+    """
+    present = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE tbl_name=?", (table,))}
+    missing = {}
+    for kind, expected in schema_objects(table).items():
+        wanted = {**expected, **(recorded or {}).get(kind, {})}
+        missing[kind] = {name: sql for name, sql in wanted.items() if name not in present}
+    return missing
+
+
+def restore_schema(conn, table: str, suspended: dict):
+    rebuild_indexes(conn, list(suspended["indexes"].values()), table)
+    resume_fts_sync(conn, table, list(suspended["triggers"].values()))
+
+
+# =============================================================================
+# Reading
+# =============================================================================
+def detect_format(path: str) -> str:
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_chunks(path: str, fmt: str, chunk_size: int, skip_rows: int, text_columns: list):
+    if fmt == "jsonl":
+        offset = 0
+        for chunk in pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False):
+            start, offset = offset, offset + len(chunk)
+            if offset > skip_rows:
+                yield chunk.iloc[max(0, skip_rows - start):]
+        return
+    dtype = {c: "string" for c in text_columns}
+    yield from pd.read_csv(
+        path, chunksize=chunk_size, dtype=dtype,
+        skiprows=range(1, skip_rows + 1) if skip_rows else None,
+    )
+
+
+def to_rows(chunk: pd.DataFrame, cols: list) -> list:
+    frame = chunk[cols].astype(object)
+    frame = frame.where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+
+# =============================================================================
+# Checkpoint
+# =============================================================================
+def checkpoint_path(path: str, table: str) -> str:
+    return f"{path}.{table}.checkpoint.json"
+
+
+def file_fingerprint(path: str) -> dict:
+    st_ = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st_.st_size, "mtime_ns": st_.st_mtime_ns}
+
+
+def load_checkpoint(cp_path: str, fingerprint: dict) -> dict:
+    cp = {}
+    if os.path.exists(cp_path):
+        with open(cp_path, encoding="utf-8") as f:
+            cp = json.load(f)
+        if cp.get("file") == fingerprint:
+            return cp
+    # ファイルが差し替わっていたら最初からやり直す（外したままの索引の記録は引き継ぐ）
+    fresh = {"file": fingerprint, "rows_done": 0, "completed": False}
+    if cp.get("suspended"):
+        fresh["suspended"] = cp["suspended"]
+    return fresh
+
+
+def save_checkpoint(cp_path: str, cp: dict):
+    tmp = f"{cp_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cp, f, ensure_ascii=False)
+    os.replace(tmp, cp_path)
+
+
+# =============================================================================
+# Import
+# =============================================================================
+def bulk_import(table: str, path: str, fmt: str = None, chunk_size: int = 50000,
+                commit_every: int = 4, rebuild: bool = True, ignore_unknown: bool = False,
+                restart: bool = False, db_path: str = DB_PATH, log=print) -> dict:
+    if table not in IMPORTABLE_TABLES:
+        raise BulkImportError(f"取り込み対象外のテーブルです: {table}")
+    fmt = fmt or detect_format(path)
+    init_db(db_path)
+
+    cp_path = checkpoint_path(path, table)
+    cp = load_checkpoint(cp_path, file_fingerprint(path))
+    if restart:
+        cp.update(rows_done=0, completed=False)
+
+    conn = open_connection(db_path)
+    conn.isolation_level = None
+    for name, value in BULK_PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    # 前回の取り込みが落ちて外れたままの索引・トリガは、今回の最後に作り直す
+    suspended = missing_schema(conn, table, cp.get("suspended"))
+    if any(suspended.values()):
+        names = [*suspended["indexes"], *suspended["triggers"]]
+        log(f"  前回の中断で外れたままの索引・トリガがあります（{', '.join(names)}）。最後に作り直します")
+    elif cp["completed"]:
+        conn.close()
+        log(f"{path}: 取り込み済みです（--restart で最初から再実行）")
+        return {"rows": 0, "seconds": 0.0, "rows_per_sec": 0.0, "skipped": True}
+    columns, pk = table_columns(conn, table)
+    text_columns = [c for c, t in columns.items() if t == "TEXT"]
+
+    if rebuild and not cp["completed"]:
+        conn.execute("BEGIN IMMEDIATE")
+        suspended = {
+            "indexes": {**suspended["indexes"], **secondary_indexes(conn, table)},
+            "triggers": {**suspended["triggers"], **fts_triggers(conn, table)},
+        }
+        # 外す前に記録する（記録より先に落ちても、DBにはまだ索引が残っている）
+        cp["suspended"] = suspended
+        save_checkpoint(cp_path, cp)
+        drop_secondary_indexes(conn, table)
+        suspend_fts_sync(conn, table)
+        conn.execute("COMMIT")
+
+    started = time.perf_counter()
+    resume_from = cp["rows_done"]
+    rows_total, pending_chunks, sql, cols = 0, 0, None, None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for chunk in read_chunks(path, fmt, chunk_size, cp["rows_done"], text_columns):
+            if sql is None:
+                cols = validate_columns(list(chunk.columns), columns, pk, ignore_unknown)
+                sql = upsert_sql(table, cols, pk)
+            t0 = time.perf_counter()
+            conn.executemany(sql, to_rows(chunk, cols))
+            rows_total += len(chunk)
+            pending_chunks += 1
+            if pending_chunks >= commit_every:
+                conn.execute("COMMIT")
+                cp["rows_done"] = resume_from + rows_total
+                save_checkpoint(cp_path, cp)
+                pending_chunks = 0
+                conn.execute("BEGIN IMMEDIATE")
+            dt = time.perf_counter() - t0
+            log(f"  {rows_total:,} rows  ({len(chunk) / dt if dt else 0:,.0f} rows/sec)")
+        conn.execute("COMMIT")
+        cp["rows_done"] = resume_from + rows_total
+        cp["completed"] = True
+        save_checkpoint(cp_path, cp)
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        if any(suspended.values()):
+            t0 = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            restore_schema(conn, table, suspended)
+            conn.execute("COMMIT")
+            cp.pop("suspended", None)
+            save_checkpoint(cp_path, cp)
+            log(f"  索引を再作成しました（{len(suspended['indexes'])}件, {time.perf_counter() - t0:.1f}s）")
+        conn.close()
+
+    seconds = time.perf_counter() - started
+    rate = rows_total / seconds if seconds else 0.0
+    log(f"{table}: {rows_total:,} rows in {seconds:.1f}s ({rate:,.0f} rows/sec)")
+    return {"rows": rows_total, "seconds": seconds, "rows_per_sec": rate, "skipped": False}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="CSV/JSONL を SQLite に一括取り込みする")
+    ap.add_argument("table", choices=IMPORTABLE_TABLES)
+    ap.add_argument("path")
+    ap.add_argument("--format", choices=("csv", "jsonl"), default=None)
+    ap.add_argument("--chunk-size", type=int, default=50000)
+    ap.add_argument("--commit-every", type=int, default=4, help="何チャンクごとにコミットするか")
+    ap.add_argument("--keep-indexes", action="store_true", help="二次索引を落とさずに取り込む")
+    ap.add_argument("--ignore-unknown", action="store_true", help="スキーマにない列を無視する")
+    ap.add_argument("--restart", action="store_true", help="チェックポイントを無視して最初から取り込む")
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args(argv)
+    try:
+        bulk_import(
+            args.table, args.path, fmt=args.format, chunk_size=args.chunk_size,
+            commit_every=args.commit_every, rebuild=not args.keep_indexes,
+            ignore_unknown=args.ignore_unknown, restart=args.restart, db_path=args.db,
+        )
+    except BulkImportError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
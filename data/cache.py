@@ -0,0 +1,133 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from data import db
+from data.db import DB_PATH
+from data.init_db import VERSIONED_TABLES
+from data.resources import process_resource
+
+# =============================================================================
+# Data versions
+# =============================================================================
+# 各テーブルの変更カウンタ（table_versions）はトリガで更新されるため、
+# insert_connection() に限らず、どの経路の書き込みでも版が上がる。
+def table_versions(tables, path: str = DB_PATH) -> tuple:
+    tables = tuple(tables)
+    marks = ",".join(["?"] * len(tables))
+    rows = dict(db.fetch_all(
+        f"SELECT table_name, version FROM table_versions WHERE table_name IN ({marks})",
+        tables, path,
+    ))
+    return tuple(rows.get(t, 0) for t in tables)
+
+
+def file_version(path: str) -> tuple:
+    try:
+        st_ = os.stat(path)
+    except FileNotFoundError:
+        return (0, 0)
+    return (st_.st_mtime_ns, st_.st_size)
+
+
+# =============================================================================
+# Cache
+# =============================================================================
+def _sizeof(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class VersionedCache:
+    """データ版をキーに持つLRUキャッシュ（容量・件数の上限つき）。
+
+    値は全セッションで共有されるため、呼び出し側で書き換えないこと。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 512):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[object, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, version, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = loader()
+        self._put(key, version, value)
+        return value
+
+    def _put(self, key, version, value):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (version, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+@process_resource
+def get_cache() -> VersionedCache:
+    return VersionedCache()
+
+
+# =============================================================================
+# Cached reads
+# =============================================================================
+def cached(key, tables, loader, path: str = DB_PATH):
+    """tables のいずれかが更新されるまで loader() の結果を再利用する。"""
+    version = table_versions(tables, path)
+    return get_cache().get_or_load((path, key), version, loader)
+
+
+def cached_read_df(sql: str, params=(), tables=VERSIONED_TABLES, path: str = DB_PATH) -> pd.DataFrame:
+    params = tuple(params)
+    return cached(("df", sql, params), tables, lambda: db.read_df(sql, params, path), path)
+
+
+def cached_read_table(table: str, path: str = DB_PATH) -> pd.DataFrame:
+    return cached_read_df(f"SELECT * FROM {table}", (), (table,), path)
+
+
+def cached_read_csv(csv_path: str) -> pd.DataFrame:
+    return get_cache().get_or_load(("csv", csv_path), file_version(csv_path), lambda: pd.read_csv(csv_path))
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from itertools import product
+
+import pandas as pd
+
+from data import db
+from data.cache import cached, cached_read_df
+from data.db import DB_PATH
+
+ALL = "すべて"
+CATALOG_TABLES = ("opportunities", "companies")
+PAGE_SIZE = 50
+
+CATALOG_COLUMNS = (
+    "o.opportunity_id, o.company_id, o.region, o.industry, o.need_level, "
+    "o.role, o.headcount_needed, o.requirements, c.company_name"
+)
+
+
+@dataclass(frozen=True)
+class CatalogFilter:
+    region: str = ALL
+    industry: str = ALL
+    need_level: str = ALL
+    headcount_min: int = 0
+    keyword: str = ""
+
+
+# trigramトークナイザは3文字未満の語を索引できないため、短い語は2文字索引
+# （opportunities_bigram）で候補を絞り、部分一致で確かめる
+FTS_MIN_TERM = 3
+
+
+def fts_phrase(term: str) -> str:
+    # FTS5のクエリ構文（AND/OR/NEAR/括弧/*など）として解釈させないよう必ず引用する
+    return '"' + term.replace('"', '""') + '"'
+
+
+def bigram_phrase(term: str) -> str:
+    # 2文字索引の語は2文字（末尾は1文字）なので、1文字の語はそれで始まる語の前方一致にする
+    return fts_phrase(term) + ("*" if len(term) == 1 else "")
+
+
+def case_variants(term: str) -> list:
+    """短い語を lower(列) と突き合わせるための綴りの一覧。
+
+    SQLite の lower() は ASCII しか小文字にしないため、ASCII 以外の文字（全角英字・アクセント付き
+    文字など）は大文字・小文字の組み合わせをすべて並べる（2文字以下なので最大4通り）。
+    """
+    return sorted({"".join(chars) for chars in product(*[
+        (c.lower(),) if c.isascii() else (c.lower(), c.upper()) for c in term
+    ])})
+
+
+def split_keyword(keyword: str) -> tuple:
+    terms = keyword.strip().lower().split()
+    long_terms = [t for t in terms if len(t) >= FTS_MIN_TERM]
+    short_terms = [t for t in terms if len(t) < FTS_MIN_TERM]
+    return long_terms, short_terms
+
+
+def build_where(f: CatalogFilter) -> tuple:
+    """フィルタ値からJOIN句・WHERE句とパラメータを組み立てる（値はすべてバインド変数）。
+
+    キーワードは空白区切りのAND検索。3文字以上の語は全文索引 opportunities_fts、
+    2文字以下の語は2文字索引 opportunities_bigram で引く（記号を含む短い語だけは部分一致のみ）。
+    戻り値の ranked が True のときは f.rank（bm25）で並べられる。
+    """
+    joins, clauses, params = "", [], []
+    long_terms, short_terms = split_keyword(f.keyword)
+    if long_terms:
+        joins = "JOIN opportunities_fts f ON f.rowid = o.rowid "
+        clauses.append("opportunities_fts MATCH ?")
+        params.append(" ".join(fts_phrase(t) for t in long_terms))
+    # 等価条件は複合インデックス idx_opp_filter の並び順に合わせる
+    if f.region != ALL:
+        clauses.append("o.region = ?")
+        params.append(f.region)
+    if f.industry != ALL:
+        clauses.append("o.industry = ?")
+        params.append(f.industry)
+    if f.need_level != ALL:
+        clauses.append("o.need_level = ?")
+        params.append(f.need_level)
+    clauses.append("o.headcount_needed >= ?")
+    params.append(int(f.headcount_min))
+    # unicode61 は英数字・かな漢字だけを語にするため、記号を含む語は索引で引けない
+    indexed = [t for t in short_terms if t.isalnum()]
+    if indexed:
+        clauses.append(
+            "o.rowid IN (SELECT rowid FROM opportunities_bigram WHERE opportunities_bigram MATCH ?)"
+        )
+        params.append(" ".join(bigram_phrase(t) for t in indexed))
+    for t in short_terms:
+        # 2文字索引は大文字小文字・アクセント記号の違いも一致させるため、候補を部分一致で確かめる。
+        # instr はLIKE/正規表現と違いメタ文字を解釈しない
+        variants = case_variants(t)
+        clauses.append("(" + " OR ".join(
+            ["instr(lower(o.role), ?) > 0 OR instr(lower(o.requirements), ?) > 0"] * len(variants)
+        ) + ")")
+        params.extend(v for v in variants for _ in range(2))
+    return joins, " AND ".join(clauses), params, bool(long_terms)
+
+
+def keyword_rowids(keyword: str, path: str = DB_PATH) -> list:
+    """キーワードに一致する opportunities の rowid（3文字以上の語だけなら全文索引のみで引く）。"""
+    long_terms, short_terms = split_keyword(keyword)
+    if long_terms and not short_terms:
+        sql = "SELECT rowid FROM opportunities_fts WHERE opportunities_fts MATCH ?"
+        params = [" ".join(fts_phrase(t) for t in long_terms)]
+    else:
+        joins, where, params, _ = build_where(CatalogFilter(keyword=keyword))
+        sql = f"SELECT o.rowid FROM opportunities o {joins}WHERE {where}"
+    return [r[0] for r in db.fetch_all(sql, params, path)]
+
+
+def build_catalog_query(f: CatalogFilter, limit: int = PAGE_SIZE, offset: int = 0) -> tuple:
+    joins, where, params, ranked = build_where(f)
+    order = "f.rank, o.rowid" if ranked else "o.rowid"
+    sql = (
+        f"SELECT {CATALOG_COLUMNS} FROM opportunities o {joins}"
+        f"LEFT JOIN companies c ON c.company_id = o.company_id "
+        f"WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?"
+    )
+    return sql, params + [int(limit), int(offset)]
+
+
+def search_catalog_after(f: CatalogFilter, after: tuple = None, page_size: int = PAGE_SIZE,
+                         path: str = DB_PATH) -> tuple:
+    """after = 直前ページ末尾の (rank, rowid) より後の案件を page_size 件返す（キーセット方式）。
+
+    並び順は search_catalog と同じ。全文検索を使わないときの rank は None。
+    戻り値は (DataFrame, 次ページの after または None)。
+    """
+    joins, where, params, ranked = build_where(f)
+    if after is not None:
+        if ranked:
+            where += " AND (f.rank, o.rowid) > (?, ?)"
+            params.extend(after)
+        else:
+            where += " AND o.rowid > ?"
+            params.append(after[1])
+    df = db.read_df(
+        f"SELECT {CATALOG_COLUMNS}, {'f.rank' if ranked else 'NULL'} AS _rank, o.rowid AS _rowid "
+        f"FROM opportunities o {joins}"
+        f"LEFT JOIN companies c ON c.company_id = o.company_id "
+        f"WHERE {where} ORDER BY {'f.rank, o.rowid' if ranked else 'o.rowid'} LIMIT ?",
+        (*params, int(page_size) + 1),
+        path,
+    )
+    next_after = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_after = (None if pd.isna(last["_rank"]) else float(last["_rank"]), int(last["_rowid"]))
+    return df.drop(columns=["_rank", "_rowid"]), next_after
+
+
+def count_catalog(f: CatalogFilter, path: str = DB_PATH) -> int:
+    joins, where, params, _ = build_where(f)
+    sql = f"SELECT COUNT(*) FROM opportunities o {joins}WHERE {where}"
+    return cached(("count", sql, tuple(params)), CATALOG_TABLES,
+                  lambda: int(db.fetch_one(sql, params, path)[0]), path)
+
+
+def search_catalog(f: CatalogFilter, page: int = 0, page_size: int = PAGE_SIZE,
+                   path: str = DB_PATH) -> pd.DataFrame:
+    sql, params = build_catalog_query(f, limit=page_size, offset=page * page_size)
+    return cached_read_df(sql, params, CATALOG_TABLES, path)
+
+
+def distinct_values(column: str, path: str = DB_PATH) -> list:
+    sql = f"SELECT DISTINCT {column} FROM opportunities WHERE {column} IS NOT NULL ORDER BY {column}"
+    return cached(("distinct", column), ("opportunities",),
+                  lambda: [r[0] for r in db.fetch_all(sql, path=path)], path)
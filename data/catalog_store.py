@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data import db
+from data.catalog import CATALOG_COLUMNS, CATALOG_TABLES
+from data.changes import changes_since, chunked, latest_seq
+from data.db import DB_PATH
+from data.init_db import database_id
+from data.resources import process_resource
+
+CATEGORY_COLUMNS = ("region", "industry", "need_level", "company_name")
+VERSION_KEY = b"hc_catalog_seq"
+SOURCE_KEY = b"hc_catalog_source"
+# 列の形式を変えたら上げる（古い形式のスナップショットは作り直す。2: 人数のNULLを -1 に）
+SNAPSHOT_FORMAT = 2
+# 前回のスナップショット以降に反映した行数がこれを超えたら書き直す（新しいプロセスの追いつき分を抑える）
+COMPACT_ROWS = 10000
+
+
+# =============================================================================
+# Columnar form
+# =============================================================================
+# 人数がNULLの案件は opp_facet_counts と同じく -1 にする（「人数下限」のどの値にも一致しない。
+# SQL の headcount_needed >= ? と同じ件数になる）
+MISSING_HEADCOUNT = -1
+
+
+def headcount_column(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s, errors="coerce").fillna(MISSING_HEADCOUNT).astype("int32")
+
+
+def to_columnar(df: pd.DataFrame) -> pd.DataFrame:
+    """案件⋈企業の結合結果を省メモリな列型に変換する。
+
+    地域・業種・ランク・社名はカテゴリ型（値は辞書に1回だけ保持）、人数は int32（NULL は -1）。
+    rowid は全文索引の検索結果と突き合わせるために保持する（昇順）。
+    """
+    out = df.copy()
+    for col in CATEGORY_COLUMNS:
+        out[col] = out[col].astype("category")
+    out["headcount_needed"] = headcount_column(out["headcount_needed"])
+    return out
+
+
+CATALOG_SELECT = (
+    f"SELECT o.rowid AS rowid, {CATALOG_COLUMNS} FROM opportunities o "
+    f"LEFT JOIN companies c ON c.company_id = o.company_id"
+)
+
+
+def read_catalog(path: str = DB_PATH) -> pd.DataFrame:
+    return to_columnar(db.read_df(f"{CATALOG_SELECT} ORDER BY o.rowid", path=path))
+
+
+def read_catalog_rows(opportunity_ids, company_ids, path: str = DB_PATH) -> pd.DataFrame:
+    """変更のあった案件と、変更のあった企業に属する案件の現在の行（削除済みの案件は含まない）。"""
+    parts = [
+        db.read_df(f"{CATALOG_SELECT} WHERE o.{col} IN ({','.join('?' * len(chunk))})", chunk, path)
+        for col, keys in (("opportunity_id", opportunity_ids), ("company_id", company_ids))
+        for chunk in chunked(keys)
+    ]
+    if not parts:
+        return db.read_df(f"{CATALOG_SELECT} WHERE 0", path=path)
+    return pd.concat(parts, ignore_index=True).drop_duplicates("rowid")
+
+
+def merge_rows(frame: pd.DataFrame, fresh: pd.DataFrame, gone=()) -> pd.DataFrame:
+    """frame の同じ rowid の行を fresh で置き換え、新しい行は rowid 順の位置に差し込む。
+
+    gone は変更・削除された案件ID。frame にあるその案件の行は rowid によらずすべて外す
+    （削除して同じIDで入れ直した案件は rowid が変わるため）。現在の行は fresh から入る。
+    全体を並べ直さず、列ごとに「残す行」と「差し込む行」の位置へ1回書き込むだけで作る。
+    カテゴリは既存の辞書に新しい値を足すだけなので、既存行のコードは振り直さない。
+    """
+    rowids = frame["rowid"].to_numpy()
+    fresh = fresh.sort_values("rowid", ignore_index=True)
+    fresh_ids = fresh["rowid"].to_numpy(dtype=rowids.dtype)
+    pos = np.searchsorted(rowids, fresh_ids)
+    hit = pos < len(rowids)
+    hit[hit] = rowids[pos[hit]] == fresh_ids[hit]
+    drop = np.zeros(len(rowids), dtype=bool)
+    drop[pos[hit]] = True
+    if len(gone):
+        drop |= frame["opportunity_id"].isin(list(gone)).to_numpy()
+
+    keep = np.flatnonzero(~drop)
+    n = len(keep) + len(fresh)
+    slots = np.searchsorted(rowids[keep], fresh_ids) + np.arange(len(fresh))
+    kept = np.ones(n, dtype=bool)
+    kept[slots] = False
+    fresh["headcount_needed"] = headcount_column(fresh["headcount_needed"])
+
+    out = {}
+    for col in frame.columns:
+        if col in CATEGORY_COLUMNS:
+            old = frame[col].cat
+            cats = old.categories
+            cats = cats.append(pd.Index(fresh[col].dropna().unique()).difference(cats))
+            codes = np.empty(n, dtype=np.int32)
+            codes[kept] = old.codes.to_numpy()[keep]
+            codes[slots] = pd.Categorical(fresh[col], categories=cats).codes
+            values = pd.Categorical.from_codes(codes, categories=cats)
+            if (np.bincount(codes[codes >= 0], minlength=len(cats)) == 0).any():
+                values = values.remove_unused_categories()
+        else:
+            src = frame[col].to_numpy()
+            values = np.empty(n, dtype=src.dtype)
+            values[kept] = src[keep]
+            values[slots] = fresh[col].to_numpy(dtype=src.dtype)
+        out[col] = values
+    return pd.DataFrame(out, copy=False)
+
+
+# =============================================================================
+# Arrow snapshot (IPC file, 非圧縮なのでmmapでそのまま読める)
+# =============================================================================
+def snapshot_path_for(path: str = DB_PATH) -> str:
+    """DBごとのスナップショットのパス（data/haken_connect.db → data/haken_connect.catalog.arrow）。"""
+    return os.path.splitext(path)[0] + ".catalog.arrow"
+
+
+def snapshot_source(path: str = DB_PATH) -> dict:
+    """スナップショットの元になったDBと列の形式。同じパスに作り直したDBは db_id で、複製したDBはパスで見分ける。"""
+    return {"db_id": database_id(path), "path": os.path.abspath(path), "format": SNAPSHOT_FORMAT}
+
+
+def write_snapshot(df: pd.DataFrame, seq: int, source: dict, snapshot_path: str):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[VERSION_KEY] = json.dumps(int(seq)).encode()
+    meta[SOURCE_KEY] = json.dumps(source, sort_keys=True).encode()
+    table = table.replace_schema_metadata(meta)
+    tmp = f"{snapshot_path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as w:
+            w.write_table(table)
+    os.replace(tmp, snapshot_path)  # 読み手が書きかけのファイルを開かないよう差し替える
+
+
+def read_snapshot(snapshot_path: str):
+    if not os.path.exists(snapshot_path):
+        return None
+    # memory_map で開くので、ファイルを読み込み用のバッファに一度コピーすることはない
+    source = pa.memory_map(snapshot_path, "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def snapshot_frame(table) -> pd.DataFrame:
+    """スナップショットを DataFrame にする。変換した列から Arrow 側を手放すので、
+    変換後にプロセスに残るのは DataFrame の1つ分だけ（table はこの後使えない）。
+    """
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+
+def snapshot_seq(table) -> int:
+    raw = (table.schema.metadata or {}).get(VERSION_KEY)
+    return json.loads(raw) if raw else None
+
+
+def snapshot_matches(table, source: dict) -> bool:
+    raw = (table.schema.metadata or {}).get(SOURCE_KEY)
+    return raw is not None and json.loads(raw) == source
+
+
+# =============================================================================
+# Store
+# =============================================================================
+class CatalogStore:
+    """プロセスで1つだけ保持する案件カタログ（全セッションで共有、書き換え禁止）。
+
+    DataFrame はプロセスごとに1つ持つ（プロセス間では共有しない）。スナップショットは
+    起動時に全件をSQLで読み直さずに済ませるためのもの。起動時はスナップショットを読み、以降は change_log の締め位置（seq）より後に変わった
+    案件・企業の行だけを読み直して差し替える。スナップショットは別のDB（作り直した・複製した
+    DBを含む）から作ったものなら使わずに作り直す。差し替えのたびに新しい DataFrame を作るので、
+    表示中のセッションが持っている frame() の戻り値が途中で変わることはない。
+    """
+
+    def __init__(self, path: str = DB_PATH, snapshot_path: str = None, compact_rows: int = COMPACT_ROWS):
+        self.path = path
+        self.snapshot_path = snapshot_path or snapshot_path_for(path)
+        self.compact_rows = compact_rows
+        self._lock = threading.Lock()
+        self._seq = None
+        self._source = None
+        self._pending = 0  # スナップショット以降に反映した行数
+        self._frame = None
+        self.syncs = 0
+        self.synced_rows = 0
+        self.last_sync_ms = 0.0
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            if self._frame is None:
+                self._load()
+            else:
+                self._sync()
+            return self._frame
+
+    def _write_snapshot(self, df: pd.DataFrame, seq: int):
+        write_snapshot(df, seq, self._source, self.snapshot_path)
+
+    def _load(self):
+        self._source = snapshot_source(self.path)
+        seq = latest_seq(self.path)
+        table = read_snapshot(self.snapshot_path)
+        base = snapshot_seq(table) if table is not None else None
+        if not isinstance(base, int) or base > seq or not snapshot_matches(table, self._source):
+            # 変更履歴の位置を先に取ってから全件を読む（読み込み中の変更は次回の同期で再反映される）
+            self._write_snapshot(read_catalog(self.path), seq)
+            table, base = read_snapshot(self.snapshot_path), seq
+        self._frame = snapshot_frame(table)
+        self._seq = base
+        self._pending = 0
+        self._sync()
+
+    def _sync(self):
+        t0 = time.perf_counter()
+        changes = changes_since(self._seq, CATALOG_TABLES, self.path)
+        if changes is None:
+            # 締め位置より前の履歴が削除された → スナップショットごと作り直す
+            self._write_snapshot(read_catalog(self.path), latest_seq(self.path))
+            self._frame = None
+            return self._load()
+        if changes:
+            opps, companies = changes.get("opportunities"), changes.get("companies")
+            fresh = read_catalog_rows(opps, companies, self.path)
+            self._frame = merge_rows(self._frame, fresh, gone=opps)
+            self._pending += len(fresh) + len(opps)
+            self.syncs += 1
+            self.synced_rows += len(fresh)
+            self.last_sync_ms = round((time.perf_counter() - t0) * 1000, 2)
+        self._seq = changes.upto
+        if self._pending > self.compact_rows:
+            self._write_snapshot(self._frame, self._seq)
+            self._pending = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._frame is not None
+
+    def categories(self, column: str) -> list:
+        return sorted(self.frame()[column].cat.categories.tolist())
+
+    def stats(self) -> dict:
+        df = self.frame()
+        return {
+            "rows": len(df),
+            "frame_bytes": int(df.memory_usage(index=True, deep=True).sum()),
+            "snapshot_bytes": os.path.getsize(self.snapshot_path) if os.path.exists(self.snapshot_path) else 0,
+            "seq": self._seq,
+            "pending": self._pending,
+            "syncs": self.syncs,
+            "synced_rows": self.synced_rows,
+            "last_sync_ms": self.last_sync_ms,
+        }
+
+
+@process_resource
+def get_catalog_store(path: str = DB_PATH, snapshot_path: str = None) -> CatalogStore:
+    return CatalogStore(path, snapshot_path)
@@ -0,0 +1,104 @@
+"""変更履歴（change_log）を読んで、プロセス内の列データを差分だけ追いつかせる。
+
+    python -m data.changes --prune-days 7       # 古い変更履歴を削除する
+
+change_log は opportunities / companies / agencies / connections の追加・更新・削除ごとに
+トリガで1行追記される（data/init_db.py）。各プロセスは読み込み済みの seq（締め位置）を
+持ち、それより後に変わった行のキーだけを取り出す。同じキーが何度変わっても、読み直すのは
+最新の1行だけで済む。
+"""
+import argparse
+import sys
+from dataclasses import dataclass, field
+
+from data import db
+from data.db import DB_PATH
+from data.init_db import CHANGE_KEYS, init_db
+
+IN_CHUNK = 500
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    since: int
+    upto: int
+    keys: dict = field(default_factory=dict)  # テーブル名 -> 変わった行のキー（set）
+    rows: int = 0  # 読んだ change_log の行数
+
+    def __bool__(self) -> bool:
+        return any(self.keys.values())
+
+    def get(self, table: str) -> set:
+        return self.keys.get(table, set())
+
+
+# =============================================================================
+# Reading
+# =============================================================================
+def latest_seq(path: str = DB_PATH) -> int:
+    row = db.fetch_one("SELECT coalesce(MAX(seq), 0) FROM change_log", path=path)
+    return int(row[0])
+
+
+def oldest_seq(path: str = DB_PATH) -> int:
+    row = db.fetch_one("SELECT MIN(seq) FROM change_log", path=path)
+    return int(row[0]) if row[0] is not None else latest_seq(path) + 1
+
+
+def changes_since(since: int, tables, path: str = DB_PATH):
+    """since より後の tables の変更を返す。削除済みで追いつけないときは None。
+
+    上限（upto）を先に決めるので、読んでいる間に増えた分は次回に回る。
+    """
+    tables = tuple(tables)
+    upto = latest_seq(path)
+    if upto == since:
+        return ChangeSet(since, since)
+    # 締め位置より前の履歴が削除されている／DBが作り直されている → 全件読み直し
+    if upto < since or since + 1 < oldest_seq(path):
+        return None
+    rows = db.fetch_all(
+        f"SELECT table_name, row_key FROM change_log "
+        f"WHERE table_name IN ({','.join('?' * len(tables))}) AND seq > ? AND seq <= ?",
+        (*tables, since, upto), path,
+    )
+    keys = {t: set() for t in tables}
+    for table, key in rows:
+        keys[table].add(key)
+    return ChangeSet(since, upto, keys, len(rows))
+
+
+def chunked(keys, n: int = IN_CHUNK):
+    keys = list(keys)
+    for i in range(0, len(keys), n):
+        yield keys[i:i + n]
+
+
+# =============================================================================
+# Retention
+# =============================================================================
+def prune_changes(keep_days: float, path: str = DB_PATH) -> int:
+    """keep_days より古い変更履歴を削除する（最新の1行は seq の基準として残す）。
+
+    締め位置が削除範囲にかかったプロセスは、次の同期で全件を読み直す。
+    """
+    return db.execute(
+        "DELETE FROM change_log WHERE changed_at < strftime('%Y-%m-%dT%H:%M:%f', 'now', ?) "
+        "AND seq < (SELECT MAX(seq) FROM change_log)",
+        (f"-{float(keep_days)} days",), path,
+    )
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="変更履歴（change_log）の保守")
+    ap.add_argument("--prune-days", type=float, required=True, help="この日数より古い履歴を削除する")
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args(argv)
+    init_db(args.db)
+    n = prune_changes(args.prune_days, args.db)
+    print(f"change_log: {n:,} rows pruned（{', '.join(CHANGE_KEYS)}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from data.profiling import ProfiledConnection
+from data.resources import process_resource
+
+DB_PATH = os.path.join("data", "haken_connect.db")
+
+# =============================================================================
+# Pragmas
+# =============================================================================
+# journal_mode=WAL: 読み取りと書き込みが互いをブロックしない
+# synchronous=NORMAL: WAL下ではコミットごとのfsyncを省略しても破損しない
+# cache_size: 負値はKiB指定（約64MB）/ mmap_size: 256MBまでmmapで読む
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -65536),
+    ("mmap_size", 268435456),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+    ("foreign_keys", "ON"),
+)
+
+POOL_SIZE = 8
+STATEMENT_CACHE = 256
+
+
+def open_connection(path: str = DB_PATH, factory=sqlite3.Connection) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path,
+        timeout=5.0,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE,
+        factory=factory,
+    )
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+# =============================================================================
+# Pool
+# =============================================================================
+class ConnectionPool:
+    """プロセス共有のSQLite接続プール。
+
+    Streamlitはrerunごとに別スレッドでスクリプトを実行するため、
+    スレッドローカルではなく上限付きの貸し出し方式で接続を再利用する。
+    """
+
+    def __init__(self, path: str = DB_PATH, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            # プールの接続だけ計測フック付き（data/profiling.py、無効時はほぼ素通し）
+            conn = open_connection(self.path, ProfiledConnection)
+            with self._lock:
+                self._opened += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def stats(self) -> dict:
+        return {"size": self.size, "opened": self._opened, "idle": self._idle.qsize()}
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+@process_resource
+def get_pool(path: str = DB_PATH) -> ConnectionPool:
+    return ConnectionPool(path)
+
+
+# =============================================================================
+# Query helpers
+# =============================================================================
+# sqlite3は接続ごとにSQL文字列をキーとしてprepared statementをキャッシュする。
+# 下記ヘルパはプールの接続を使い回すので、同じSQLは再コンパイルされない。
+def read_df(sql: str, params=(), path: str = DB_PATH) -> pd.DataFrame:
+    with get_pool(path).connection() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def fetch_all(sql: str, params=(), path: str = DB_PATH) -> list:
+    with get_pool(path).connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def fetch_one(sql: str, params=(), path: str = DB_PATH):
+    with get_pool(path).connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def execute(sql: str, params=(), path: str = DB_PATH) -> int:
+    with get_pool(path).transaction() as conn:
+        return conn.execute(sql, params).rowcount
+
+
+def executemany(sql: str, rows, path: str = DB_PATH) -> int:
+    with get_pool(path).transaction() as conn:
+        return conn.executemany(sql, rows).rowcount
+
+
+def executescript(script: str, path: str = DB_PATH):
+    with get_pool(path).connection() as conn:
+        conn.executescript(script)
+
+
+def insert_row(table: str, row: dict, path: str = DB_PATH) -> int:
+    columns = ",".join(row.keys())
+    placeholders = ",".join(["?"] * len(row))
+    return execute(
+        f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+        list(row.values()),
+        path,
+    )
@@ -0,0 +1,389 @@
+"""案件カタログ・申請一覧などのファイル出力（CSV / Parquet / Excel）。
+
+    python -m data.export connections -o connections.csv.gz --gzip
+    python -m data.export queue --status requested -f xlsx -o queue.xlsx
+    python -m data.export portal --agency A001 -f parquet -o history.parquet
+
+SQLiteから fetchmany で chunk_size 行ずつ読み、読んだ分をそのままファイルに書き出す。
+メモリに載るのは1チャンク分だけなので、行数が数百万でも使用量は変わらない。
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass
+from html import escape
+from typing import Callable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data.catalog import CATALOG_COLUMNS, CatalogFilter, build_where
+from data.db import DB_PATH, open_connection
+from data.init_db import init_db
+from data.matching import QUEUE_COLUMNS, STATUS_LABELS
+from data.portal import HISTORY_COLUMNS, with_labels
+from data.pricing import price_columns
+
+CHUNK_SIZE = 10000
+FORMATS = {"csv": "CSV", "parquet": "Parquet", "xlsx": "Excel"}
+MIME = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+EXCEL_MAX_ROWS = 1048576 - 1  # 見出し行の分を除く
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "haken_exports")
+EXPORT_TTL = 3600  # 作成から1時間で一時ファイルを消す
+
+# 派遣会社向けのカタログ出力には企業を特定できる列を含めない（画面のモザイク表示と同じ扱い）
+AGENCY_CATALOG_COLUMNS = (
+    "o.opportunity_id, o.region, o.industry, o.need_level, o.role, o.headcount_needed, o.requirements"
+)
+
+
+class ExportError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    name: str  # ファイル名の元
+    sql: str
+    params: tuple = ()
+    transform: Callable = None  # チャンクごとに適用する（列名の置き換え・ラベル付けなど）
+
+    @property
+    def key(self) -> tuple:
+        return (self.name, self.sql, self.params)
+
+
+@dataclass(frozen=True)
+class ExportResult:
+    path: str
+    file_name: str
+    mime: str
+    rows: int
+    size: int
+    seconds: float
+    key: tuple
+
+
+# =============================================================================
+# Sources
+# =============================================================================
+def catalog_source(f: CatalogFilter, role: str, pricing=None) -> ExportSource:
+    """検索条件に一致する案件全件（画面の並び順。おすすめ順はスコア計算が必要なため通常順で出す）。"""
+    joins, where, params, ranked = build_where(f)
+    columns = CATALOG_COLUMNS if role == "Admin" else AGENCY_CATALOG_COLUMNS
+    sql = (
+        f"SELECT {columns} FROM opportunities o {joins}"
+        f"LEFT JOIN companies c ON c.company_id = o.company_id "
+        f"WHERE {where} ORDER BY {'f.rank, o.rowid' if ranked else 'o.rowid'}"
+    )
+    transform = None
+    if pricing is not None:
+        transform = lambda df: df.assign(fee=price_columns(df["need_level"], pricing)["fee"].to_numpy())
+    return ExportSource("catalog", sql, tuple(params), transform)
+
+
+def connections_source() -> ExportSource:
+    return ExportSource("connections", "SELECT * FROM connections ORDER BY timestamp DESC, connection_id DESC")
+
+
+def portal_source(agency_id) -> ExportSource:
+    sql = (
+        f"SELECT {HISTORY_COLUMNS} FROM connections c "
+        f"LEFT JOIN opportunities o ON o.opportunity_id = c.opportunity_id "
+        f"LEFT JOIN companies co ON co.company_id = o.company_id "
+        f"WHERE c.agency_id = ? ORDER BY c.timestamp DESC, c.connection_id DESC"
+    )
+    return ExportSource(f"history_{agency_id}", sql, (agency_id,), with_labels)
+
+
+def queue_source(status: str) -> ExportSource:
+    sql = (
+        f"SELECT {QUEUE_COLUMNS} FROM connections c "
+        f"LEFT JOIN agencies a ON a.agency_id = c.agency_id "
+        f"LEFT JOIN opportunities o ON o.opportunity_id = c.opportunity_id "
+        f"WHERE c.status = ? ORDER BY c.timestamp, c.connection_id"
+    )
+    return ExportSource(f"queue_{status}", sql, (status,))
+
+
+# =============================================================================
+# Reading (fetchmany でチャンクごとに DataFrame にする)
+# =============================================================================
+def iter_frames(source: ExportSource, path: str = DB_PATH, chunk_size: int = CHUNK_SIZE):
+    """チャンクごとの DataFrame を返す。0件のときも列名だけの空の DataFrame を1つ返す。"""
+    conn = open_connection(path)
+    try:
+        cur = conn.execute(source.sql, source.params)
+        names = [d[0] for d in cur.description]
+        first = True
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows and not first:
+                break
+            first = False
+            df = pd.DataFrame.from_records(rows, columns=names)
+            yield source.transform(df) if source.transform else df
+            if not rows:
+                break
+    finally:
+        conn.close()
+
+
+# =============================================================================
+# Writers (out はバイナリのファイルオブジェクト)
+# =============================================================================
+def write_csv(frames, out, compress: bool = False) -> int:
+    # Excelで開いても文字化けしないようBOM付きUTF-8にする
+    sink = gzip.GzipFile(fileobj=out, mode="wb") if compress else out
+    rows = 0
+    try:
+        sink.write("\ufeff".encode("utf-8"))
+        for i, df in enumerate(frames):
+            sink.write(df.to_csv(index=False, header=i == 0, lineterminator="\r\n").encode("utf-8"))
+            rows += len(df)
+    finally:
+        if compress:
+            sink.close()
+    return rows
+
+
+# 先頭のチャンクで全て NULL の列は型が決まらないため、決まるまで最大この数のチャンクを先読みする
+# （それでも決まらない列は、同名の列の宣言型 → 文字列の順に決める）
+PARQUET_LOOKAHEAD = 8
+DECLARED_TYPES = {"INTEGER": pa.int64(), "REAL": pa.float64(), "TEXT": pa.string()}
+
+
+def declared_types(path: str = DB_PATH) -> dict:
+    """全テーブルの 列名 → Arrowの型（CREATE TABLE の宣言型から）。"""
+    conn = open_connection(path)
+    try:
+        tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        types = {}
+        for t in tables:
+            for _, name, decl, *_ in conn.execute(f"PRAGMA table_info('{t}')"):
+                types.setdefault(name, DECLARED_TYPES.get((decl or "").upper()))
+        return {k: v for k, v in types.items() if v is not None}
+    finally:
+        conn.close()
+
+
+def _arrow_schema(tables: list, hints: dict) -> pa.Schema:
+    schema = pa.unify_schemas([t.schema for t in tables], promote_options="permissive")
+    return pa.schema(
+        [pa.field(f.name, hints.get(f.name, pa.string())) if pa.types.is_null(f.type) else f for f in schema],
+        metadata=schema.metadata,
+    )
+
+
+def write_parquet(frames, out, compress: bool = False, hints: dict = None) -> int:
+    writer, schema, pending, rows = None, None, [], 0
+
+    def open_writer():
+        nonlocal writer, schema
+        schema = _arrow_schema(pending, hints or {})
+        writer = pq.ParquetWriter(out, schema, compression="gzip" if compress else "snappy")
+        for t in pending:
+            writer.write_table(t.cast(schema, safe=False))
+        pending.clear()
+
+    try:
+        for df in frames:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            rows += len(df)
+            if writer is not None:
+                writer.write_table(table.cast(schema, safe=False))
+                continue
+            pending.append(table)
+            unified = pa.unify_schemas([t.schema for t in pending], promote_options="permissive")
+            if len(pending) >= PARQUET_LOOKAHEAD or not any(pa.types.is_null(t) for t in unified.types):
+                open_writer()
+        if writer is None:
+            open_writer()
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="data" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/></Relationships>'
+    ),
+}
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_cells(s: pd.Series) -> pd.Series:
+    """列単位でセルのXMLを作る（数値は数値セル、それ以外はインライン文字列）。"""
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.map(lambda v: "<c/>" if pd.isna(v) else f"<c><v>{v}</v></c>")
+    text = s.map(lambda v: None if v is None or (isinstance(v, float) and pd.isna(v)) else str(v))
+    return text.map(
+        lambda v: "<c/>" if v is None
+        else f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_XML_ILLEGAL.sub("", v), quote=False)}</t></is></c>'
+    )
+
+
+def write_xlsx(frames, out, compress: bool = False) -> int:
+    """依存ライブラリなしで1シートのxlsxを書く（シートのXMLはzip内に逐次書き込む）。
+
+    xlsx 自体が zip 圧縮なので compress は使わない。
+    """
+    rows = 0
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, body in XLSX_PARTS.items():
+            z.writestr(name, body)
+        with z.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for i, df in enumerate(frames):
+                if i == 0:
+                    header = _xlsx_cells(pd.Series(df.columns, dtype=object))
+                    sheet.write(f'<row r="1">{"".join(header)}</row>'.encode("utf-8"))
+                if rows + len(df) > EXCEL_MAX_ROWS:
+                    raise ExportError(f"Excelに出力できるのは{EXCEL_MAX_ROWS:,}行までです。CSVかParquetを選んでください。")
+                if len(df):
+                    cells = None
+                    for col in df.columns:
+                        c = _xlsx_cells(df[col])
+                        cells = c if cells is None else cells + c
+                    nums = pd.RangeIndex(rows + 2, rows + 2 + len(df)).astype(str)
+                    body = '<row r="' + pd.Series(nums, index=df.index) + '">' + cells + "</row>"
+                    sheet.write("".join(body).encode("utf-8"))
+                rows += len(df)
+            sheet.write(b"</sheetData></worksheet>")
+    return rows
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "xlsx": write_xlsx}
+
+
+# =============================================================================
+# Export
+# =============================================================================
+def file_name(source: ExportSource, fmt: str, compress: bool = False) -> str:
+    suffix = ".gz" if compress and fmt == "csv" else ""
+    return f"{source.name}_{time.strftime('%Y%m%d_%H%M%S')}.{fmt}{suffix}"
+
+
+def export(source: ExportSource, fmt: str, out, compress: bool = False,
+           chunk_size: int = CHUNK_SIZE, path: str = DB_PATH) -> int:
+    """source を fmt 形式で out（バイナリのファイルオブジェクト）に書き、行数を返す。
+
+    compress は CSV なら gzip、Parquet なら列の圧縮方式を gzip にする。
+    """
+    if fmt not in WRITERS:
+        raise ExportError(f"未対応の形式です: {fmt}")
+    frames = iter_frames(source, path, chunk_size)
+    if fmt == "parquet":
+        return write_parquet(frames, out, compress, declared_types(path))
+    return WRITERS[fmt](frames, out, compress)
+
+
+def _prune_exports(directory: str, ttl: float = EXPORT_TTL):
+    cutoff = time.time() - ttl
+    for entry in os.scandir(directory):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass  # 他のプロセスが先に消した
+
+
+def export_file(source: ExportSource, fmt: str, compress: bool = False,
+                chunk_size: int = CHUNK_SIZE, path: str = DB_PATH, directory: str = EXPORT_DIR) -> ExportResult:
+    """一時ディレクトリにファイルを作る（画面のダウンロードボタン用）。"""
+    os.makedirs(directory, exist_ok=True)
+    _prune_exports(directory)
+    t0 = time.perf_counter()
+    name = file_name(source, fmt, compress)
+    fd, tmp = tempfile.mkstemp(prefix="export_", suffix="_" + name, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            rows = export(source, fmt, out, compress, chunk_size, path)
+    except Exception:
+        os.remove(tmp)
+        raise
+    mime = "application/gzip" if compress and fmt == "csv" else MIME[fmt]
+    return ExportResult(tmp, name, mime, rows, os.path.getsize(tmp), time.perf_counter() - t0, source.key)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="案件カタログ・申請一覧をファイルに出力する")
+    ap.add_argument("target", choices=("catalog", "connections", "portal", "queue"))
+    ap.add_argument("-o", "--out", required=True, help="出力先ファイル（- で標準出力）")
+    ap.add_argument("-f", "--format", choices=list(FORMATS), default="csv")
+    ap.add_argument("--gzip", action="store_true", help="CSVはgzip、Parquetは列をgzipで圧縮する")
+    ap.add_argument("--agency", help="portal: 派遣会社ID")
+    ap.add_argument("--status", choices=list(STATUS_LABELS), default="requested", help="queue: ステータス")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    ap.add_argument("--db", default=DB_PATH)
+    args = ap.parse_args(argv)
+    if args.target == "portal" and not args.agency:
+        ap.error("portal には --agency が必要です")
+    init_db(args.db)
+    source = {
+        "catalog": lambda: catalog_source(CatalogFilter(), "Admin"),
+        "connections": connections_source,
+        "portal": lambda: portal_source(args.agency),
+        "queue": lambda: queue_source(args.status),
+    }[args.target]()
+    t0 = time.perf_counter()
+    try:
+        if args.out == "-":
+            rows = export(source, args.format, sys.stdout.buffer, args.gzip, args.chunk_size, args.db)
+        else:
+            with open(args.out, "wb") as out:
+                rows = export(source, args.format, out, args.gzip, args.chunk_size, args.db)
+    except ExportError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(f"{args.target}: {rows:,} rows → {args.out}（{time.perf_counter() - t0:.1f}s）", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
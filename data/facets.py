@@ -0,0 +1,60 @@
+from data import db
+from data.cache import cached
+from data.catalog import ALL, CatalogFilter
+from data.db import DB_PATH
+
+FACETS = ("region", "industry", "need_level")
+
+
+# =============================================================================
+# Facet index (opp_facet_counts はトリガで差分更新される)
+# =============================================================================
+def facet_values(facet: str, path: str = DB_PATH) -> list:
+    """絞り込み候補。全案件のスキャンではなくファセット表から取る。"""
+    sql = (
+        f"SELECT {facet} FROM opp_facet_counts WHERE {facet} != '' "
+        f"GROUP BY {facet} HAVING SUM(n) > 0 ORDER BY {facet}"
+    )
+    return cached(("facet_values", facet), ("opportunities",),
+                  lambda: [r[0] for r in db.fetch_all(sql, path=path)], path)
+
+
+def _where_except(f: CatalogFilter, facet: str) -> tuple:
+    clauses, params = ["headcount_needed >= ?"], [int(f.headcount_min)]
+    for other in FACETS:
+        value = getattr(f, other)
+        if other != facet and value != ALL:
+            clauses.append(f"{other} = ?")
+            params.append(value)
+    return " AND ".join(clauses), params
+
+
+def facet_counts(f: CatalogFilter, path: str = DB_PATH) -> dict:
+    """各ファセットの値ごとの件数を、そのファセット以外の絞り込み条件つきで返す。
+
+    例えば地域の件数は、業種・ランク・人数下限を適用した上での地域別件数になる
+    （選択中の地域そのものには左右されない）。キーワードは件数に含めない。
+    """
+    key = ("facet_counts", f.region, f.industry, f.need_level, int(f.headcount_min))
+
+    def load():
+        out = {}
+        for facet in FACETS:
+            where, params = _where_except(f, facet)
+            rows = db.fetch_all(
+                f"SELECT {facet}, SUM(n) FROM opp_facet_counts WHERE {where} "
+                f"GROUP BY {facet} HAVING SUM(n) > 0",
+                params, path,
+            )
+            counts = {v: int(n) for v, n in rows}
+            counts[ALL] = sum(counts.values())
+            out[facet] = counts
+        return out
+
+    return cached(key, ("opportunities",), load, path)
+
+
+def structured_count(f: CatalogFilter, path: str = DB_PATH) -> int:
+    """キーワード以外の条件に一致する件数（ファセット表だけで求まる）。"""
+    counts = facet_counts(f, path)["need_level"]
+    return counts[ALL] if f.need_level == ALL else counts.get(f.need_level, 0)
@@ -1,38 +1,572 @@
 import sqlite3
-import os
-
-DB_PATH = os.path.join("data", "haken_connect.db")
-
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS opportunities (
-        opportunity_id TEXT PRIMARY KEY,
-        company_id TEXT,
-        region TEXT,
-        industry TEXT,
-        need_level TEXT,
-        role TEXT,
-        headcount_needed INTEGER,
-        requirements TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS companies (
-        company_id TEXT PRIMARY KEY,
-        company_name TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS agencies (
-        agency_id TEXT PRIMARY KEY,
-        agency_name TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS connections (
-        connection_id TEXT PRIMARY KEY,
-        timestamp TEXT,
-        agency_id TEXT,
-        opportunity_id TEXT,
-        status TEXT,
-        fee_amount INTEGER,
-        incentive_amount INTEGER,
-        notes TEXT
-    )''')
-    conn.commit()
-    conn.close()
+
+from data.db import DB_PATH, fetch_one, open_connection
+
+MIGRATION_BUSY_TIMEOUT_MS = 120000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS opportunities (
+    opportunity_id TEXT PRIMARY KEY,
+    company_id TEXT,
+    region TEXT,
+    industry TEXT,
+    need_level TEXT,
+    role TEXT,
+    headcount_needed INTEGER,
+    requirements TEXT
+);
+CREATE TABLE IF NOT EXISTS companies (
+    company_id TEXT PRIMARY KEY,
+    company_name TEXT
+);
+CREATE TABLE IF NOT EXISTS agencies (
+    agency_id TEXT PRIMARY KEY,
+    agency_name TEXT
+);
+CREATE TABLE IF NOT EXISTS connections (
+    connection_id TEXT PRIMARY KEY,
+    timestamp TEXT,
+    agency_id TEXT,
+    opportunity_id TEXT,
+    status TEXT,
+    fee_amount INTEGER,
+    incentive_amount INTEGER,
+    notes TEXT
+);
+
+-- 案件カタログの絞り込み用（等価条件 → 人数下限の範囲条件の順）
+CREATE INDEX IF NOT EXISTS idx_opp_filter
+    ON opportunities(region, industry, need_level, headcount_needed);
+CREATE INDEX IF NOT EXISTS idx_opp_industry
+    ON opportunities(industry, need_level, headcount_needed);
+CREATE INDEX IF NOT EXISTS idx_opp_need
+    ON opportunities(need_level, headcount_needed);
+CREATE INDEX IF NOT EXISTS idx_opp_company
+    ON opportunities(company_id);
+'''
+
+# 職種・仕事内容の全文索引。日本語は単語境界がないためtrigramで分割する。
+# 外部コンテンツ方式（本文はopportunitiesにのみ保持）で、トリガにより同期する。
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS opportunities_fts USING fts5(
+    role, requirements,
+    content='opportunities', content_rowid='rowid',
+    tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS opportunities_fts_ai AFTER INSERT ON opportunities BEGIN
+    INSERT INTO opportunities_fts(rowid, role, requirements)
+    VALUES (new.rowid, new.role, new.requirements);
+END;
+CREATE TRIGGER IF NOT EXISTS opportunities_fts_ad AFTER DELETE ON opportunities BEGIN
+    INSERT INTO opportunities_fts(opportunities_fts, rowid, role, requirements)
+    VALUES ('delete', old.rowid, old.role, old.requirements);
+END;
+CREATE TRIGGER IF NOT EXISTS opportunities_fts_au AFTER UPDATE OF role, requirements ON opportunities BEGIN
+    INSERT INTO opportunities_fts(opportunities_fts, rowid, role, requirements)
+    VALUES ('delete', old.rowid, old.role, old.requirements);
+    INSERT INTO opportunities_fts(rowid, role, requirements)
+    VALUES (new.rowid, new.role, new.requirements);
+END;
+'''
+
+# テーブルごとの変更カウンタ。読み取りキャッシュ（data/cache.py）の版キーになる。
+VERSIONED_TABLES = ("opportunities", "companies", "agencies", "connections")
+def _version_triggers(tables) -> str:
+    return "".join(
+        f'''INSERT OR IGNORE INTO table_versions (table_name) VALUES ('{t}');
+CREATE TRIGGER IF NOT EXISTS {t}_ver_a{op[0].lower()} AFTER {op} ON {t} BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = '{t}';
+END;
+'''
+        for t in tables
+        for op in ("INSERT", "UPDATE", "DELETE")
+    )
+
+VERSION_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+''' + _version_triggers(VERSIONED_TABLES)
+
+# ダッシュボード用の集計表。行の追加・更新・削除に合わせてトリガで差分更新する。
+# 主キーにNULLが入ると別行扱いになるため、キー列は coalesce で '' に寄せる。
+CONN_KEY = "coalesce({r}.status, ''), coalesce({r}.agency_id, ''), coalesce(substr({r}.timestamp, 1, 10), '')"
+CONN_VALS = "coalesce({r}.fee_amount, 0), coalesce({r}.incentive_amount, 0)"
+CONN_ADD = f'''INSERT INTO connection_summary (status, agency_id, day, n, fee_total, incentive_total)
+    VALUES ({CONN_KEY.format(r="new")}, 1, {CONN_VALS.format(r="new")})
+    ON CONFLICT (status, agency_id, day) DO UPDATE SET
+        n = n + 1,
+        fee_total = fee_total + excluded.fee_total,
+        incentive_total = incentive_total + excluded.incentive_total;'''
+CONN_SUB = f'''UPDATE connection_summary SET
+        n = n - 1,
+        fee_total = fee_total - coalesce(old.fee_amount, 0),
+        incentive_total = incentive_total - coalesce(old.incentive_amount, 0)
+    WHERE (status, agency_id, day) = ({CONN_KEY.format(r="old")});'''
+OPP_ADD = '''INSERT INTO opp_rank_summary (need_level, n) VALUES (coalesce(new.need_level, ''), 1)
+    ON CONFLICT (need_level) DO UPDATE SET n = n + 1;'''
+OPP_SUB = "UPDATE opp_rank_summary SET n = n - 1 WHERE need_level = coalesce(old.need_level, '');"
+
+SUMMARY_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS opp_rank_summary (
+    need_level TEXT PRIMARY KEY,
+    n INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS connection_summary (
+    status TEXT NOT NULL,
+    agency_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    fee_total INTEGER NOT NULL DEFAULT 0,
+    incentive_total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (status, agency_id, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_con_timestamp ON connections(timestamp, connection_id);
+CREATE TRIGGER IF NOT EXISTS opp_rank_summary_ai AFTER INSERT ON opportunities BEGIN
+    {OPP_ADD}
+END;
+CREATE TRIGGER IF NOT EXISTS opp_rank_summary_ad AFTER DELETE ON opportunities BEGIN
+    {OPP_SUB}
+END;
+CREATE TRIGGER IF NOT EXISTS opp_rank_summary_au AFTER UPDATE OF need_level ON opportunities BEGIN
+    {OPP_SUB}
+    {OPP_ADD}
+END;
+CREATE TRIGGER IF NOT EXISTS connection_summary_ai AFTER INSERT ON connections BEGIN
+    {CONN_ADD}
+END;
+CREATE TRIGGER IF NOT EXISTS connection_summary_ad AFTER DELETE ON connections BEGIN
+    {CONN_SUB}
+END;
+CREATE TRIGGER IF NOT EXISTS connection_summary_au
+    AFTER UPDATE OF status, agency_id, timestamp, fee_amount, incentive_amount ON connections BEGIN
+    {CONN_SUB}
+    {CONN_ADD}
+END;
+'''
+
+# 集計表を後から追加した既存DB向けに、現在の行から一度だけ作り直す
+SUMMARY_BACKFILL = f'''
+DELETE FROM opp_rank_summary;
+INSERT INTO opp_rank_summary (need_level, n)
+    SELECT coalesce(need_level, ''), COUNT(*) FROM opportunities GROUP BY 1;
+DELETE FROM connection_summary;
+INSERT INTO connection_summary (status, agency_id, day, n, fee_total, incentive_total)
+    SELECT {CONN_KEY.format(r="connections")}, COUNT(*),
+           coalesce(SUM(fee_amount), 0), coalesce(SUM(incentive_amount), 0)
+    FROM connections GROUP BY 1, 2, 3;
+'''
+
+# 案件カタログの絞り込み候補と件数（ファセット）。地域×業種×ランク×人数ごとの件数を
+# トリガで差分更新するため、件数の取得は案件数ではなく組み合わせ数に比例する。
+# 人数がNULLの案件は「人数下限」のどの値にも一致しないよう -1 として数える。
+FACET_KEY = (
+    "coalesce({r}.region, ''), coalesce({r}.industry, ''), "
+    "coalesce({r}.need_level, ''), coalesce({r}.headcount_needed, -1)"
+)
+FACET_ADD = f'''INSERT INTO opp_facet_counts (region, industry, need_level, headcount_needed, n)
+    VALUES ({FACET_KEY.format(r="new")}, 1)
+    ON CONFLICT (region, industry, need_level, headcount_needed) DO UPDATE SET n = n + 1;'''
+FACET_SUB = f'''UPDATE opp_facet_counts SET n = n - 1
+    WHERE (region, industry, need_level, headcount_needed) = ({FACET_KEY.format(r="old")});'''
+
+FACET_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS opp_facet_counts (
+    region TEXT NOT NULL,
+    industry TEXT NOT NULL,
+    need_level TEXT NOT NULL,
+    headcount_needed INTEGER NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (region, industry, need_level, headcount_needed)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS opp_facet_counts_ai AFTER INSERT ON opportunities BEGIN
+    {FACET_ADD}
+END;
+CREATE TRIGGER IF NOT EXISTS opp_facet_counts_ad AFTER DELETE ON opportunities BEGIN
+    {FACET_SUB}
+END;
+CREATE TRIGGER IF NOT EXISTS opp_facet_counts_au
+    AFTER UPDATE OF region, industry, need_level, headcount_needed ON opportunities BEGIN
+    {FACET_SUB}
+    {FACET_ADD}
+END;
+'''
+
+FACET_BACKFILL = f'''
+DELETE FROM opp_facet_counts;
+INSERT INTO opp_facet_counts (region, industry, need_level, headcount_needed, n)
+    SELECT {FACET_KEY.format(r="opportunities")}, COUNT(*) FROM opportunities GROUP BY 1, 2, 3, 4;
+'''
+# おすすめ順のための派遣会社別の親和度（申請先の地域・業種・ランクごとの重み合計）。
+# 接続まで進んだ申請ほど「好み」を強く表し、却下は弱い負の信号として扱う。
+STATUS_WEIGHTS = {"connected": 3.0, "approved": 2.0, "requested": 1.0, "rejected": -0.5}
+AFFINITY_FACETS = ("region", "industry", "need_level")
+
+def _status_weight(r: str) -> str:
+    cases = " ".join(f"WHEN '{k}' THEN {v}" for k, v in STATUS_WEIGHTS.items())
+    return f"(CASE {r}.status {cases} ELSE 0 END)"
+
+def _affinity_upsert(r: str, weight: str) -> str:
+    return "".join(
+        f'''
+    INSERT INTO agency_affinity (agency_id, facet, value, weight)
+        SELECT {r}.agency_id, '{facet}', o.{facet}, {weight}
+        FROM opportunities o
+        WHERE o.opportunity_id = {r}.opportunity_id AND {r}.agency_id IS NOT NULL AND o.{facet} IS NOT NULL
+        ON CONFLICT (agency_id, facet, value) DO UPDATE SET weight = weight + excluded.weight;'''
+        for facet in AFFINITY_FACETS
+    )
+
+# 承認・却下のようにステータスだけが変わる更新は、重みの差分だけを1回で足す
+# （一括承認で1行あたりのトリガ処理を半分にする）。派遣会社・案件が変わる更新は引いて足し直す。
+AFFINITY_UPDATE_TRIGGERS = f'''
+CREATE TRIGGER IF NOT EXISTS agency_affinity_au_status AFTER UPDATE OF status ON connections
+    WHEN old.agency_id IS new.agency_id AND old.opportunity_id IS new.opportunity_id
+     AND {_status_weight("old")} != {_status_weight("new")} BEGIN{_affinity_upsert("new", f"{_status_weight('new')} - {_status_weight('old')}")}
+END;
+CREATE TRIGGER IF NOT EXISTS agency_affinity_au AFTER UPDATE OF agency_id, opportunity_id ON connections
+    WHEN old.agency_id IS NOT new.agency_id OR old.opportunity_id IS NOT new.opportunity_id BEGIN{_affinity_upsert("old", "-" + _status_weight("old"))}{_affinity_upsert("new", _status_weight("new"))}
+END;
+'''
+
+AFFINITY_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS agency_affinity (
+    agency_id TEXT NOT NULL,
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    weight REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (agency_id, facet, value)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS agency_affinity_ai AFTER INSERT ON connections BEGIN{_affinity_upsert("new", _status_weight("new"))}
+END;
+CREATE TRIGGER IF NOT EXISTS agency_affinity_ad AFTER DELETE ON connections BEGIN{_affinity_upsert("old", "-" + _status_weight("old"))}
+END;
+CREATE TRIGGER IF NOT EXISTS agency_affinity_au
+    AFTER UPDATE OF status, agency_id, opportunity_id ON connections BEGIN{_affinity_upsert("old", "-" + _status_weight("old"))}{_affinity_upsert("new", _status_weight("new"))}
+END;
+'''
+
+AFFINITY_BACKFILL = "DELETE FROM agency_affinity;\n" + "".join(
+    f'''INSERT INTO agency_affinity (agency_id, facet, value, weight)
+    SELECT c.agency_id, '{facet}', o.{facet}, SUM({_status_weight("c")})
+    FROM connections c JOIN opportunities o ON o.opportunity_id = c.opportunity_id
+    WHERE c.agency_id IS NOT NULL AND o.{facet} IS NOT NULL
+    GROUP BY c.agency_id, o.{facet};
+'''
+    for facet in AFFINITY_FACETS
+)
+
+# 列の追加（ALTER TABLE ... ADD COLUMN）は IF NOT EXISTS が書けないため、列が無いときだけ流す
+def add_column(table: str, column: str, decl: str):
+    def step(conn):
+        if column not in {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return step
+
+# 承認ワークフロー用。version は楽観的排他のための行の版（更新のたびに +1）で、
+# 承認待ちキューは status → 申請日時の順に索引から読む。版6の agency_affinity_au は
+# ステータスだけの更新用（重みの差分）と派遣会社・案件の変更用の2つに置き換える。
+MATCHING_SCHEMA = '''
+CREATE INDEX IF NOT EXISTS idx_con_status ON connections(status, timestamp, connection_id);
+DROP TRIGGER IF EXISTS agency_affinity_au;
+''' + AFFINITY_UPDATE_TRIGGERS
+
+# 派遣会社ポータル用。自社の申請履歴は (agency_id, 申請日時) の索引を新しい順に読み、
+# ステータス別の件数は集計表を派遣会社で引く（他社の件数に依存しない）。
+PORTAL_SCHEMA = '''
+CREATE INDEX IF NOT EXISTS idx_con_agency ON connections(agency_id, timestamp, connection_id);
+CREATE INDEX IF NOT EXISTS idx_con_summary_agency ON connection_summary(agency_id, status);
+'''
+
+# 請求・支払の締め処理用。接続済みになった申請（と、接続済みの取り消し・金額変更）を
+# トリガで billing_events に追記し、締め処理は前回の締め位置（seq）より後の分だけを集計する。
+# 金額の変更は「旧の取り消し（負）＋新の計上」の2行として記録する。
+def _billing_event(r: str, sign: str, period: str) -> str:
+    return f'''INSERT INTO billing_events (period, connection_id, agency_id, company_id, n, fee, incentive)
+        SELECT {period}, {r}.connection_id, coalesce({r}.agency_id, ''), coalesce(o.company_id, ''),
+               {sign}1, {sign}coalesce({r}.fee_amount, 0), {sign}coalesce({r}.incentive_amount, 0)
+        FROM (SELECT 1) LEFT JOIN opportunities o ON o.opportunity_id = {r}.opportunity_id
+        WHERE {r}.status = 'connected';'''
+
+BILLING_NOW = "strftime('%Y-%m', 'now')"
+BILLING_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS billing_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    period TEXT NOT NULL,
+    connection_id TEXT,
+    agency_id TEXT NOT NULL,
+    company_id TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    fee INTEGER NOT NULL,
+    incentive INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_billing_events_period ON billing_events(period, agency_id, seq);
+CREATE TABLE IF NOT EXISTS invoices (
+    period TEXT NOT NULL,
+    agency_id TEXT NOT NULL,
+    connections INTEGER NOT NULL DEFAULT 0,
+    fee_total INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (period, agency_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS payouts (
+    period TEXT NOT NULL,
+    company_id TEXT NOT NULL,
+    connections INTEGER NOT NULL DEFAULT 0,
+    incentive_total INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (period, company_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS settlements (
+    period TEXT PRIMARY KEY,
+    watermark INTEGER NOT NULL DEFAULT 0,
+    events INTEGER NOT NULL DEFAULT 0,
+    runs INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+CREATE TRIGGER IF NOT EXISTS billing_events_ai AFTER INSERT ON connections
+    WHEN new.status = 'connected' BEGIN
+    {_billing_event("new", "", BILLING_NOW)}
+END;
+CREATE TRIGGER IF NOT EXISTS billing_events_ad AFTER DELETE ON connections
+    WHEN old.status = 'connected' BEGIN
+    {_billing_event("old", "-", BILLING_NOW)}
+END;
+CREATE TRIGGER IF NOT EXISTS billing_events_au
+    AFTER UPDATE OF status, agency_id, opportunity_id, fee_amount, incentive_amount ON connections
+    WHEN old.status = 'connected' OR new.status = 'connected' BEGIN
+    {_billing_event("old", "-", BILLING_NOW)}
+    {_billing_event("new", "", BILLING_NOW)}
+END;
+'''
+
+# 既存の接続済み申請は、申請日時の月に計上されたものとして一度だけ取り込む
+BILLING_BACKFILL = f'''
+INSERT INTO billing_events (period, connection_id, agency_id, company_id, n, fee, incentive)
+    SELECT substr(c.timestamp, 1, 7), c.connection_id, coalesce(c.agency_id, ''), coalesce(o.company_id, ''),
+           1, coalesce(c.fee_amount, 0), coalesce(c.incentive_amount, 0)
+    FROM connections c LEFT JOIN opportunities o ON o.opportunity_id = c.opportunity_id
+    WHERE c.status = 'connected' AND NOT EXISTS (SELECT 1 FROM billing_events);
+'''
+
+# ランク別の料金・奨励金。変更のたびに全ランク分を新しい版として追加し、
+# 適用開始日（effective_from）が今日以前で最も新しい版を使う。申請には課金時の版を記録する。
+DEFAULT_PRICING = {
+    "A": {"fee": 100000, "incentive": 30000},
+    "B": {"fee": 50000, "incentive": 15000},
+    "C": {"fee": 20000, "incentive": 5000},
+}
+PRICING_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pricing (
+    version INTEGER NOT NULL,
+    need_level TEXT NOT NULL,
+    fee INTEGER NOT NULL,
+    incentive INTEGER NOT NULL,
+    effective_from TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now')),
+    PRIMARY KEY (version, need_level)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_pricing_effective ON pricing(effective_from, version);
+''' + "".join(
+    f"INSERT OR IGNORE INTO pricing (version, need_level, fee, incentive, effective_from) "
+    f"VALUES (1, '{k}', {v['fee']}, {v['incentive']}, '2000-01-01');\n"
+    for k, v in DEFAULT_PRICING.items()
+) + _version_triggers(("pricing",))
+
+# 変更履歴（追記のみ）。各プロセスは読み込み済みの seq を覚えておき、それ以降に
+# 変わった行のキーだけを読んで手元の列データに反映する（data/changes.py）。
+# 主キーが書き換えられた場合は旧キーの削除と新キーの更新の2行を残す。
+CHANGE_KEYS = {
+    "opportunities": "opportunity_id",
+    "companies": "company_id",
+    "agencies": "agency_id",
+    "connections": "connection_id",
+}
+
+def _change_triggers(table: str, key: str) -> str:
+    log = "INSERT INTO change_log (table_name, op, row_key)"
+    return f'''CREATE TRIGGER IF NOT EXISTS {table}_log_ai AFTER INSERT ON {table} BEGIN
+    {log} VALUES ('{table}', 'I', new.{key});
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_log_au AFTER UPDATE ON {table} BEGIN
+    {log} SELECT '{table}', 'D', old.{key} WHERE old.{key} IS NOT new.{key};
+    {log} VALUES ('{table}', 'U', new.{key});
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_log_ad AFTER DELETE ON {table} BEGIN
+    {log} VALUES ('{table}', 'D', old.{key});
+END;
+'''
+
+CHANGE_LOG_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    op TEXT NOT NULL,  -- I / U / D
+    row_key TEXT,
+    changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_change_log_table ON change_log(table_name, seq);
+''' + "".join(_change_triggers(t, k) for t, k in CHANGE_KEYS.items())
+
+# アプローチの重複防止。同じ派遣会社・案件の組は、申請中・承認済みの行が1つまで
+# （却下・接続済みになれば再度申請できる）。既存の重複は承認済み → 古い順に1行を残し、
+# 残りは却下にする。大量取り込みで索引を作り直す前にも同じ処理を流す（data/bulk_import.py）。
+OPEN_STATUSES = ("requested", "approved")
+_OPEN = ", ".join(f"'{s}'" for s in OPEN_STATUSES)
+OPEN_PAIR_DEDUPE = f'''
+UPDATE connections SET
+    status = 'rejected',
+    notes = trim(coalesce(notes, '') || ' 重複申請のため自動却下'),
+    version = version + 1
+WHERE connection_id IN (
+    SELECT connection_id FROM (
+        SELECT connection_id, row_number() OVER (
+            PARTITION BY agency_id, opportunity_id
+            ORDER BY status = 'approved' DESC, timestamp, connection_id
+        ) AS rn
+        FROM connections
+        WHERE status IN ({_OPEN}) AND agency_id IS NOT NULL AND opportunity_id IS NOT NULL
+    ) WHERE rn > 1
+);
+'''
+APPROACH_SCHEMA = OPEN_PAIR_DEDUPE + f'''
+CREATE UNIQUE INDEX IF NOT EXISTS idx_con_open_pair
+    ON connections(agency_id, opportunity_id) WHERE status IN ({_OPEN});
+'''
+
+FTS_REBUILD = "INSERT INTO opportunities_fts(opportunities_fts) VALUES ('rebuild');"
+
+# 2文字以下の語の索引。trigram は3文字未満の語を引けないため、各列を1文字ずつずらした
+# 2文字（末尾は1文字）に切り、空白区切りで unicode61 の索引に入れる。2文字の語はその語、
+# 1文字の語は前方一致（"語"*）で引く。本文は持たない（contentless）ので、削除は挿入時と
+# 同じ切り方の値を 'delete' に渡して行う。
+def _bigrams(col: str) -> str:
+    return f'''(WITH RECURSIVE i(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM i WHERE n < length({col}))
+        SELECT group_concat(substr(lower({col}), n, 2), ' ') FROM i)'''
+
+def _bigram_row(r: str) -> str:
+    return f"{r}.rowid, {_bigrams(f'{r}.role')}, {_bigrams(f'{r}.requirements')}"
+
+BIGRAM_SCHEMA = f'''
+CREATE VIRTUAL TABLE IF NOT EXISTS opportunities_bigram USING fts5(
+    role, requirements,
+    content='', detail='none',
+    tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS opportunities_bigram_ai AFTER INSERT ON opportunities BEGIN
+    INSERT INTO opportunities_bigram(rowid, role, requirements) VALUES ({_bigram_row("new")});
+END;
+CREATE TRIGGER IF NOT EXISTS opportunities_bigram_ad AFTER DELETE ON opportunities BEGIN
+    INSERT INTO opportunities_bigram(opportunities_bigram, rowid, role, requirements)
+    VALUES ('delete', {_bigram_row("old")});
+END;
+CREATE TRIGGER IF NOT EXISTS opportunities_bigram_au AFTER UPDATE OF role, requirements ON opportunities BEGIN
+    INSERT INTO opportunities_bigram(opportunities_bigram, rowid, role, requirements)
+    VALUES ('delete', {_bigram_row("old")});
+    INSERT INTO opportunities_bigram(rowid, role, requirements) VALUES ({_bigram_row("new")});
+END;
+'''
+
+BIGRAM_REBUILD = f'''
+INSERT INTO opportunities_bigram(opportunities_bigram) VALUES ('delete-all');
+INSERT INTO opportunities_bigram(rowid, role, requirements)
+    SELECT {_bigram_row("opportunities")} FROM opportunities;
+'''
+
+# 全文索引ごとの作り直し（大量取り込みで同期トリガを外した後に流す。data/bulk_import.py）
+FTS_REBUILDS = {"opportunities_fts": FTS_REBUILD, "opportunities_bigram": BIGRAM_REBUILD}
+
+# DBの識別子。作り直したDB（同じパスでも）を見分けるため、作成時に一度だけ乱数で決める
+# （data/catalog_store.py がスナップショットとDBの対応を確かめるのに使う）
+DB_META_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS db_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+INSERT OR IGNORE INTO db_meta (key, value) VALUES ('db_id', lower(hex(randomblob(16))));
+'''
+
+# (版, 実行するSQL または conn を受け取る関数)。PRAGMA user_version に適用済みの版を記録し、未適用の分だけ流す
+# （版ごとに1トランザクション。migrate() を参照）。6までは IF NOT EXISTS と作り直し型の
+# バックフィルなので、版0の既存DBに流しても安全。
+MIGRATIONS = (
+    (1, (SCHEMA,)),
+    (2, (FTS_SCHEMA, FTS_REBUILD)),
+    (3, (VERSION_SCHEMA,)),
+    (4, (SUMMARY_SCHEMA, SUMMARY_BACKFILL)),
+    (5, (FACET_SCHEMA, FACET_BACKFILL)),
+    (6, (AFFINITY_SCHEMA, AFFINITY_BACKFILL)),
+    (7, (add_column("connections", "version", "INTEGER NOT NULL DEFAULT 0"), MATCHING_SCHEMA)),
+    (8, (PORTAL_SCHEMA,)),
+    (9, (BILLING_SCHEMA, BILLING_BACKFILL)),
+    (10, (PRICING_SCHEMA, add_column("connections", "pricing_version", "INTEGER"))),
+    (11, (CHANGE_LOG_SCHEMA,)),
+    (12, (APPROACH_SCHEMA,)),
+    (13, (BIGRAM_SCHEMA, BIGRAM_REBUILD)),
+    (14, (DB_META_SCHEMA,)),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(path: str = DB_PATH) -> int:
+    return fetch_one("PRAGMA user_version", path=path)[0]
+
+def database_id(path: str = DB_PATH) -> str:
+    return fetch_one("SELECT value FROM db_meta WHERE key = 'db_id'", path=path)[0]
+
+def split_statements(script: str):
+    """SQLスクリプトを文ごとに分ける（トリガ本体の ; では切らない）。"""
+    buf = ""
+    for part in script.split(";"):
+        buf += part + ";"
+        if sqlite3.complete_statement(buf):
+            if buf.strip(" \n;"):
+                yield buf.strip()
+            buf = ""
+
+def migrate(conn, upto: int = SCHEMA_VERSION) -> list:
+    """conn（isolation_level=None）に未適用のマイグレーションを適用し、適用した版の一覧を返す。
+
+    版ごとに、SQLと user_version の更新を1つのトランザクションで流す。executescript は
+    実行前に暗黙にCOMMITするため使わない。書き込みロックを取ってから版を読み直すので、
+    同時に起動した別プロセスが適用済みの版は流さず、途中で落ちた版は丸ごと無かったことになる。
+    """
+    applied = []
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version, scripts in MIGRATIONS:
+        if version <= current or version > upto:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version <= current:
+                conn.execute("ROLLBACK")
+                continue
+            for sql in scripts:
+                if callable(sql):
+                    sql(conn)
+                    continue
+                for stmt in split_statements(sql):
+                    conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        current = version
+        applied.append(version)
+    return applied
+
+def init_db(path: str = DB_PATH) -> list:
+    """未適用のマイグレーションを順に適用し、適用した版の一覧を返す。"""
+    if schema_version(path) >= SCHEMA_VERSION:
+        return []
+    conn = open_connection(path)
+    conn.isolation_level = None
+    # 他プロセスのマイグレーション（バックフィルを含む）が終わるまで待つ
+    conn.execute(f"PRAGMA busy_timeout = {MIGRATION_BUSY_TIMEOUT_MS}")
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
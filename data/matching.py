@@ -0,0 +1,117 @@
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from data import db
+from data.db import DB_PATH, get_pool
+
+QUEUE_PAGE_SIZE = 100
+STATUS_LABELS = {"requested": "申請中", "approved": "承認済み", "connected": "接続済み", "rejected": "却下"}
+# 現在のステータス → 一括操作で移せるステータス
+TRANSITIONS = {"requested": ("approved", "rejected"), "approved": ("connected", "rejected")}
+QUEUE_STATUSES = tuple(TRANSITIONS)
+# SQLiteのバインド変数の上限（既定 999〜32766）に収まるよう IN 句を分割する
+IN_CHUNK = 500
+
+QUEUE_COLUMNS = (
+    "c.connection_id, c.timestamp, c.agency_id, a.agency_name, c.opportunity_id, "
+    "o.region, o.industry, o.need_level, c.status, c.fee_amount, c.incentive_amount, c.notes, c.version"
+)
+
+
+class TransitionError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class TransitionResult:
+    updated: tuple
+    conflicts: tuple   # 読み込み後に他の担当者が更新していた（version 不一致・削除済み）
+    invalid: tuple     # 現在のステータスからは移せない
+    db_ms: float
+
+
+# =============================================================================
+# Queue (idx_con_status を status → 申請日時の順に読む)
+# =============================================================================
+def queue_count(status: str, path: str = DB_PATH) -> int:
+    # 件数は connection_summary（トリガで差分更新）から取る
+    row = db.fetch_one("SELECT coalesce(SUM(n), 0) FROM connection_summary WHERE status = ?", (status,), path)
+    return int(row[0])
+
+
+def queue_page(status: str, page: int = 0, page_size: int = QUEUE_PAGE_SIZE, path: str = DB_PATH) -> pd.DataFrame:
+    """古い申請から順に1ページ分。version は一括操作の楽観的排他に使う。"""
+    return db.read_df(
+        f"SELECT {QUEUE_COLUMNS} FROM connections c "
+        f"LEFT JOIN agencies a ON a.agency_id = c.agency_id "
+        f"LEFT JOIN opportunities o ON o.opportunity_id = c.opportunity_id "
+        f"WHERE c.status = ? ORDER BY c.timestamp, c.connection_id LIMIT ? OFFSET ?",
+        (status, int(page_size), int(page) * int(page_size)),
+        path,
+    )
+
+
+def queue_keys(status: str, path: str = DB_PATH) -> list:
+    """キュー全件の (connection_id, version)。全件一括操作の対象を画面表示時点で固定する。"""
+    return db.fetch_all(
+        "SELECT connection_id, version FROM connections WHERE status = ? ORDER BY timestamp, connection_id",
+        (status,), path,
+    )
+
+
+# =============================================================================
+# Batched transitions
+# =============================================================================
+def _chunks(seq: list, n: int = IN_CHUNK):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+
+def apply_transition(items, status: str = None, incentive: int = None, path: str = DB_PATH) -> TransitionResult:
+    """items = [(connection_id, 読み込み時の version)] を1トランザクションでまとめて更新する。
+
+    BEGIN IMMEDIATE で書き込みロックを取ってから現在の version/status を読み直すため、
+    判定から更新までの間に他の担当者の更新が割り込むことはない。
+    """
+    if status is None and incentive is None:
+        raise TransitionError("ステータスか奨励金のどちらかを指定してください。")
+    sets, values = [], []
+    if status is not None:
+        sets.append("status = ?")
+        values.append(status)
+    if incentive is not None:
+        sets.append("incentive_amount = ?")
+        values.append(int(incentive))
+    sql = f"UPDATE connections SET {', '.join(sets)}, version = version + 1 WHERE connection_id = ? AND version = ?"
+
+    expected = {cid: int(ver) for cid, ver in items}
+    updated, conflicts, invalid = [], [], []
+    t0 = time.perf_counter()
+    with get_pool(path).connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = {}
+            for chunk in _chunks(list(expected)):
+                rows = conn.execute(
+                    f"SELECT connection_id, version, status FROM connections "
+                    f"WHERE connection_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                current.update((cid, (ver, state)) for cid, ver, state in rows)
+            for cid, ver in expected.items():
+                found = current.get(cid)
+                if found is None or found[0] != ver:
+                    conflicts.append(cid)
+                elif status is not None and status not in TRANSITIONS.get(found[1], ()):
+                    invalid.append(cid)
+                else:
+                    updated.append(cid)
+            conn.executemany(sql, [(*values, cid, expected[cid]) for cid in updated])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    db_ms = round((time.perf_counter() - t0) * 1000, 1)
+    return TransitionResult(tuple(updated), tuple(conflicts), tuple(invalid), db_ms)
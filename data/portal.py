@@ -0,0 +1,64 @@
+import pandas as pd
+
+from data import db
+from data.db import DB_PATH
+from data.matching import STATUS_LABELS
+
+HISTORY_PAGE_SIZE = 50
+
+# 企業奨励金は社内管理のため出さない。社名は接続済みの申請だけ開示する。
+HISTORY_COLUMNS = (
+    "c.connection_id, c.timestamp, c.opportunity_id, "
+    "CASE WHEN c.status = 'connected' THEN co.company_name END AS company_name, "
+    "o.region, o.industry, o.need_level, o.role, c.status, c.fee_amount, c.notes"
+)
+
+
+# =============================================================================
+# Summary (connection_summary を idx_con_summary_agency で引く)
+# =============================================================================
+def agency_status_counts(agency_id, path: str = DB_PATH) -> dict:
+    rows = db.fetch_all(
+        "SELECT status, SUM(n), SUM(fee_total) FROM connection_summary "
+        "WHERE agency_id = ? GROUP BY status HAVING SUM(n) > 0",
+        (agency_id or "",), path,
+    )
+    return {status: {"n": int(n), "fee_total": int(fee)} for status, n, fee in rows}
+
+
+# =============================================================================
+# History (idx_con_agency を新しい順に読むキーセット方式)
+# =============================================================================
+def agency_history(agency_id, before: tuple = None, page_size: int = HISTORY_PAGE_SIZE,
+                   path: str = DB_PATH) -> tuple:
+    """before = (timestamp, connection_id) より古い申請を page_size 件返す。
+
+    OFFSET を使わず直前ページの末尾から索引を読み進めるため、何ページ目でも
+    読む行数はページサイズ分だけ。戻り値は (DataFrame, 次ページの before または None)。
+    """
+    clauses, params = ["c.agency_id = ?"], [agency_id]
+    if before is not None:
+        clauses.append("(c.timestamp, c.connection_id) < (?, ?)")
+        params.extend(before)
+    df = db.read_df(
+        f"SELECT {HISTORY_COLUMNS} FROM connections c "
+        f"LEFT JOIN opportunities o ON o.opportunity_id = c.opportunity_id "
+        f"LEFT JOIN companies co ON co.company_id = o.company_id "
+        f"WHERE {' AND '.join(clauses)} "
+        f"ORDER BY c.timestamp DESC, c.connection_id DESC LIMIT ?",
+        (*params, int(page_size) + 1),
+        path,
+    )
+    if len(df) <= page_size:
+        return df, None
+    df = df.iloc[:page_size]
+    last = df.iloc[-1]
+    return df, (last["timestamp"], last["connection_id"])
+
+
+def status_label(status: str) -> str:
+    return STATUS_LABELS.get(status, status or "-")
+
+
+def with_labels(df: pd.DataFrame) -> pd.DataFrame:
+    return df.assign(status=df["status"].map(status_label))
@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from datetime import date
+
+import pandas as pd
+
+from data import db
+from data.cache import cached
+from data.db import DB_PATH, get_pool
+
+RANKS = ("A", "B", "C")
+PRICE_FIELDS = ("fee", "incentive")
+
+
+@dataclass(frozen=True)
+class Pricing:
+    version: int
+    effective_from: str
+    table: dict  # {ランク: {"fee": 料金, "incentive": 奨励金}}
+
+    def frame(self) -> pd.DataFrame:
+        """ランクを索引にした fee / incentive 列（検索結果への一括の対応付けに使う）。"""
+        return pd.DataFrame.from_dict(self.table, orient="index", columns=list(PRICE_FIELDS))
+
+
+# =============================================================================
+# Read (pricing 表の版が変わるか日付が変わるまでプロセス内で共有)
+# =============================================================================
+def _load(on: str, path: str) -> Pricing:
+    row = db.fetch_one(
+        "SELECT version, effective_from FROM pricing WHERE effective_from <= ? "
+        "ORDER BY effective_from DESC, version DESC LIMIT 1",
+        (on,), path,
+    )
+    if row is None:
+        return Pricing(0, "", {})
+    version, effective_from = row
+    rows = db.fetch_all("SELECT need_level, fee, incentive FROM pricing WHERE version = ?", (version,), path)
+    return Pricing(version, effective_from, {k: {"fee": fee, "incentive": inc} for k, fee, inc in rows})
+
+
+def current_pricing(path: str = DB_PATH, on: date = None) -> Pricing:
+    on = (on or date.today()).isoformat()
+    return cached(("pricing", on), ("pricing",), lambda: _load(on, path), path)
+
+
+def pricing_history(path: str = DB_PATH) -> pd.DataFrame:
+    return db.read_df(
+        "SELECT version, effective_from, need_level, fee, incentive, created_at FROM pricing "
+        "ORDER BY version DESC, need_level",
+        path=path,
+    )
+
+
+# =============================================================================
+# Write
+# =============================================================================
+def save_pricing(table: dict, effective_from: date = None, path: str = DB_PATH) -> int:
+    """全ランク分の料金を新しい版として追加し、その版番号を返す（既存の版は書き換えない）。"""
+    effective_from = (effective_from or date.today()).isoformat()
+    with get_pool(path).connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("SELECT coalesce(MAX(version), 0) + 1 FROM pricing").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO pricing (version, need_level, fee, incentive, effective_from) VALUES (?, ?, ?, ?, ?)",
+                [(version, k, int(v["fee"]), int(v["incentive"]), effective_from) for k, v in table.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return version
+
+
+# =============================================================================
+# Vectorized mapping
+# =============================================================================
+def price_columns(need_level: pd.Series, pricing: Pricing) -> pd.DataFrame:
+    """need_level 列から fee / incentive 列を1回の結合で求める（未設定のランクは NaN）。"""
+    return pricing.frame().reindex(need_level.astype(object).to_numpy()).set_index(need_level.index)
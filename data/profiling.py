@@ -0,0 +1,216 @@
+"""再実行ごとの処理時間と、接続プール経由のSQLの計測（既定では無効）。
+
+    HC_PROFILE=1 streamlit run streamlit_app.py   # 起動時から有効にする
+    HC_SLOW_QUERY_MS=50                           # スロークエリとみなす閾値（ms）
+
+Adminの「診断」タブからも有効化・閾値変更・JSON Lines 出力ができる。
+計測はスレッドごとの「実行中の再実行」に紐づけ、ページごとにリングバッファで保持する。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+PROFILE_ENV = "HC_PROFILE"
+SLOW_MS_ENV = "HC_SLOW_QUERY_MS"
+MAX_PARAMS_CHARS = 200
+
+
+def _short(params) -> str:
+    text = repr(params)
+    return text if len(text) <= MAX_PARAMS_CHARS else text[:MAX_PARAMS_CHARS] + "…"
+
+
+# =============================================================================
+# Profiler
+# =============================================================================
+class Profiler:
+    """再実行（ページ単位）のフェーズ時間とSQLを集める。
+
+    フェーズは mark(name) を呼んだ区間で区切る（前回の mark からの経過時間を name に計上）。
+    """
+
+    def __init__(self, enabled: bool = False, slow_ms: float = 100.0, max_runs: int = 50,
+                 max_slow: int = 200, max_queries_per_run: int = 500):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.max_runs = max_runs
+        self.max_queries_per_run = max_queries_per_run
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._runs = {}  # page -> deque[run]
+        self._slow = deque(maxlen=max_slow)
+
+    # ---- runs ---------------------------------------------------------------
+    def begin_run(self, page: str):
+        # st.rerun() 等で end_run に届かなかった前回分は捨てる
+        self._local.run = None
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._local.run = {
+            "page": page,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "_t0": now,
+            "_lap": now,
+            "phases": [],
+            "queries": [],
+        }
+
+    def mark(self, name: str):
+        run = getattr(self._local, "run", None)
+        if run is None:
+            return
+        now = time.perf_counter()
+        run["phases"].append((name, round((now - run["_lap"]) * 1000, 2)))
+        run["_lap"] = now
+
+    def end_run(self):
+        run = getattr(self._local, "run", None)
+        self._local.run = None
+        if run is None:
+            return
+        run["total_ms"] = round((time.perf_counter() - run.pop("_t0")) * 1000, 2)
+        run.pop("_lap")
+        with self._lock:
+            self._runs.setdefault(run["page"], deque(maxlen=self.max_runs)).append(run)
+
+    # ---- queries ------------------------------------------------------------
+    def start_query(self, sql: str, params):
+        run = getattr(self._local, "run", None)
+        rec = {"sql": sql, "params": _short(params), "ms": 0.0, "rows": 0, "plan": None}
+        if run is not None:
+            rec["page"] = run["page"]
+            if len(run["queries"]) < self.max_queries_per_run:
+                run["queries"].append(rec)
+        return rec
+
+    def is_slow(self, rec: dict) -> bool:
+        return rec["plan"] is None and rec["ms"] >= self.slow_ms
+
+    def log_slow(self, rec: dict, plan: list):
+        rec["plan"] = plan
+        rec["logged_at"] = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._slow.append(rec)
+
+    # ---- reading ------------------------------------------------------------
+    def pages(self) -> list:
+        with self._lock:
+            return sorted(self._runs)
+
+    def runs(self, page: str = None) -> list:
+        with self._lock:
+            if page is not None:
+                return list(self._runs.get(page, ()))
+            return [r for runs in self._runs.values() for r in runs]
+
+    def slow_queries(self) -> list:
+        with self._lock:
+            return list(self._slow)
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+            self._slow.clear()
+
+    def to_jsonl(self) -> str:
+        lines = [json.dumps(dict(r, type="run"), ensure_ascii=False) for r in self.runs()]
+        lines += [json.dumps(dict(q, type="slow_query"), ensure_ascii=False) for q in self.slow_queries()]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+
+PROFILER = Profiler(
+    enabled=os.environ.get(PROFILE_ENV) == "1",
+    slow_ms=float(os.environ.get(SLOW_MS_ENV, 100)),
+)
+
+
+# =============================================================================
+# SQLite hooks (接続プールの接続に使う)
+# =============================================================================
+class ProfiledCursor(sqlite3.Cursor):
+    """execute〜fetch までの時間と取得行数を計測する。無効時はフラグを見るだけ。
+
+    SQLiteは結果を取り出しながら実行するため、fetch* の時間も同じSQLに計上する。
+    """
+
+    _rec = None
+    _params = ()
+
+    def execute(self, sql, params=()):
+        if not PROFILER.enabled:
+            self._rec = None
+            return super().execute(sql, params)
+        self._rec = PROFILER.start_query(sql, params)
+        self._params = params
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._done(t0, max(self.rowcount, 0))
+
+    def executemany(self, sql, seq):
+        if not PROFILER.enabled:
+            self._rec = None
+            return super().executemany(sql, seq)
+        self._rec = PROFILER.start_query(sql, "<executemany>")
+        self._params = None  # 行ごとに値が違うので、実行計画はバインドなしで試みる
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq)
+        finally:
+            self._done(t0, max(self.rowcount, 0))
+
+    def fetchone(self):
+        if self._rec is None:
+            return super().fetchone()
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._done(t0, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        if self._rec is None:
+            return super().fetchmany(self.arraysize if size is None else size)
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._done(t0, len(rows))
+        return rows
+
+    def fetchall(self):
+        if self._rec is None:
+            return super().fetchall()
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._done(t0, len(rows))
+        return rows
+
+    def _done(self, t0: float, rows: int):
+        rec = self._rec
+        rec["ms"] = round(rec["ms"] + (time.perf_counter() - t0) * 1000, 3)
+        rec["rows"] += rows
+        if PROFILER.is_slow(rec):
+            PROFILER.log_slow(rec, self._plan(rec["sql"]))
+
+    def _plan(self, sql: str) -> list:
+        try:
+            cur = sqlite3.Cursor(self.connection)
+            return [row[-1] for row in cur.execute(f"EXPLAIN QUERY PLAN {sql}", self._params or ()).fetchall()]
+        except sqlite3.Error as e:
+            return [f"(実行計画を取得できません: {e})"]
+
+
+class ProfiledConnection(sqlite3.Connection):
+    # Connection.execute は cursor() を経由しないため、ここで ProfiledCursor に寄せる
+    def cursor(self, factory=None):
+        return super().cursor(factory or ProfiledCursor)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from data import db
+from data.cache import cached
+from data.catalog import ALL, PAGE_SIZE, CatalogFilter, keyword_rowids
+from data.catalog_store import CATEGORY_COLUMNS, get_catalog_store
+from data.db import DB_PATH
+from data.init_db import AFFINITY_FACETS as FACETS
+
+FACET_WEIGHTS = {"region": 1.0, "industry": 1.0, "need_level": 0.5}
+# 履歴の少ない派遣会社は全体の傾向（人気度）に寄せる。値は擬似的な申請件数。
+PRIOR_STRENGTH = 5.0
+
+
+# =============================================================================
+# Affinity model
+# =============================================================================
+class AffinityModel:
+    """派遣会社ごとの地域・業種・ランク別の親和度ベクトル。
+
+    vectors[facet] は (派遣会社数 + 1, カテゴリ数) の行列で、最終行は履歴のない
+    派遣会社向けの全体分布。列の並びは作成時のカタログストアのカテゴリ順（categories）と一致する。
+    """
+
+    def __init__(self, agency_index: dict, vectors: dict, categories: dict):
+        self.agency_index = agency_index
+        self.vectors = vectors
+        self.categories = categories
+
+    def fits(self, frame: pd.DataFrame) -> bool:
+        """frame のカテゴリ順がこのモデルの列の並びと同じか。"""
+        return all(self.categories[facet].equals(frame[facet].cat.categories) for facet in FACETS)
+
+    def row(self, agency_id) -> int:
+        return self.agency_index.get(agency_id, len(self.agency_index))
+
+    def score(self, frame: pd.DataFrame, agency_id, rows: np.ndarray) -> np.ndarray:
+        """rows の案件のスコアを、カテゴリコードで親和度ベクトルを引くだけで求める。"""
+        r = self.row(agency_id)
+        scores = np.zeros(len(rows), dtype=np.float32)
+        for facet in FACETS:
+            codes = frame[facet].cat.codes.to_numpy()[rows]
+            # 末尾に0を足しておくと、欠損（コード -1）はその0を引く
+            vec = np.append(self.vectors[facet][r], 0.0).astype(np.float32)
+            scores += FACET_WEIGHTS[facet] * vec[codes]
+        return scores
+
+
+def build_model(frame: pd.DataFrame, path: str = DB_PATH) -> AffinityModel:
+    """agency_affinity（申請の書き込み時にトリガで加算済み）から親和度を作る。
+
+    読むのは 派遣会社数 × カテゴリ数 の行だけなので、申請件数には依存しない。
+    """
+    aff = db.read_df("SELECT agency_id, facet, value, weight FROM agency_affinity", path=path)
+    agencies = sorted(aff["agency_id"].unique().tolist())
+    agency_index = {a: i for i, a in enumerate(agencies)}
+
+    vectors, categories = {}, {}
+    for facet in FACETS:
+        cats = categories[facet] = frame[facet].cat.categories
+        part = aff[aff["facet"] == facet]
+        m = np.zeros((len(agencies), len(cats)))
+        codes = pd.Categorical(part["value"], categories=cats).codes
+        ok = codes >= 0
+        a_idx = part["agency_id"].map(agency_index).to_numpy(dtype=np.int64)
+        np.add.at(m, (a_idx[ok], codes[ok]), part["weight"].to_numpy(dtype=np.float64)[ok])
+        m = np.clip(m, 0.0, None)
+        # 全体分布は案件数の分布と申請履歴の合計を足し合わせたもの
+        supply = frame[facet].value_counts(sort=False).reindex(cats).to_numpy(dtype=np.float64)
+        overall = m.sum(axis=0) + supply
+        overall = overall / overall.sum() if overall.sum() else overall
+        affinity = (m + PRIOR_STRENGTH * overall) / (m.sum(axis=1, keepdims=True) + PRIOR_STRENGTH)
+        vectors[facet] = np.vstack([affinity, overall])
+    return AffinityModel(agency_index, vectors, categories)
+
+
+MODEL_TABLES = ("connections", "opportunities", "companies")
+
+
+def get_model(path: str = DB_PATH) -> tuple:
+    """カタログストアの列と、それに対応する親和度モデルを返す（DBのパスとデータ版でキャッシュ）。"""
+    store = get_catalog_store(path)
+    # モデルは版を読んだ後の列から作るので、キャッシュにあるモデルがその版より古いことはない
+    model = cached("affinity_model", MODEL_TABLES, lambda: build_model(store.frame(), path), path)
+    frame = store.frame()
+    if not model.fits(frame):
+        # 作成後に書き込みがあり列のカテゴリが増減した（次のデータ版で作り直される）
+        model = build_model(frame, path)
+    return frame, model
+
+
+# =============================================================================
+# Ranking
+# =============================================================================
+def filter_mask(frame: pd.DataFrame, f: CatalogFilter, path: str = DB_PATH) -> np.ndarray:
+    # 人数がNULLの案件は -1（MISSING_HEADCOUNT）なので、SQL と同じくどの下限でも外れる
+    mask = frame["headcount_needed"].to_numpy() >= max(int(f.headcount_min), 0)
+    for facet in FACETS:
+        value = getattr(f, facet)
+        if value != ALL:
+            mask &= (frame[facet] == value).to_numpy()
+    if f.keyword.strip():
+        # キーワードは全文索引で一致rowidを引き、rowid昇順に並んだ列から位置を二分探索する
+        rowids = frame["rowid"].to_numpy()
+        hits = np.asarray(keyword_rowids(f.keyword, path), dtype=rowids.dtype)
+        pos = np.searchsorted(rowids, hits)
+        pos = pos[(pos < len(rowids)) & (rowids[np.minimum(pos, len(rowids) - 1)] == hits)]
+        kw_mask = np.zeros(len(frame), dtype=bool)
+        kw_mask[pos] = True
+        mask &= kw_mask
+    return mask
+
+
+def recommend_page(f: CatalogFilter, agency_id, page: int = 0, page_size: int = PAGE_SIZE,
+                   path: str = DB_PATH) -> tuple:
+    """条件に合う案件をおすすめ度順に並べ、指定ページと総件数を返す。
+
+    全件を並べ替えず、argpartition で上位 (page+1)*page_size 件だけ選んでから整列する。
+    """
+    frame, model = get_model(path)
+    mask = filter_mask(frame, f, path)
+    candidates = np.flatnonzero(mask)
+    total = len(candidates)
+    k = min(total, (page + 1) * page_size)
+    if k == 0:
+        return frame.iloc[0:0].astype({c: object for c in CATEGORY_COLUMNS}), 0
+    scores = model.score(frame, agency_id, candidates)
+    top = np.argpartition(-scores, k - 1)[:k] if k < total else np.arange(total)
+    # スコア降順、同点は格納順（位置の昇順）
+    top = top[np.lexsort((candidates[top], -scores[top]))]
+    rows = candidates[top][page * page_size:k]
+    view = frame.iloc[rows].astype({c: object for c in CATEGORY_COLUMNS})
+    return view.reset_index(drop=True), total
@@ -0,0 +1,35 @@
+"""プロセスに1つだけ持つ資源（接続プール・キャッシュ・ライタなど）。
+
+画面（Streamlit）と検索API・CLIで同じものを使うため、Streamlit には依存しない。
+"""
+import functools
+import inspect
+import threading
+
+
+def process_resource(fn):
+    """引数の組ごとに fn を1回だけ呼び、その結果をプロセス内の全スレッドで共有する。
+
+    st.cache_resource と同じ使い方（省略した引数は既定値で埋めてから比べる）。
+    作成中に同じ引数で呼んだスレッドは、作成が終わるまで待って同じものを受け取る。
+    """
+    signature = inspect.signature(fn)
+    lock = threading.Lock()
+    resources = {}
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = tuple(bound.arguments.items())
+        with lock:
+            if key not in resources:
+                resources[key] = fn(*args, **kwargs)
+            return resources[key]
+
+    def clear():
+        with lock:
+            resources.clear()
+
+    wrapper.clear = clear
+    return wrapper
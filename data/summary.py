@@ -0,0 +1,45 @@
+import pandas as pd
+
+from data import db
+from data.db import DB_PATH
+
+RANKS = ("A", "B", "C")
+RECENT_PAGE_SIZE = 100
+SUMMARY_DIMENSIONS = {"status": "status", "agency": "agency_id", "day": "day"}
+
+
+# =============================================================================
+# Aggregates (opp_rank_summary / connection_summary はトリガで差分更新される)
+# =============================================================================
+def rank_counts(path: str = DB_PATH) -> dict:
+    rows = dict(db.fetch_all("SELECT need_level, n FROM opp_rank_summary", path=path))
+    return {k: int(rows.get(k, 0)) for k in RANKS}
+
+
+def connection_totals(path: str = DB_PATH) -> dict:
+    n, fee, inc = db.fetch_one(
+        "SELECT coalesce(SUM(n), 0), coalesce(SUM(fee_total), 0), coalesce(SUM(incentive_total), 0) "
+        "FROM connection_summary",
+        path=path,
+    )
+    return {"connections": int(n), "fee_total": int(fee), "incentive_total": int(inc)}
+
+
+def connections_by(dimension: str, path: str = DB_PATH) -> pd.DataFrame:
+    col = SUMMARY_DIMENSIONS[dimension]
+    return db.read_df(
+        f"SELECT {col}, SUM(n) AS n, SUM(fee_total) AS fee_total, SUM(incentive_total) AS incentive_total "
+        f"FROM connection_summary GROUP BY {col} HAVING SUM(n) > 0 ORDER BY {col}",
+        path=path,
+    )
+
+
+# =============================================================================
+# Recent connections (idx_con_timestamp を逆順に読む)
+# =============================================================================
+def recent_connections(page: int = 0, page_size: int = RECENT_PAGE_SIZE, path: str = DB_PATH) -> pd.DataFrame:
+    return db.read_df(
+        "SELECT * FROM connections ORDER BY timestamp DESC, connection_id DESC LIMIT ? OFFSET ?",
+        (int(page_size), int(page) * int(page_size)),
+        path,
+    )
@@ -0,0 +1,192 @@
+"""負荷検証用の合成データを生成するCLI。
+
+    python -m data.synthetic --opportunities 1000000 --db data/bench.db
+
+地域・業種・職種・ランクの分布は data/*.csv のサンプルに近づけてある。
+行はチャンクごとにnumpyでまとめて作り、bulk_import と同じ手順
+（二次索引と全文索引の同期を外す → executemany → 再作成）で書き込む。
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from data.bulk_import import (
+    BULK_PRAGMAS, drop_secondary_indexes, rebuild_indexes, resume_fts_sync, suspend_fts_sync,
+    table_columns, to_rows, upsert_sql,
+)
+from data.db import open_connection
+from data.init_db import init_db
+
+BENCH_DB_PATH = "data/bench.db"
+
+# 製造・物流の就業者数が多い都府県ほど案件が多い
+REGIONS = {
+    "愛知県": 14, "東京都": 12, "大阪府": 11, "神奈川県": 10, "埼玉県": 8, "千葉県": 7,
+    "静岡県": 6, "兵庫県": 6, "福岡県": 5, "岐阜県": 4, "三重県": 4, "茨城県": 4,
+    "群馬県": 3, "栃木県": 3, "広島県": 3, "北海道": 3, "宮城県": 2, "京都府": 2,
+}
+INDUSTRIES = {
+    "物流倉庫": 16, "自動車部品": 14, "食品製造": 12, "電子部品": 10, "機械加工": 10,
+    "製紙": 8, "印刷・包装": 8, "介護施設": 8, "建材": 7, "化学": 7,
+}
+ROLES = {
+    "組立・検査": 17, "設備保全": 15, "機械オペ": 14, "ピッキング": 13, "介護補助": 10,
+    "清掃": 9, "フォークリフト": 11, "梱包": 11,
+}
+NEED_LEVELS = {"A": 38, "B": 40, "C": 24}
+HEADCOUNTS = {1: 20, 2: 21, 3: 24, 5: 16, 10: 21}
+STATUSES = {"requested": 60, "approved": 25, "rejected": 10, "connected": 5}
+FEES = {"A": 100000, "B": 50000, "C": 20000}
+
+NAME_PREFIX = ["新星", "関西", "東海", "京浜", "名港", "第一", "北陸", "中部", "湾岸", "大和", "日東", "三和"]
+NAME_SUFFIX = ["物流", "技研", "食品", "テック", "製作", "紙業", "化成", "工業", "精機", "包装"]
+SHIFTS = ["日勤", "2交替", "3交替", "夜勤"]
+EXPERIENCE = ["経験不問", "経験必須", "経験者優遇", "未経験OK"]
+STARTS = ["即日〜1ヶ月内", "即日〜3ヶ月内", "即日〜半年内"]
+
+
+def _choice(rng, weights: dict, n: int) -> np.ndarray:
+    keys = np.array(list(weights.keys()), dtype=object)
+    p = np.array(list(weights.values()), dtype=float)
+    return keys[rng.choice(len(keys), size=n, p=p / p.sum())]
+
+
+def _ids(prefix: str, start: int, n: int, width: int) -> np.ndarray:
+    return np.char.add(prefix, np.char.zfill(np.arange(start, start + n).astype(str), width)).astype(object)
+
+
+# =============================================================================
+# Chunk generators (1チャンク = 1つのDataFrame)
+# =============================================================================
+def gen_companies(rng, start: int, n: int) -> pd.DataFrame:
+    names = (
+        np.array(NAME_PREFIX, dtype=object)[rng.integers(0, len(NAME_PREFIX), n)]
+        + np.array(NAME_SUFFIX, dtype=object)[rng.integers(0, len(NAME_SUFFIX), n)]
+        + "（株）"
+    )
+    return pd.DataFrame({"company_id": _ids("C", start, n, 7), "company_name": names})
+
+
+def gen_agencies(rng, start: int, n: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "agency_id": _ids("A", start, n, 5),
+        "agency_name": np.char.add("派遣会社", np.char.zfill(np.arange(start, start + n).astype(str), 5)).astype(object),
+    })
+
+
+def gen_opportunities(rng, start: int, n: int, n_companies: int) -> pd.DataFrame:
+    role = _choice(rng, ROLES, n)
+    req = (
+        role
+        + np.array(EXPERIENCE, dtype=object)[rng.integers(0, len(EXPERIENCE), n)]
+        + "。シフト:" + np.array(SHIFTS, dtype=object)[rng.integers(0, len(SHIFTS), n)]
+        + "。" + np.array(STARTS, dtype=object)[rng.integers(0, len(STARTS), n)]
+        + "に開始希望。"
+    )
+    # 企業ごとの案件数は偏る（少数の大口企業が多くの案件を出す）
+    company = np.minimum(rng.zipf(1.3, n), n_companies) - 1
+    return pd.DataFrame({
+        "opportunity_id": _ids("O", start, n, 8),
+        "company_id": _ids("C", 0, n_companies, 7)[company],
+        "region": _choice(rng, REGIONS, n),
+        "industry": _choice(rng, INDUSTRIES, n),
+        "need_level": _choice(rng, NEED_LEVELS, n),
+        "role": role,
+        "headcount_needed": _choice(rng, HEADCOUNTS, n).astype(np.int64),
+        "requirements": req,
+    })
+
+
+def gen_connections(rng, start: int, n: int, n_agencies: int, n_opps: int, days: int) -> pd.DataFrame:
+    now = datetime.utcnow()
+    offsets = rng.integers(0, days * 86400, n)
+    ts = pd.to_datetime(now - timedelta(days=days)) + pd.to_timedelta(offsets, unit="s")
+    level = _choice(rng, NEED_LEVELS, n)
+    return pd.DataFrame({
+        "connection_id": _ids("CN_SYN", start, n, 10),
+        "timestamp": ts.strftime("%Y-%m-%dT%H:%M:%S").astype(object),
+        "agency_id": _ids("A", 0, n_agencies, 5)[np.minimum(rng.zipf(1.5, n), n_agencies) - 1],
+        "opportunity_id": _ids("O", 0, n_opps, 8)[rng.integers(0, n_opps, n)],
+        "status": _choice(rng, STATUSES, n),
+        "fee_amount": pd.Series(level).map(FEES).to_numpy(),
+        "incentive_amount": None,
+        "notes": "",
+    })
+
+
+# =============================================================================
+# Writing
+# =============================================================================
+def _write(conn, table: str, chunks, log):
+    _, pk = table_columns(conn, table)
+    index_sql = drop_secondary_indexes(conn, table)
+    trigger_sql = suspend_fts_sync(conn, table)
+    total, t0 = 0, time.perf_counter()
+    for df in chunks:
+        cols = list(df.columns)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(upsert_sql(table, cols, pk), to_rows(df, cols))
+        conn.execute("COMMIT")
+        total += len(df)
+    rebuild_indexes(conn, index_sql, table)
+    resume_fts_sync(conn, table, trigger_sql)
+    dt = time.perf_counter() - t0
+    log(f"{table}: {total:,} rows in {dt:.1f}s ({total / dt if dt else 0:,.0f} rows/sec)")
+
+
+def _chunked(n: int, chunk: int):
+    for start in range(0, n, chunk):
+        yield start, min(chunk, n - start)
+
+
+def generate(db_path: str = BENCH_DB_PATH, opportunities: int = 10000, companies: int = None,
+             agencies: int = None, connections: int = None, days: int = 90,
+             chunk_size: int = 100000, seed: int = 0, log=print) -> dict:
+    companies = companies or max(10, opportunities // 10)
+    agencies = agencies or max(5, opportunities // 1000)
+    connections = opportunities // 2 if connections is None else connections
+    rng = np.random.default_rng(seed)
+
+    init_db(db_path)
+    conn = open_connection(db_path)
+    conn.isolation_level = None
+    for name, value in BULK_PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    try:
+        _write(conn, "companies", (gen_companies(rng, s, k) for s, k in _chunked(companies, chunk_size)), log)
+        _write(conn, "agencies", (gen_agencies(rng, s, k) for s, k in _chunked(agencies, chunk_size)), log)
+        _write(conn, "opportunities", (
+            gen_opportunities(rng, s, k, companies) for s, k in _chunked(opportunities, chunk_size)
+        ), log)
+        _write(conn, "connections", (
+            gen_connections(rng, s, k, agencies, opportunities, days) for s, k in _chunked(connections, chunk_size)
+        ), log)
+    finally:
+        conn.close()
+    return {"opportunities": opportunities, "companies": companies, "agencies": agencies, "connections": connections}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="合成データを生成して SQLite に書き込む")
+    ap.add_argument("--db", default=BENCH_DB_PATH)
+    ap.add_argument("--opportunities", type=int, default=10000)
+    ap.add_argument("--companies", type=int, default=None)
+    ap.add_argument("--agencies", type=int, default=None)
+    ap.add_argument("--connections", type=int, default=None)
+    ap.add_argument("--days", type=int, default=90, help="申請日時を散らす日数")
+    ap.add_argument("--chunk-size", type=int, default=100000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    generate(
+        args.db, args.opportunities, args.companies, args.agencies, args.connections,
+        args.days, args.chunk_size, args.seed,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
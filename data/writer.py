@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from data.db import DB_PATH, open_connection
+from data.resources import process_resource
+
+# =============================================================================
+# IDs
+# =============================================================================
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def _b32(value: int, length: int) -> str:
+    out = []
+    for _ in range(length):
+        value, r = divmod(value, 32)
+        out.append(CROCKFORD[r])
+    return "".join(reversed(out))
+
+
+class MonotonicULID:
+    """ULID（48bitミリ秒 + 80bit乱数、Crockford base32 26文字）の単調増加版。
+
+    同じミリ秒内では乱数部を+1して、同一プロセス内で必ず昇順・一意になる。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_rand = 0
+
+    def new(self) -> str:
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms <= self._last_ms:
+                ms = self._last_ms
+                self._last_rand += 1
+            else:
+                self._last_rand = int.from_bytes(os.urandom(10), "big") >> 1
+            self._last_ms = ms
+            return _b32(ms, 10) + _b32(self._last_rand, 16)
+
+
+_ULID = MonotonicULID()
+
+
+def new_connection_id() -> str:
+    return f"CN_{_ULID.new()}"
+
+
+# =============================================================================
+# Background writer (group commit)
+# =============================================================================
+class BatchWriter:
+    """書き込みを1本の専用スレッド・専用接続に集約し、まとめてコミットする。
+
+    submit() は Future を返す。1件ずつ SAVEPOINT で囲むため、失敗した行だけが
+    例外として呼び出し元に返り、同じバッチの他の行はコミットされる。
+    """
+
+    def __init__(self, path: str = DB_PATH, max_batch: int = 256, max_delay: float = 0.005):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="hc-batch-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params=()) -> Future:
+        fut: Future = Future()
+        self._queue.put((sql, tuple(params), fut))
+        return fut
+
+    def submit_insert(self, table: str, row: dict) -> Future:
+        columns = ",".join(row.keys())
+        placeholders = ",".join(["?"] * len(row))
+        return self.submit(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", list(row.values()))
+
+    def _drain(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = open_connection(self.path)
+        conn.isolation_level = None  # BEGIN/COMMIT を自前で発行する
+        while True:
+            batch = self._drain()
+            results = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, params, fut in batch:
+                    conn.execute("SAVEPOINT w")
+                    try:
+                        results.append((fut, conn.execute(sql, params).rowcount, None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO w")
+                        results.append((fut, None, e))
+                    conn.execute("RELEASE w")
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                results = [(fut, None, e) for _, _, fut in batch]
+            with self._lock:
+                self.batches += 1
+                for fut, rowcount, err in results:
+                    if err is None:
+                        self.writes += 1
+                        fut.set_result(rowcount)
+                    else:
+                        self.errors += 1
+                        fut.set_exception(err)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "writes": self.writes,
+                "errors": self.errors,
+                "pending": self._queue.qsize(),
+                "avg_batch": self.writes / self.batches if self.batches else 0.0,
+            }
+
+
+@process_resource
+def get_writer(path: str = DB_PATH) -> BatchWriter:
+    return BatchWriter(path)
+
+
+def write(sql: str, params=(), path: str = DB_PATH, timeout: float = 10.0) -> int:
+    """バックグラウンドライタ経由で1文を実行し、コミット完了まで待つ。"""
+    return get_writer(path).submit(sql, params).result(timeout=timeout)
+
+
+def insert(table: str, row: dict, path: str = DB_PATH, timeout: float = 10.0) -> int:
+    return get_writer(path).submit_insert(table, row).result(timeout=timeout)
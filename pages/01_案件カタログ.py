@@ -1,22 +1,22 @@
 
 import streamlit as st
-import pandas as pd
-import os
 
-st.set_page_config(page_title="案件カタログ", page_icon="📚", layout="wide")
-
-DATA_DIR = "data"
-OPP_CSV = os.path.join(DATA_DIR, "opportunities.csv")
-COM_CSV = os.path.join(DATA_DIR, "companies.csv")
+from data.bootstrap import ensure_db
+from data.catalog_store import MISSING_HEADCOUNT, get_catalog_store
+from data.profiling import PROFILER
 
-@st.cache_data
-def load_df(path):
-    return pd.read_csv(path)
+st.set_page_config(page_title="案件カタログ", page_icon="📚", layout="wide")
+PROFILER.begin_run("案件カタログ")
+ensure_db()  # このページから開いた場合もスキーマ・マイグレーションを済ませておく
 
 st.title("📚 案件カタログ（詳細編集は今後実装）")
 st.caption("フィルタ・並べ替えで案件を確認できます。")
 
-opp_df = load_df(OPP_CSV)
-com_df = load_df(COM_CSV)
-view = opp_df.merge(com_df, on="company_id", how="left")
-st.dataframe(view, use_container_width=True)
+# トップページと同じプロセス共有の列型カタログ（Arrowスナップショット）を表示する
+view = get_catalog_store().frame()
+# 人数のNULL（-1）は空欄で表示する（置き換えるのはこの1列だけ）
+view = view.assign(headcount_needed=view["headcount_needed"].astype("Int32").mask(lambda s: s == MISSING_HEADCOUNT))
+PROFILER.mark("load")
+st.dataframe(view, column_order=[c for c in view.columns if c != "rowid"], use_container_width=True)
+PROFILER.mark("render")
+PROFILER.end_run()
@@ -1,26 +1,57 @@
-
 import streamlit as st
-import pandas as pd
-import os
-
-st.set_page_config(page_title="派遣会社ポータル", page_icon="🏢", layout="wide")
 
-DATA_DIR = "data"
-AGY_CSV = os.path.join(DATA_DIR, "agencies.csv")
-CON_CSV = os.path.join(DATA_DIR, "connections.csv")
+from data.bootstrap import agency_options, ensure_db
+from data.export import portal_source
+from data.portal import HISTORY_PAGE_SIZE, agency_history, agency_status_counts, status_label, with_labels
+from data.profiling import PROFILER
+from ui.exports import render_export
 
-@st.cache_data
-def load_df(path):
-    return pd.read_csv(path)
+st.set_page_config(page_title="派遣会社ポータル", page_icon="🏢", layout="wide")
+PROFILER.begin_run("派遣会社ポータル")
+ensure_db()
 
 st.title("🏢 派遣会社ポータル")
 st.caption("自社の接続申請履歴を確認できます。")
 
-agy_df = load_df(AGY_CSV)
-con_df = pd.read_csv(CON_CSV) if os.path.exists(CON_CSV) else pd.DataFrame()
-
-agency = st.selectbox("派遣会社を選択", agy_df["agency_name"].tolist())
-aid = agy_df.loc[agy_df["agency_name"]==agency, "agency_id"].iloc[0]
+ss = st.session_state
+agencies = agency_options()
+if not agencies:
+    st.info("派遣会社マスタ（agenciesテーブル）が空です。")
+    st.stop()
+ids = list(agencies.values())
+current = ss.get("selected_agency")
+agency = st.selectbox(
+    "派遣会社を選択", list(agencies),
+    index=ids.index(current) if current in ids else 0,
+    disabled=ss.get("role") == "Agency",  # Agencyロールはトップページで選んだ自社のみ
+)
+aid = agencies[agency]
+PROFILER.mark("agency")
+
+# ==== Summary ================================================================
+counts = agency_status_counts(aid)
+cols = st.columns(max(1, len(counts)) + 1)
+cols[0].metric("申請（累計）", f"{sum(c['n'] for c in counts.values()):,}")
+for col, (status, c) in zip(cols[1:], sorted(counts.items())):
+    col.metric(status_label(status), f"{c['n']:,}")
+PROFILER.mark("summary")
+
+# ==== History ================================================================
+# 表示中ページの先頭位置（before）を積んでおき、「新しい申請へ」で1つ戻る
+cursor_key = f"portal_cursors_{aid}"
+cursors = ss.setdefault(cursor_key, [None])
+history, next_before = agency_history(aid, cursors[-1])
 
 st.subheader("接続申請履歴")
-st.dataframe(con_df[con_df["agency_id"]==aid].sort_values("timestamp", ascending=False), use_container_width=True)
+st.dataframe(with_labels(history), hide_index=True, use_container_width=True)
+n1, n2, n3 = st.columns([1, 1, 4])
+if n1.button("← 新しい申請へ", disabled=len(cursors) == 1):
+    cursors.pop()
+    st.rerun()
+if n2.button("古い申請へ →", disabled=next_before is None):
+    cursors.append(next_before)
+    st.rerun()
+n3.caption(f"{len(cursors)}ページ目（{HISTORY_PAGE_SIZE}件ずつ・新しい順）")
+render_export(portal_source(aid), "export_history", "申請履歴（全件）をファイルに出力")
+PROFILER.mark("history")
+PROFILER.end_run()
@@ -1,19 +1,96 @@
-
 import streamlit as st
-import pandas as pd
-import os
 
-st.set_page_config(page_title="マッチング管理", page_icon="🤝", layout="wide")
+from data.bootstrap import ensure_db
+from data.export import queue_source
+from data.matching import (
+    QUEUE_PAGE_SIZE, QUEUE_STATUSES, STATUS_LABELS, TRANSITIONS, apply_transition, queue_count, queue_keys,
+    queue_page,
+)
+from data.profiling import PROFILER
+from ui.exports import render_export
 
-DATA_DIR = "data"
-CON_CSV = os.path.join(DATA_DIR, "connections.csv")
+st.set_page_config(page_title="マッチング管理", page_icon="🤝", layout="wide")
+PROFILER.begin_run("マッチング管理")
+ensure_db()
 
 st.title("🤝 マッチング管理（社内用）")
-st.caption("接続申請の承認・却下・メモを管理（簡易版）。")
-
-if not os.path.exists(CON_CSV):
-    st.info("接続履歴がありません。トップページから申請を作成してください。")
-else:
-    con_df = pd.read_csv(CON_CSV)
-    st.dataframe(con_df, use_container_width=True)
-    st.write("※ 本ページはPoCのため閲覧のみ。今後、承認/請求/奨励金支払の状態管理を追加予定。")
+st.caption("接続申請の承認・却下・奨励金の設定をまとめて行えます。")
+
+ss = st.session_state
+if ss.get("role") == "Agency":
+    st.warning("このページは社内（Admin）専用です。トップページのサイドバーでロールを切り替えてください。")
+    st.stop()
+
+ss.setdefault("queue_nonce", 0)  # 一括操作のあとに選択状態をリセットするための連番
+if "queue_result" in ss:
+    level, message = ss.pop("queue_result")
+    getattr(st, level)(message)
+
+# ==== Queue ==================================================================
+status = st.radio(
+    "キュー", QUEUE_STATUSES, horizontal=True,
+    format_func=lambda s: f"{STATUS_LABELS[s]}（{queue_count(s):,}件）",
+)
+total = queue_count(status)
+n_pages = max(1, -(-total // QUEUE_PAGE_SIZE))
+page = 0
+if n_pages > 1:
+    page = st.number_input(f"ページ（全{n_pages}ページ・古い順）", min_value=1, max_value=n_pages, value=1, step=1) - 1
+queue = queue_page(status, page)
+PROFILER.mark("queue")
+
+if queue.empty:
+    st.info(f"{STATUS_LABELS[status]}の申請はありません。")
+    PROFILER.end_run()
+    st.stop()
+
+edited = st.data_editor(
+    queue.assign(選択=False),
+    column_order=["選択"] + [c for c in queue.columns if c != "version"],
+    disabled=list(queue.columns),
+    hide_index=True,
+    use_container_width=True,
+    key=f"queue_{status}_{page}_{ss['queue_nonce']}",
+)
+selected = edited[edited["選択"]]
+render_export(queue_source(status), "export_queue", f"{STATUS_LABELS[status]}の全件をファイルに出力")
+
+# ==== Batch action ===========================================================
+st.markdown("#### 一括操作")
+scopes = {
+    "selected": f"選択した行（{len(selected):,}件）",
+    "page": f"このページの全件（{len(queue):,}件）",
+    "all": f"{STATUS_LABELS[status]}の全件（{total:,}件）",
+}
+scope = st.radio("対象", list(scopes), format_func=scopes.get, horizontal=True)
+a1, a2, a3 = st.columns([2, 2, 1], vertical_alignment="bottom")
+actions = {s: f"{STATUS_LABELS[s]}にする" for s in TRANSITIONS[status]}
+actions[""] = "ステータスは変えない"
+new_status = a1.selectbox("ステータス", list(actions), format_func=actions.get) or None
+incentive = a2.number_input("企業奨励金（空欄なら変更しない）", min_value=0, step=1000, value=None)
+
+if a3.button("実行", type="primary", use_container_width=True):
+    if scope == "selected":
+        items = list(selected[["connection_id", "version"]].itertuples(index=False, name=None))
+    elif scope == "page":
+        items = list(queue[["connection_id", "version"]].itertuples(index=False, name=None))
+    else:
+        items = queue_keys(status)
+    if not items:
+        ss["queue_result"] = ("warning", "対象の申請が選択されていません。")
+    elif new_status is None and incentive is None:
+        ss["queue_result"] = ("warning", "ステータスか企業奨励金のどちらかを指定してください。")
+    else:
+        result = apply_transition(items, new_status, incentive)
+        message = f"{len(result.updated):,}件を更新しました（DB処理 {result.db_ms:,.0f}ms）。"
+        if result.conflicts or result.invalid:
+            message += (
+                f" {len(result.conflicts):,}件は表示後に他の担当者が更新していたため、"
+                f"{len(result.invalid):,}件は現在のステータスから変更できないためスキップしました。"
+            )
+        ss["queue_result"] = ("warning" if result.conflicts or result.invalid else "success", message)
+    ss["queue_nonce"] += 1
+    st.rerun()
+
+PROFILER.mark("render")
+PROFILER.end_run()
@@ -1,23 +1,60 @@
+from datetime import date
 
 import streamlit as st
 
-st.set_page_config(page_title="設定：料金と奨励金", page_icon="⚙️", layout="centered")
+from data.bootstrap import ensure_db
+from data.pricing import RANKS, current_pricing, pricing_history, save_pricing
+from data.profiling import PROFILER
 
-if "pricing" not in st.session_state:
-    st.session_state["pricing"] = {
-        "A": {"fee": 100000, "incentive": 30000},
-        "B": {"fee":  50000, "incentive": 15000},
-        "C": {"fee":  20000, "incentive":  5000},
-    }
+st.set_page_config(page_title="設定：料金と奨励金", page_icon="⚙️", layout="centered")
+PROFILER.begin_run("設定")
+ensure_db()
 
 st.title("⚙️ 設定：料金と奨励金")
-st.caption("接続時の料金と企業への奨励金を調整できます（セッション保存）。")
+st.caption("接続時の料金と企業への奨励金を調整できます。保存すると新しい版として記録され、適用開始日から全ユーザーに反映されます。")
+
+ss = st.session_state
+if ss.get("role") == "Agency":
+    st.warning("このページは社内（Admin）専用です。トップページのサイドバーでロールを切り替えてください。")
+    st.stop()
+
+if "pricing_result" in ss:
+    st.success(ss.pop("pricing_result"))
+
+pricing = current_pricing()
+st.markdown(f"現在の料金：**第{pricing.version}版**（{pricing.effective_from or '-'} から適用）")
+
+# ==== Edit ===================================================================
+with st.form("pricing_form"):
+    table = {}
+    for k in RANKS:
+        st.subheader(f"ニーズ{k}")
+        cur = pricing.table.get(k, {"fee": 0, "incentive": 0})
+        c1, c2 = st.columns(2)
+        fee = c1.number_input(f"接続料金（{k}）", value=int(cur["fee"]), step=1000, min_value=0)
+        inc = c2.number_input(f"企業奨励金（{k}）", value=int(cur["incentive"]), step=1000, min_value=0)
+        table[k] = {"fee": fee, "incentive": inc}
+    effective_from = st.date_input("適用開始日", value=date.today())
+    submitted = st.form_submit_button("新しい版として保存", type="primary")
 
-for k in ["A","B","C"]:
-    st.subheader(f"ニーズ{k}")
-    fee = st.number_input(f"接続料金（{k}）", value=int(st.session_state['pricing'][k]['fee']), step=1000, min_value=0)
-    inc = st.number_input(f"企業奨励金（{k}）", value=int(st.session_state['pricing'][k]['incentive']), step=1000, min_value=0)
-    st.session_state["pricing"][k]["fee"] = fee
-    st.session_state["pricing"][k]["incentive"] = inc
+if submitted:
+    if table == pricing.table and effective_from <= date.today():
+        st.info("現在の料金から変更がありません。")
+    else:
+        version = save_pricing(table, effective_from)
+        ss["pricing_result"] = f"第{version}版を保存しました（{effective_from.isoformat()} から適用）。"
+        st.rerun()
+PROFILER.mark("form")
 
-st.success("設定を更新しました（セッション内）。")
+# ==== History ================================================================
+st.markdown("**改定履歴**")
+history = pricing_history()
+st.dataframe(
+    history.rename(columns={
+        "version": "版", "effective_from": "適用開始日", "need_level": "ランク",
+        "fee": "接続料金", "incentive": "企業奨励金", "created_at": "登録日時",
+    }),
+    hide_index=True, use_container_width=True,
+)
+PROFILER.mark("history")
+PROFILER.end_run()
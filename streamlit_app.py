@@ -1,231 +1,48 @@
-import os
-from data.init_db import init_db
-from data.insert_sample_data import insert_sample_data
+import time
 
-if not os.path.exists("data/haken_connect.db"):
-    init_db()
-    insert_sample_data()
+_run_started = time.perf_counter()
 
-import os
-import sqlite3
 from datetime import datetime
 
 import pandas as pd
 import streamlit as st
 
-# =============================================================================
-# Brand
-# =============================================================================
-BRAND_NAME = "Haken Connect"
-BRAND_COLOR = "#5EC2FE"        # Light Blue
-BRAND_COLOR_DARK = "#24a9f0"
-ACCENT_BG = "#F3FAFF"
-MUTED = "#6b7280"
+from data import bootstrap, db, writer
+from data.pricing import current_pricing, price_columns
+from data.profiling import PROFILER
+from data.cache import get_cache
+from ui.cards import build_card_html
+from ui.diagnostics import render_diagnostics
+from ui.exports import render_export
+from ui.theme import BRAND_NAME, chrome_html
+from data.summary import RECENT_PAGE_SIZE, connection_totals, connections_by, rank_counts, recent_connections
+from data.recommend import recommend_page
+from data.facets import facet_counts, facet_values, structured_count
+from data.catalog import ALL, PAGE_SIZE, CatalogFilter, count_catalog, search_catalog
+from data.catalog_store import get_catalog_store
+from data.export import catalog_source, connections_source
+from data.approach import DuplicateApproach, RateLimited, get_open_pairs, get_rate_limiter, submit_approach
 
 st.set_page_config(page_title=f"{BRAND_NAME}（社内β）", page_icon="🔗", layout="wide")
-
-# =============================================================================
-# CSS (Theme + components + mascot)
-# =============================================================================
-st.markdown(
-    f"""
-<style>
-:root {{
-  --brand: {BRAND_COLOR};
-  --brand-dark: {BRAND_COLOR_DARK};
-  --muted: {MUTED};
-}}
-.main .block-container {{
-  padding-top: 0.8rem;
-  padding-bottom: 3rem;
-}}
-body {{
-  background: linear-gradient(180deg, rgba(94,194,254,0.10), rgba(94,194,254,0.02));
-}}
-.brand-hero {{
-  position: relative;
-  padding: 20px 24px 16px 24px;
-  border-radius: 18px;
-  background: radial-gradient(1200px 300px at 20% -10%, rgba(94,194,254,0.35), transparent),
-              linear-gradient(180deg, #fff, #fff);
-  border: 1px solid #e9eef5;
-  box-shadow: 0 6px 24px rgba(21,126,179,0.08);
-  margin-bottom: 14px;
-}}
-.brand-row {{ display:flex; align-items:center; gap:14px; flex-wrap:wrap; }}
-.brand-badge {{
-  display:flex; align-items:center; gap:10px;
-  padding:10px 14px; border-radius: 999px;
-  background: {ACCENT_BG}; border: 1px solid rgba(94,194,254,0.25);
-  font-weight:700; color:#0f172a;
-}}
-.brand-badge .dot {{
-  width:10px; height:10px; border-radius:999px; background:{BRAND_COLOR};
-  box-shadow: 0 0 0 3px rgba(94,194,254,0.25);
-}}
-.brand-sub {{ color:#334155; font-size:13px; margin-left:2px; }}
-.brand-wave {{ position:absolute; inset:auto 0 0 0; height:52px; overflow:hidden; }}
-.brand-wave svg {{ display:block; width:100%; height:100%; }}
-.card {{padding:14px 16px; border:1px solid #e9ecef; border-radius:14px; margin-bottom:12px; background:#fff;}}
-.rank {{font-size:44px; font-weight:800; letter-spacing:1px; line-height:1; margin:2px 0 8px 0; color:#0f172a;}}
-.fee {{font-size:12px; color:var(--muted); margin-top:2px;}}
-.label {{font-size:12px; color:#6c757d; margin-right:6px;}}
-.meta {{font-size:14px; color:#111; margin-bottom:6px;}}
-.company {{font-size:20px; font-weight:700; margin-left:8px; color:#0f172a;}}
-.blurred {{filter: blur(8px); text-shadow: 0 0 12px rgba(0,0,0,0.25); user-select:none;}}
-.right-wrap {{display:flex; flex-direction:column; height:100%;}}
-.job {{flex:1 1 auto; white-space:pre-wrap;}}
-.right-actions {{flex:0 0 auto; text-align:right; margin-top:12px;}}
-.badge {{
-  display:inline-block; padding:2px 10px; font-size:12px; border-radius:999px;
-  background: {ACCENT_BG}; color:#0f172a; border:1px solid rgba(94,194,254,0.28);
-}}
-.stTabs [role="tablist"] button[role="tab"] {{
-  border-radius: 10px 10px 0 0 !important;
-  background: #ffffffaa;
-  border: 1px solid #e9eef5; margin-right: 6px;
-}}
-.stTabs [role="tablist"] button[aria-selected="true"] {{
-  border-bottom-color: #ffffff;
-  color:#0f172a; box-shadow: 0 -2px 0 var(--brand) inset;
-}}
-.stButton>button {{
-  border-radius: 10px; border:1px solid var(--brand);
-  background: var(--brand); color:#fff; font-weight:700; padding: 8px 14px;
-  box-shadow: 0 6px 16px rgba(94,194,254,0.35);
-}}
-.stButton>button:hover {{ background: var(--brand-dark); border-color: var(--brand-dark); }}
-.sidebar .sidebar-content, section[data-testid="stSidebar"]>div {{
-  background: linear-gradient(180deg, #ffffff, #f9fcff);
-  border-right: 1px solid #e9eef5;
-}}
-.hc-mascot-wrap{{
-  position: fixed;
-  top: 14px;
-  right: 18px;
-  width: clamp(110px, 15vw, 180px);
-  z-index: 9999;
-  user-select: none;
-  pointer-events: none;
-  filter: drop-shadow(0 8px 22px rgba(30,144,255,.35));
-  animation: hc-float 4s ease-in-out infinite;
-}}
-.hc-mascot-wrap svg{{
-  width: 100%;
-  height: auto;
-  display: block;
-  shape-rendering: geometricPrecision;
-  text-rendering: geometricPrecision;
-  image-rendering: optimizeQuality;
-}}
-@keyframes hc-float{{
-  0%{{ transform: translateY(0) }}
-  50%{{ transform: translateY(-6px) }}
-  100%{{ transform: translateY(0) }}
-}}
-.hc-mascot-tip{{
-  position: fixed;
-  top: calc(14px + clamp(110px, 15vw, 180px) + 8px);
-  right: 22px;
-  background: #fff;
-  border: 1px solid #e6f3ff;
-  padding: 6px 10px;
-  border-radius: 10px;
-  font-size: 12px;
-  color: #0f172a;
-  box-shadow: 0 8px 18px rgba(94,194,254,.18);
-}}
-.hc-mascot-tip b{{ color:#1377c8; }}
-</style>
-""",
-    unsafe_allow_html=True,
-)
+PROFILER.begin_run("main")  # 計測が無効なら何もしない（Adminの「診断」タブ / HC_PROFILE=1）
 
 # =============================================================================
 # Data paths & DB
 # =============================================================================
-DATA_DIR = "data"
-DB_PATH = os.path.join(DATA_DIR, "haken_connect.db")
-
-def get_conn():
-    return sqlite3.connect(DB_PATH)
+DB_PATH = db.DB_PATH
+bootstrap.ensure_db(DB_PATH)  # スキーマ作成・マイグレーション・サンプル投入はプロセスで1回だけ
+PROFILER.mark("bootstrap")
 
 # =============================================================================
 # Utils
 # =============================================================================
-def load_df(table: str) -> pd.DataFrame:
-    with get_conn() as conn:
-        return pd.read_sql_query(f"SELECT * FROM {table}", conn)
-
 def insert_connection(row: dict):
-    with get_conn() as conn:
-        columns = ",".join(row.keys())
-        placeholders = ",".join(["?"] * len(row))
-        values = list(row.values())
-        conn.execute(
-            f"INSERT INTO connections ({columns}) VALUES ({placeholders})", values
-        )
-        conn.commit()
-
-def mosaic_html(text: str) -> str:
-    safe = (text or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-    return f'<span class="company blurred">{safe}</span>'
-
-def get_mascot_svg(fill="#5EC2FE") -> str:
-    return f"""
-<svg viewBox="0 0 512 512" xmlns="http://www.w3.org/2000/svg"
-     aria-label="Haken Connect Mascot" role="img">
-  <!-- Body -->
-  <path d="M170 180c0-46 36-84 82-84s82 38 82 84v18c28 10 44 34 44 61
-           0 38-35 68-90 68h-72c-55 0-90-30-90-68 0-29 18-54 48-62v-17z"
-        fill="{fill}"/>
-  <!-- Belly -->
-  <ellipse cx="252" cy="274" rx="66" ry="56" fill="#fff" fill-opacity=".92"/>
-  <!-- Muzzle -->
-  <ellipse cx="252" cy="206" rx="34" ry="24" fill="#fff"/>
-  <!-- Nose & Eyes -->
-  <circle cx="268" cy="206" r="5" fill="#0f172a"/>
-  <circle cx="230" cy="186" r="6" fill="#0f172a"/>
-  <circle cx="286" cy="186" r="6" fill="#0f172a"/>
-  <path d="M238 212c8 8 20 8 28 0" stroke="#0f172a" stroke-width="3" stroke-linecap="round"/>
-  <!-- Ears -->
-  <path d="M198 138c-12-10-30-12-44-4 6 18 23 28 40 26l4-22z" fill="{fill}"/>
-  <path d="M306 138c12-10 30-12 44-4-6 18-23 28-40 26l-4-22z" fill="{fill}"/>
-  <!-- Arms & Legs -->
-  <path d="M166 258c-18 10-32 22-42 36 13-8 29-14 46-18l-4-8z" fill="{fill}"/>
-  <path d="M338 258c18 10 32 22 42 36-13-8-29-14-46-18l4-8z" fill="{fill}"/>
-  <path d="M206 354c-2 22-8 44-18 64 10-12 19-27 25-43l-7-21z" fill="{fill}"/>
-  <path d="M298 354c2 22 8 44 18 64-10-12-19-27-25-43l7-21z" fill="{fill}"/>
-  <!-- Magnifying glass (right hand) -->
-  <g transform="translate(332,236) rotate(20)">
-    <circle cx="44" cy="44" r="36" fill="#fff" stroke="#0f172a" stroke-width="6"/>
-    <circle cx="44" cy="44" r="18" fill="{fill}" fill-opacity=".35"/>
-    <rect x="38" y="76" width="12" height="34" rx="6" fill="#0f172a"/>
-  </g>
-  <!-- Friendly cheek -->
-  <circle cx="214" cy="196" r="7" fill="#FDB4C8" fill-opacity=".9"/>
-  <!-- Line accents -->
-  <path d="M170 198v-18" stroke="{fill}" stroke-width="6" stroke-linecap="round"/>
-  <path d="M334 198v-18" stroke="{fill}" stroke-width="6" stroke-linecap="round"/>
-</svg>
-""".strip()
-
-def inject_mascot(show_tip: bool = True, color: str = BRAND_COLOR, size_css: str = None):
-    svg = get_mascot_svg(color)
-    wrap_style = f'style="{size_css}"' if size_css else ""
-    st.markdown(f'<div class="hc-mascot-wrap" {wrap_style}>{svg}</div>', unsafe_allow_html=True)
-    if show_tip:
-        st.markdown(f'<div class="hc-mascot-tip">🔎 <b>{BRAND_NAME}</b> で発見！</div>', unsafe_allow_html=True)
+    # 重複申請・流量超過を確認してから、単一のバックグラウンドライタでまとめてコミットし、完了（または失敗）まで待つ
+    return submit_approach(row, DB_PATH)
 
 # =============================================================================
 # Session init
 # =============================================================================
-if "pricing" not in st.session_state:
-    st.session_state["pricing"] = {
-        "A": {"fee": 100000, "incentive": 30000},
-        "B": {"fee":  50000, "incentive": 15000},
-        "C": {"fee":  20000, "incentive":  5000},
-    }
 if "role" not in st.session_state:
     st.session_state["role"] = "Admin"
 if "selected_agency" not in st.session_state:
@@ -238,166 +55,178 @@ st.sidebar.title(BRAND_NAME)
 role = st.sidebar.selectbox("ロール", ["Admin", "Agency"], index=0, key="role")
 
 try:
-    agy_df = load_df("agencies")
-    agy_name = st.sidebar.selectbox("派遣会社を選択", agy_df["agency_name"].tolist())
-    st.session_state["selected_agency"] = agy_df.loc[
-        agy_df["agency_name"] == agy_name, "agency_id"
-    ].iloc[0]
+    agencies = bootstrap.agency_options(DB_PATH)
+    agy_name = st.sidebar.selectbox("派遣会社を選択", list(agencies))
+    st.session_state["selected_agency"] = agencies[agy_name]
 except Exception:
     st.sidebar.warning("派遣会社マスタ（agenciesテーブル）を確認してください。")
 
 st.sidebar.markdown("---")
-st.sidebar.markdown("**料金設定（参考）**")
-for k, v in st.session_state["pricing"].items():
+# 料金は pricing 表の現行版（設定画面で保存した版が全セッションに反映される）
+pricing = current_pricing(DB_PATH)
+st.sidebar.markdown(f"**料金設定（参考・第{pricing.version}版）**")
+for k, v in pricing.table.items():
     st.sidebar.write(f"企業ランク{k}: ご紹介料金 ¥{v['fee']:,}")
+PROFILER.mark("sidebar")
 
 # =============================================================================
 # Brand hero
 # =============================================================================
-def hero_svg():
-    return f"""
-<div class="brand-hero">
-  <div class="brand-row">
-    <div class="brand-badge"><span class="dot"></span> {BRAND_NAME}</div>
-    <div class="brand-sub">社内β / 企業ランクと要件でスマートにアプローチ</div>
-  </div>
-  <div class="brand-wave">
-    <svg viewBox="0 0 1440 140" preserveAspectRatio="none" xmlns="http://www.w3.org/2000/svg">
-      <defs>
-        <linearGradient id="g1" x1="0" x2="0" y1="0" y2="1">
-          <stop offset="0%" stop-color="{BRAND_COLOR}" stop-opacity="0.35"/>
-          <stop offset="100%" stop-color="{BRAND_COLOR}" stop-opacity="0"/>
-        </linearGradient>
-      </defs>
-      <path d="M0,60 C240,140 420,0 720,60 C1020,120 1200,40 1440,90 L1440,140 L0,140 Z" fill="url(#g1)"/>
-    </svg>
-  </div>
-</div>
-"""
-st.markdown(hero_svg(), unsafe_allow_html=True)
-
-inject_mascot(show_tip=True)
+# CSS・ヒーロー・マスコットはプロセス内で組み立て済みの1要素として送る
+st.markdown(chrome_html(), unsafe_allow_html=True)
+_fixed_ms = bootstrap.elapsed_ms(_run_started)  # ここまでが毎回の再実行で必ずかかる固定部分
+PROFILER.mark("chrome")
 
 # =============================================================================
 # Main
 # =============================================================================
 st.caption("社名は接続まで非公開。接続時にご紹介料金（接続料）が発生します。")
 
-tab1, tab2, tab3 = st.tabs(["案件カタログ", "ダッシュボード", "ヘルプ"])
+tabs = st.tabs(["案件カタログ", "ダッシュボード", "ヘルプ"] + (["診断"] if role == "Admin" else []))
+tab1, tab2, tab3 = tabs[:3]
 
 # ==== Catalog ================================================================
 with tab1:
-    opp_df = load_df("opportunities")
-    com_df = load_df("companies")
-    merged = opp_df.merge(com_df, on="company_id", how="left")
+    # 選択値はウィジェットの key で session_state に持ち、件数は描画前に現在の選択から数える
+    # （選択を変えた実行の中で件数も揃うので、再実行しない）。件数つきのラベルが変わると
+    # ウィジェットは別物になるため、描画前に key へ値を書き戻して選択を引き継ぐ
+    ss = st.session_state
+    facet_options = {}
+    for facet in ("region", "industry", "need_level"):
+        facet_options[facet] = [ALL] + facet_values(facet, DB_PATH)
+        value = ss.get(f"catalog_{facet}", ALL)
+        ss[f"catalog_{facet}"] = value if value in facet_options[facet] else ALL
+    counts = facet_counts(CatalogFilter(
+        ss.get("catalog_region", ALL), ss.get("catalog_industry", ALL), ss.get("catalog_need_level", ALL),
+        int(ss.get("catalog_headcount_min", 0)),
+    ), DB_PATH)
+
+    def facet_select(label: str, facet: str) -> str:
+        c = counts[facet]
+        return st.selectbox(
+            label, facet_options[facet], key=f"catalog_{facet}",
+            format_func=lambda v, c=c: f"{v} ({c.get(v, 0):,})",
+        )
 
     col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 2])
     with col1:
-        region = st.selectbox("地域", ["すべて"] + sorted(merged["region"].dropna().unique().tolist()))
+        region = facet_select("地域", "region")
     with col2:
-        industry = st.selectbox("業種", ["すべて"] + sorted(merged["industry"].dropna().unique().tolist()))
+        industry = facet_select("業種", "industry")
     with col3:
-        need = st.selectbox("企業ランク", ["すべて", "A", "B", "C"])
+        need = facet_select("企業ランク", "need_level")
     with col4:
-        headcount_min = st.number_input("人数下限", value=0, min_value=0, step=1)
+        headcount_min = st.number_input("人数下限", value=0, min_value=0, step=1, key="catalog_headcount_min")
     with col5:
         kw = st.text_input("キーワード（職種・スキルなど）", value="")
-
-    view = merged.copy()
-    if region != "すべて":
-        view = view[view["region"] == region]
-    if industry != "すべて":
-        view = view[view["industry"] == industry]
-    if need != "すべて":
-        view = view[view["need_level"] == need]
-    view = view[view["headcount_needed"] >= headcount_min]
-    if kw:
-        kw_lower = kw.lower()
-        view = view[
-            view["role"].str.lower().str.contains(kw_lower)
-            | view["requirements"].str.lower().str.contains(kw_lower)
-        ]
-
-    st.write(f"検索結果: **{len(view)}件**")
-
-    for _, row in view.iterrows():
-        fee = st.session_state["pricing"][row["need_level"]]["fee"]
-        company_html = (
-            f'<span class="company">{row["company_name"]}</span>'
-            if role == "Admin" else mosaic_html(row["company_name"])
-        )
-
-        with st.container():
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            left, mid, right = st.columns([1, 3.5, 3.5])
-
-            # Left: Rank + fee
-            with left:
-                st.markdown(f'<div class="rank">{row["need_level"]}</div>', unsafe_allow_html=True)
-                st.markdown(
-                    f'<div class="fee"><span class="label">ご紹介料金（接続料）</span><br/>¥{fee:,}（税別）</div>',
-                    unsafe_allow_html=True
-                )
-
-            # Middle: Company + meta（地域→業種→職種/人数）
-            with mid:
-                st.markdown(
-                    f'<div style="display:flex;align-items:center;gap:6px;">'
-                    f'<span class="badge">企業ランク {row["need_level"]}</span>'
-                    f'{company_html}'
-                    f'</div>',
-                    unsafe_allow_html=True,
-                )
-                meta_block = (
-                    f'<div class="meta"><span class="label">地域</span>{row["region"]}</div>'
-                    f'<div class="meta"><span class="label">業種</span>{row["industry"]}</div>'
-                    f'<div class="meta"><span class="label">職種/必要人数</span>{row["role"]} / {int(row["headcount_needed"])}</div>'
-                )
-                st.markdown(meta_block, unsafe_allow_html=True)
-
-            # Right: Job description + action bottom-right
-            with right:
-                st.markdown('<div class="right-wrap">', unsafe_allow_html=True)
-                st.markdown(
-                    f'<div class="job"><span class="label">仕事内容</span><br>{row["requirements"]}</div>',
-                    unsafe_allow_html=True,
-                )
-                st.markdown('<div class="right-actions">', unsafe_allow_html=True)
-                if role == "Agency":
-                    if st.button("アプローチ ▶︎", key=f"approach_{row['opportunity_id']}"):
-                        new = {
-                            "connection_id": f"CN_{int(pd.Timestamp.utcnow().timestamp())}_{row['opportunity_id']}",
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "agency_id": st.session_state.get("selected_agency"),
-                            "opportunity_id": row["opportunity_id"],
-                            "status": "requested",
-                            "fee_amount": fee,
-                            "incentive_amount": None,
-                            "notes": "",
-                        }
-                        insert_connection(new)
-                        st.success("アプローチを送信しました。社内で確認後、企業にご連絡します。")
-                else:
-                    st.caption("（Admin表示）企業奨励金は社内管理でのみ扱います。")
-                st.markdown('</div>', unsafe_allow_html=True)  # right-actions
-                st.markdown('</div>', unsafe_allow_html=True)  # right-wrap
-
-            st.markdown('</div>', unsafe_allow_html=True)  # card
+    PROFILER.mark("catalog:facets")
+
+    flt = CatalogFilter(region, industry, need, int(headcount_min), kw)
+    total = count_catalog(flt, DB_PATH) if kw.strip() else structured_count(flt, DB_PATH)
+    n_pages = max(1, -(-total // PAGE_SIZE))
+
+    res_col, sort_col = st.columns([3, 2])
+    res_col.write(f"検索結果: **{total}件**")
+    sort_mode = sort_col.radio("並び順", ["標準", "おすすめ順"], horizontal=True, label_visibility="collapsed")
+    page = 0
+    if n_pages > 1:
+        page = st.number_input(f"ページ（全{n_pages}ページ）", min_value=1, max_value=n_pages, value=1, step=1) - 1
+    if sort_mode == "おすすめ順":
+        # 選択中の派遣会社の申請履歴（地域・業種・ランク）との親和度で並べる
+        view, _ = recommend_page(flt, st.session_state.get("selected_agency"), page=page, path=DB_PATH)
+    else:
+        view = search_catalog(flt, page=page, path=DB_PATH)
+    PROFILER.mark("catalog:query")
+
+    # 表示中のページ分だけカードHTMLとボタンを作る（描画量はページサイズで頭打ち）
+    cards = build_card_html(view, role, pricing)
+    fees = price_columns(view["need_level"], pricing)["fee"].tolist()
+    opp_ids = view["opportunity_id"].tolist()
+    agency_id = st.session_state.get("selected_agency")
+    # 申請中・承認済みの案件はプロセス内の一覧で判定する（カードごとに問い合わせない）
+    applied = get_open_pairs(DB_PATH).applied(agency_id, opp_ids) if role == "Agency" else set()
+
+    for card, fee, opp_id in zip(cards, fees, opp_ids):
+        if role != "Agency":
+            st.markdown(card, unsafe_allow_html=True)
+            continue
+        body, action = st.columns([7, 1], vertical_alignment="bottom")
+        body.markdown(card, unsafe_allow_html=True)
+        if opp_id in applied:
+            action.button("申請済み", key=f"approach_{opp_id}", disabled=True)
+            continue
+        if action.button("アプローチ ▶︎", key=f"approach_{opp_id}"):
+            new = {
+                "connection_id": writer.new_connection_id(),
+                "timestamp": datetime.utcnow().isoformat(),
+                "agency_id": agency_id,
+                "opportunity_id": opp_id,
+                "status": "requested",
+                "fee_amount": None if pd.isna(fee) else int(fee),
+                "pricing_version": pricing.version or None,
+                "incentive_amount": None,
+                "notes": "",
+            }
+            try:
+                insert_connection(new)
+            except (DuplicateApproach, RateLimited) as e:
+                body.warning(str(e))
+            except Exception as e:
+                body.error(f"アプローチを送信できませんでした。時間をおいて再度お試しください。（{e}）")
+            else:
+                body.success("アプローチを送信しました。社内で確認後、企業にご連絡します。")
+    render_export(catalog_source(flt, role, pricing), "export_catalog", "検索結果（全件）をファイルに出力")
+    PROFILER.mark("catalog:render")
 
 # ==== Dashboard ==============================================================
 with tab2:
     st.subheader("ダッシュボード（サマリー）")
-    opp_df = load_df("opportunities")
-    con_df = load_df("connections")
-
-    need_counts = opp_df["need_level"].value_counts().reindex(["A","B","C"]).fillna(0).astype(int)
+    need_counts = rank_counts(DB_PATH)
+    totals = connection_totals(DB_PATH)
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("案件数（A）", int(need_counts.get("A",0)))
-    c2.metric("案件数（B）", int(need_counts.get("B",0)))
-    c3.metric("案件数（C）", int(need_counts.get("C",0)))
-    c4.metric("アプローチ申請（累計）", len(con_df))
-
-    st.dataframe(con_df.sort_values("timestamp", ascending=False), use_container_width=True)
+    c1.metric("案件数（A）", need_counts["A"])
+    c2.metric("案件数（B）", need_counts["B"])
+    c3.metric("案件数（C）", need_counts["C"])
+    c4.metric("アプローチ申請（累計）", totals["connections"])
+
+    if role == "Admin":
+        f1, f2 = st.columns(2)
+        f1.metric("ご紹介料金（累計）", f"¥{totals['fee_total']:,}")
+        f2.metric("企業奨励金（累計）", f"¥{totals['incentive_total']:,}")
+        with st.expander("内訳（ステータス別・派遣会社別・日別）"):
+            s1, s2, s3 = st.columns(3)
+            s1.dataframe(connections_by("status", DB_PATH), hide_index=True, use_container_width=True)
+            s2.dataframe(connections_by("agency", DB_PATH), hide_index=True, use_container_width=True)
+            s3.dataframe(connections_by("day", DB_PATH), hide_index=True, use_container_width=True)
+
+    # 最新の申請から RECENT_PAGE_SIZE 件ずつ（timestamp索引を逆順に読む）
+    n_recent_pages = max(1, -(-totals["connections"] // RECENT_PAGE_SIZE))
+    recent_page = 0
+    if n_recent_pages > 1:
+        recent_page = st.number_input(
+            f"申請履歴ページ（全{n_recent_pages}ページ・新しい順）",
+            min_value=1, max_value=n_recent_pages, value=1, step=1,
+        ) - 1
+    st.dataframe(recent_connections(recent_page, path=DB_PATH), use_container_width=True)
+    if role == "Admin":
+        render_export(connections_source(), "export_connections", "申請一覧（全件）をファイルに出力")
+
+    if role == "Admin":
+        cs = get_cache().stats()
+        st.caption(
+            f"読み取りキャッシュ: {cs['entries']}件 / {cs['bytes'] / 1e6:.1f}MB"
+            f"（ヒット {cs['hits']:,} / ミス {cs['misses']:,} / 追い出し {cs['evictions']:,}）"
+        )
+        store = get_catalog_store(DB_PATH)
+        if store.loaded:
+            sc = store.stats()
+            st.caption(
+                f"案件カタログ: 変更履歴 seq {sc['seq']:,} まで反映"
+                f"（差分同期 {sc['syncs']:,}回 / {sc['synced_rows']:,}行、直近 {sc['last_sync_ms']:,.1f} ms）"
+            )
+        rl = get_rate_limiter().stats()
+        st.caption(f"アプローチの流量制限: 受付 {rl['allowed']:,}件 / 制限 {rl['limited']:,}件（派遣会社 {rl['keys']:,}社）")
+    PROFILER.mark("dashboard")
 
 # ==== Help ===================================================================
 with tab3:
@@ -413,3 +242,26 @@ A. 企業と派遣会社を当社が接続した**接続時**に、ご紹介料
 A. 派遣会社には公開しません（社内でのみ管理）。
         """
     )
+
+PROFILER.mark("help")
+PROFILER.end_run()
+
+# =============================================================================
+# Startup / rerun metrics
+# =============================================================================
+startup = bootstrap.get_startup_metrics()
+startup.record_run(_fixed_ms, bootstrap.elapsed_ms(_run_started))
+if role == "Admin":
+    with st.sidebar.expander("起動・再実行の計測"):
+        ms = startup.stats()
+        fmt = lambda v: "-" if v is None else f"{v:,.1f} ms"
+        st.write(f"起動処理（マイグレーション等）: {fmt(ms['bootstrap_ms'])}")
+        st.write(f"初回描画まで（プロセス起動から）: {fmt(ms['first_paint_ms'])}")
+        st.write(f"再実行の固定部分 p50: {fmt(ms['fixed_p50_ms'])}")
+        st.write(f"再実行の全体 p50: {fmt(ms['total_p50_ms'])}（{ms['reruns']:,}回）")
+
+# ==== Diagnostics (Admin) ====================================================
+# 計測結果の表示そのものは計測対象に含めない
+if role == "Admin":
+    with tabs[3]:
+        render_diagnostics(PROFILER)
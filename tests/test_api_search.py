@@ -0,0 +1,25 @@
+import json
+import os
+import subprocess
+import sys
+
+from api.search import parse_query, search
+from data.init_db import init_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_api_does_not_import_streamlit():
+    proc = subprocess.run(
+        [sys.executable, "-c", "import sys, api.app; print('streamlit' in sys.modules)"],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True, text=True,
+    )
+    assert proc.stdout.strip() == "False", proc.stderr
+
+
+def test_unset_filters_are_echoed_as_null(db_path):
+    init_db(db_path)
+    body, _ = search(parse_query("need_level=A&limit=10"), db_path)
+    assert json.loads(body)["query"] == {
+        "region": None, "industry": None, "need_level": "A", "headcount_min": 0, "keyword": None, "limit": 10,
+    }
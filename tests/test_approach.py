@@ -0,0 +1,8 @@
+import pytest
+
+from data.approach import RateLimited
+
+
+@pytest.mark.parametrize("retry_after, shown", [(0.2, "1秒"), (0.0, "1秒"), (1.2, "2秒"), (3.0, "3秒")])
+def test_rate_limit_message_rounds_wait_up(retry_after, shown):
+    assert shown in str(RateLimited(retry_after))
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from data.bulk_import import bulk_import, checkpoint_path, fts_triggers, schema_objects, secondary_indexes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROWS = 100
+
+# 最初のコミット（10行）の直後にプロセスごと落とす
+CRASHING_IMPORT = """
+import os, sys
+from data.bulk_import import bulk_import
+
+def log(msg):
+    if "rows" in msg:
+        os._exit(9)
+
+bulk_import("opportunities", sys.argv[1], chunk_size=10, commit_every=1, db_path=sys.argv[2], log=log)
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "opportunities.csv"
+    lines = ["opportunity_id,role,requirements,headcount_needed"]
+    lines += [f"OP{i:04d},清掃スタッフ,夜勤あり,1" for i in range(ROWS)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def crash_mid_import(csv_path, db_path):
+    proc = subprocess.run(
+        [sys.executable, "-c", CRASHING_IMPORT, csv_path, db_path],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True,
+    )
+    assert proc.returncode == 9, proc.stderr.decode()
+
+
+def fts_hits(conn, table, term):
+    return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {table} MATCH ?", (f'"{term}"',)).fetchone()[0]
+
+
+@pytest.mark.parametrize("restart", [False, True])
+def test_rerun_after_crash_restores_indexes_and_fts(csv_path, db_path, restart):
+    crash_mid_import(csv_path, db_path)
+    conn = sqlite3.connect(db_path)
+    assert secondary_indexes(conn, "opportunities") == {}
+    assert fts_triggers(conn, "opportunities") == {}
+
+    bulk_import("opportunities", csv_path, chunk_size=10, restart=restart, db_path=db_path, log=lambda msg: None)
+
+    expected = schema_objects("opportunities")
+    assert expected["indexes"] and expected["triggers"]
+    assert secondary_indexes(conn, "opportunities").keys() == expected["indexes"].keys()
+    assert fts_triggers(conn, "opportunities").keys() == expected["triggers"].keys()
+    assert conn.execute("SELECT COUNT(*) FROM opportunities").fetchone()[0] == ROWS
+    assert fts_hits(conn, "opportunities_fts", "スタッフ") == ROWS
+    assert fts_hits(conn, "opportunities_bigram", "夜勤") == ROWS
+    conn.close()
+
+
+def test_checkpoint_records_suspended_schema_before_drop(csv_path, db_path):
+    crash_mid_import(csv_path, db_path)
+    with open(checkpoint_path(csv_path, "opportunities"), encoding="utf-8") as f:
+        cp = f.read()
+    for name in [*schema_objects("opportunities")["indexes"], *schema_objects("opportunities")["triggers"]]:
+        assert name in cp
+
+
+def test_completed_import_still_restores_missing_schema(csv_path, db_path):
+    bulk_import("opportunities", csv_path, db_path=db_path, log=lambda msg: None)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX idx_opp_filter")
+    conn.commit()
+
+    bulk_import("opportunities", csv_path, db_path=db_path, log=lambda msg: None)
+    assert "idx_opp_filter" in secondary_indexes(conn, "opportunities")
+    conn.close()
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from data.catalog import CatalogFilter, build_where
+from data.init_db import init_db
+
+ROWS = [
+    ("OP1", "清掃", "夜勤あり・梱包"),
+    ("OP2", "ピッキング", "フォークリフト経験者優遇。シフト:日勤"),
+    ("OP3", "検査員", "未経験OK。夜勤なし"),
+    ("OP4", "倉庫内作業", None),
+    ("OP5", "ＰＹＴＨＯＮ講師", "Café"),
+]
+
+
+@pytest.fixture
+def conn(db_path):
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO opportunities (opportunity_id, role, requirements, headcount_needed) VALUES (?, ?, ?, 1)", ROWS)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def search(conn, keyword):
+    joins, where, params, _ = build_where(CatalogFilter(keyword=keyword))
+    sql = f"SELECT o.opportunity_id FROM opportunities o {joins}WHERE {where} ORDER BY o.rowid"
+    plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    return [r[0] for r in conn.execute(sql, params)], plan
+
+
+@pytest.mark.parametrize("keyword", ["清掃", "夜勤", "ok", "検", "庫"])
+def test_short_terms_use_bigram_index(conn, keyword):
+    _, plan = search(conn, keyword)
+    assert any("opportunities_bigram VIRTUAL TABLE" in step for step in plan)
+    assert "SCAN o" not in plan
+
+
+@pytest.mark.parametrize("keyword, expected", [
+    ("清掃", ["OP1"]),
+    ("夜勤", ["OP1", "OP3"]),
+    ("ok", ["OP3"]),
+    ("OK 夜勤", ["OP3"]),
+    ("庫", ["OP4"]),
+    ("勤", ["OP1", "OP2", "OP3"]),
+    ("フォークリフト 日勤", ["OP2"]),
+    ("・", ["OP1"]),
+    ("ＰＹ", ["OP5"]),
+    ("ｐｙ", ["OP5"]),
+    ("Ｐｙ", ["OP5"]),
+    ("ｐｙｔ", ["OP5"]),
+    ("É", ["OP5"]),
+    ("é", ["OP5"]),
+    ("e", []),
+])
+def test_short_terms_match_substrings(conn, keyword, expected):
+    assert search(conn, keyword)[0] == expected
+
+
+def test_bigram_index_follows_updates_and_deletes(conn):
+    conn.execute("UPDATE opportunities SET role = '軽作業' WHERE opportunity_id = 'OP1'")
+    conn.execute("DELETE FROM opportunities WHERE opportunity_id = 'OP3'")
+    assert search(conn, "清掃")[0] == []
+    assert search(conn, "夜勤")[0] == ["OP1"]
+    assert search(conn, "作業")[0] == ["OP1", "OP4"]
@@ -0,0 +1,60 @@
+import shutil
+import sqlite3
+
+from data.catalog_store import CatalogStore, read_snapshot, snapshot_path_for
+from data.init_db import database_id, init_db
+
+
+def make_db(path, rows):
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO opportunities (opportunity_id, role, headcount_needed) VALUES (?, ?, 1)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_snapshot_path_follows_db_path(tmp_path):
+    a, b = str(tmp_path / "a.db"), str(tmp_path / "b.db")
+    assert snapshot_path_for(a) != snapshot_path_for(b)
+    assert snapshot_path_for(a) == str(tmp_path / "a.catalog.arrow")
+
+
+def test_snapshot_of_another_db_is_rebuilt(tmp_path):
+    old, new = str(tmp_path / "old.db"), str(tmp_path / "new.db")
+    make_db(old, [("OP1", "清掃")])
+    CatalogStore(old).frame()
+    # 作り直したDBと同じ状況: 変更履歴の位置は古いスナップショット以上だが中身は別物
+    make_db(new, [("OP7", "検査員"), ("OP8", "梱包")])
+    assert database_id(old) != database_id(new)
+    shutil.copy(snapshot_path_for(old), snapshot_path_for(new))
+
+    assert CatalogStore(new).frame()["opportunity_id"].tolist() == ["OP7", "OP8"]
+
+
+def test_snapshot_of_copied_db_is_rebuilt(tmp_path):
+    src, dst = str(tmp_path / "src.db"), str(tmp_path / "dst.db")
+    make_db(src, [("OP1", "清掃")])
+    CatalogStore(src).frame()
+    with sqlite3.connect(src) as a, sqlite3.connect(dst) as b:
+        a.backup(b)
+    shutil.copy(snapshot_path_for(src), snapshot_path_for(dst))
+
+    assert database_id(src) == database_id(dst)
+    CatalogStore(dst).frame()
+    source = read_snapshot(snapshot_path_for(dst)).schema.metadata[b"hc_catalog_source"]
+    assert dst.encode() in source
+
+
+def test_sync_drops_row_replaced_under_same_id(db_path):
+    make_db(db_path, [("OP1", "清掃"), ("OP2", "梱包")])
+    store = CatalogStore(db_path)
+    store.frame()
+    conn = sqlite3.connect(db_path)
+    # REPLACE は旧行を削除して新しい rowid で入れ直す
+    conn.execute("INSERT OR REPLACE INTO opportunities (opportunity_id, role, headcount_needed) VALUES ('OP1', '検査', 1)")
+    conn.commit()
+    expected = conn.execute("SELECT opportunity_id, role FROM opportunities ORDER BY rowid").fetchall()
+    conn.close()
+
+    frame = store.frame()
+    assert list(zip(frame["opportunity_id"], frame["role"])) == expected
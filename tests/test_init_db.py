@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from data import init_db as schema
+
+
+def columns(path, table):
+    with sqlite3.connect(path) as conn:
+        return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def user_version(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def test_fresh_db_reaches_latest_version(db_path):
+    assert schema.init_db(db_path) == [v for v, _ in schema.MIGRATIONS]
+    assert user_version(db_path) == schema.SCHEMA_VERSION
+    assert schema.init_db(db_path) == []
+
+
+def test_failed_migration_is_rolled_back_and_rerunnable(db_path, monkeypatch):
+    broken = tuple(
+        (v, scripts + ("SELECT no_such_function();",)) if v == 7 else (v, scripts)
+        for v, scripts in schema.MIGRATIONS
+    )
+    monkeypatch.setattr(schema, "MIGRATIONS", broken)
+    with pytest.raises(sqlite3.OperationalError):
+        schema.init_db(db_path)
+    # 版7の ALTER TABLE も含めて丸ごと戻っている
+    assert user_version(db_path) == 6
+    assert "version" not in columns(db_path, "connections")
+
+    monkeypatch.undo()
+    assert schema.init_db(db_path)[0] == 7
+    assert "version" in columns(db_path, "connections")
+
+
+def test_split_statements_keeps_trigger_bodies():
+    stmts = list(schema.split_statements(schema.FTS_SCHEMA))
+    assert len(stmts) == 4
+    assert all(sqlite3.complete_statement(s) for s in stmts)
+
+
+def rerun_after_alter(db_path, version):
+    """旧方式のランナーで version の ALTER だけ済み、版が上がらなかったDBを作って流し直す。"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        schema.migrate(conn, upto=version)
+        conn.execute(f"PRAGMA user_version = {version - 1}")
+        return schema.migrate(conn, upto=version)
+    finally:
+        conn.close()
+
+
+def test_add_column_steps_tolerate_existing_column(db_path):
+    assert rerun_after_alter(db_path, 7) == [7]
+    assert columns(db_path, "connections").count("version") == 1
+
+
+def test_pricing_version_column_add_is_idempotent(db_path):
+    assert rerun_after_alter(db_path, 10) == [10]
+    assert columns(db_path, "connections").count("pricing_version") == 1
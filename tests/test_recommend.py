@@ -0,0 +1,45 @@
+import sqlite3
+
+from data.catalog import CatalogFilter, count_catalog
+from data.facets import structured_count
+from data.init_db import init_db
+from data.recommend import get_model, recommend_page
+
+
+def insert(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO opportunities (opportunity_id, region, industry, need_level, headcount_needed) "
+        "VALUES (?, ?, ?, ?, 1)", rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_model_is_reused_until_data_changes(db_path):
+    init_db(db_path)
+    insert(db_path, [("OP1", "東京", "物流", "A"), ("OP2", "大阪", "製造", "B")])
+    frame, model = get_model(db_path)
+    assert get_model(db_path)[1] is model
+
+    insert(db_path, [("OP3", "福岡", "物流", "A")])
+    frame, rebuilt = get_model(db_path)
+    assert rebuilt is not model
+    assert rebuilt.fits(frame)
+    assert "福岡" in rebuilt.categories["region"]
+
+
+def test_recommend_total_matches_sql_count_with_null_headcount(db_path):
+    init_db(db_path)
+    insert(db_path, [("OP1", "東京", "物流", "A"), ("OP2", "大阪", "製造", "B")])
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO opportunities (opportunity_id, region, industry, need_level, headcount_needed) "
+        "VALUES ('OP3', '東京', '物流', 'A', NULL), ('OP4', '東京', '物流', 'A', 3)"
+    )
+    conn.commit()
+    conn.close()
+    for f in (CatalogFilter(), CatalogFilter(headcount_min=2), CatalogFilter(region="東京")):
+        view, total = recommend_page(f, None, path=db_path)
+        assert total == structured_count(f, db_path) == count_catalog(f, db_path)
+        assert "OP3" not in view["opportunity_id"].tolist()
@@ -0,0 +1,53 @@
+import html
+
+import pandas as pd
+
+from data.pricing import Pricing, price_columns
+
+FEE_LABEL = "ご紹介料金（接続料）"
+ADMIN_NOTE = "（Admin表示）企業奨励金は社内管理でのみ扱います。"
+
+
+def mosaic_html(text: str) -> str:
+    safe = (text or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return f'<span class="company blurred">{safe}</span>'
+
+
+def _esc(s: pd.Series) -> pd.Series:
+    return s.fillna("").astype(str).map(html.escape)
+
+
+def build_card_html(view: pd.DataFrame, role: str, pricing: Pricing) -> list:
+    """検索結果1ページ分のカードHTMLを列単位の文字列演算でまとめて作る。
+
+    カード1枚 = st.markdown 1回になるよう、ランク/社名/条件/仕事内容を
+    1つのHTMLブロックに収める。ボタンはStreamlit側で別途描画する。
+    """
+    if view.empty:
+        return []
+    level = _esc(view["need_level"])
+    fee = price_columns(view["need_level"], pricing)["fee"]
+    fee_txt = fee.map(lambda v: "—" if pd.isna(v) else f"¥{int(v):,}（税別）")
+    company_cls = '<span class="company">' if role == "Admin" else '<span class="company blurred">'
+    company = company_cls + _esc(view["company_name"]) + "</span>"
+    headcount = view["headcount_needed"].fillna(0).astype(int).astype(str)
+    note = f'<div class="right-actions"><span class="fee">{ADMIN_NOTE}</span></div>' if role == "Admin" else ""
+
+    cards = (
+        '<div class="card"><div class="card-grid">'
+        # Left: Rank + fee
+        '<div><div class="rank">' + level + "</div>"
+        f'<div class="fee"><span class="label">{FEE_LABEL}</span><br/>' + fee_txt + "</div></div>"
+        # Middle: Company + meta（地域→業種→職種/人数）
+        '<div><div style="display:flex;align-items:center;gap:6px;margin-bottom:6px;">'
+        '<span class="badge">企業ランク ' + level + "</span>" + company + "</div>"
+        '<div class="meta"><span class="label">地域</span>' + _esc(view["region"]) + "</div>"
+        '<div class="meta"><span class="label">業種</span>' + _esc(view["industry"]) + "</div>"
+        '<div class="meta"><span class="label">職種/必要人数</span>'
+        + _esc(view["role"]) + " / " + headcount + "</div></div>"
+        # Right: Job description
+        '<div class="right-wrap"><div class="job"><span class="label">仕事内容</span><br>'
+        + _esc(view["requirements"]) + "</div>" + note + "</div>"
+        "</div></div>"
+    )
+    return cards.tolist()
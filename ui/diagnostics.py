@@ -0,0 +1,95 @@
+import pandas as pd
+import streamlit as st
+
+from data.profiling import Profiler
+
+
+def runs_frame(runs: list) -> pd.DataFrame:
+    return pd.DataFrame([
+        {
+            "開始": r["started_at"],
+            "ページ": r["page"],
+            "合計ms": r["total_ms"],
+            "SQL件数": len(r["queries"]),
+            "SQL合計ms": round(sum(q["ms"] for q in r["queries"]), 2),
+            "フェーズ": " / ".join(f"{name} {ms:,.1f}" for name, ms in r["phases"]),
+        }
+        for r in reversed(runs)
+    ])
+
+
+def phase_frame(runs: list) -> pd.DataFrame:
+    rows = [(name, ms) for r in runs for name, ms in r["phases"]]
+    if not rows:
+        return pd.DataFrame(columns=["フェーズ", "回数", "平均ms", "p95ms", "最大ms"])
+    df = pd.DataFrame(rows, columns=["フェーズ", "ms"])
+    out = df.groupby("フェーズ", sort=False)["ms"].agg(
+        回数="count", 平均ms="mean", p95ms=lambda s: s.quantile(0.95), 最大ms="max",
+    )
+    return out.round(2).reset_index()
+
+
+def query_frame(runs: list) -> pd.DataFrame:
+    rows = [(q["sql"], q["ms"], q["rows"]) for r in runs for q in r["queries"]]
+    if not rows:
+        return pd.DataFrame(columns=["SQL", "回数", "合計ms", "最大ms", "行数"])
+    df = pd.DataFrame(rows, columns=["SQL", "ms", "rows"])
+    out = df.groupby("SQL").agg(回数=("ms", "count"), 合計ms=("ms", "sum"), 最大ms=("ms", "max"), 行数=("rows", "sum"))
+    return out.round(2).sort_values("合計ms", ascending=False).reset_index()
+
+
+def slow_frame(slow: list) -> pd.DataFrame:
+    return pd.DataFrame([
+        {
+            "時刻": q.get("logged_at"),
+            "ページ": q.get("page", "-"),
+            "ms": q["ms"],
+            "行数": q["rows"],
+            "SQL": q["sql"],
+            "パラメータ": q["params"],
+            "実行計画": "\n".join(q["plan"] or []),
+        }
+        for q in reversed(slow)
+    ])
+
+
+def render_diagnostics(profiler: Profiler):
+    """Admin向けの診断パネル（再実行のフェーズ時間・SQL・スロークエリ）。"""
+    ss = st.session_state
+    c1, c2 = st.columns(2)
+    # 設定はプロセス共通なので、他のセッションの変更を上書きしないよう変更時だけ反映する
+    c1.toggle(
+        "計測を有効にする", value=profiler.enabled, key="diag_enabled",
+        on_change=lambda: setattr(profiler, "enabled", ss["diag_enabled"]),
+    )
+    c2.number_input(
+        "スロークエリの閾値（ms）", value=float(profiler.slow_ms), min_value=0.0, step=10.0, key="diag_slow_ms",
+        on_change=lambda: setattr(profiler, "slow_ms", float(ss["diag_slow_ms"])),
+    )
+
+    pages = profiler.pages()
+    if not pages:
+        st.info("計測データはまだありません。計測を有効にしてから画面を操作してください。")
+    else:
+        page = st.selectbox("ページ", pages)
+        runs = profiler.runs(page)
+        st.markdown(f"**直近の再実行**（{len(runs)}件）")
+        st.dataframe(runs_frame(runs), hide_index=True, use_container_width=True)
+        p1, p2 = st.columns(2)
+        p1.markdown("**フェーズ別**")
+        p1.dataframe(phase_frame(runs), hide_index=True, use_container_width=True)
+        p2.markdown("**SQL別**")
+        p2.dataframe(query_frame(runs), hide_index=True, use_container_width=True)
+
+    slow = profiler.slow_queries()
+    st.markdown(f"**スロークエリ**（{profiler.slow_ms:,.0f}ms 以上、{len(slow)}件）")
+    if slow:
+        st.dataframe(slow_frame(slow), hide_index=True, use_container_width=True)
+
+    d1, d2 = st.columns(2)
+    d1.download_button(
+        "JSON Lines で出力", profiler.to_jsonl(), file_name="haken_profile.jsonl", mime="application/x-ndjson",
+    )
+    if d2.button("計測データを消去"):
+        profiler.clear()
+        st.rerun()
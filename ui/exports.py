@@ -0,0 +1,52 @@
+import streamlit as st
+
+from data.export import FORMATS, ExportError, ExportSource, export_file
+
+# st.download_button はファイル全体をメモリに載せて配信するため、画面から渡す大きさに上限を設ける
+# （これを超える出力はコマンド python -m data.export で作る。出力自体はチャンク書き込みのまま）
+DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024
+
+
+def render_export(source: ExportSource, key: str, label: str = "ファイルに出力"):
+    """形式を選んでファイルを作り、できたものをダウンロードボタンで渡す。
+
+    作成は一時ファイルへのチャンク書き込みなので、件数が多くても画面側に全件を読み込まない。
+    ダウンロードボタンはファイル全体をメモリに載せるため、DOWNLOAD_MAX_BYTES を超えたら渡さない。
+    作成後に条件が変わった場合（source.key が違う）は古いファイルを出さない。
+    """
+    ss = st.session_state
+    with st.expander(label):
+        c1, c2, c3 = st.columns([2, 2, 1], vertical_alignment="bottom")
+        fmt = c1.selectbox("形式", list(FORMATS), format_func=FORMATS.get, key=f"{key}_fmt")
+        compress = c2.checkbox("gzip圧縮", key=f"{key}_gzip", disabled=fmt == "xlsx",
+                               help="CSVは .csv.gz、Parquetは列をgzipで圧縮します（Excelは元から圧縮済み）。")
+        if c3.button("作成", key=f"{key}_make", use_container_width=True):
+            try:
+                with st.spinner("ファイルを作成しています…"):
+                    ss[key] = export_file(source, fmt, compress and fmt != "xlsx")
+            except ExportError as e:
+                ss.pop(key, None)
+                st.warning(str(e))
+
+        result = ss.get(key)
+        if result is None or result.key != source.key:
+            return
+        caption = f"{result.rows:,}件 / {result.size / 1e6:,.1f}MB（作成 {result.seconds:,.1f}秒）"
+        if result.size > DOWNLOAD_MAX_BYTES:
+            st.warning(
+                f"{DOWNLOAD_MAX_BYTES // (1024 * 1024)}MBを超えるため画面からはダウンロードできません。"
+                "条件を絞るか、gzip圧縮・Parquet を選ぶか、コマンド `python -m data.export` で出力してください。"
+            )
+            st.caption(caption)
+            return
+        try:
+            with open(result.path, "rb") as fh:
+                st.download_button(
+                    f"{result.file_name} をダウンロード", fh, file_name=result.file_name, mime=result.mime,
+                    key=f"{key}_download",
+                )
+        except FileNotFoundError:
+            ss.pop(key, None)
+            st.info("ファイルの保存期限が切れました。もう一度作成してください。")
+            return
+        st.caption(caption)
@@ -0,0 +1,222 @@
+"""ページ共通の見た目（CSS・マスコット・ヒーロー）のHTML断片。
+
+どれも入力が同じなら結果も同じなので、プロセス内で1回だけ組み立てて使い回す。
+空白は詰めてから返す（再実行のたびにブラウザへ送る量を減らすため）。
+"""
+import re
+from functools import lru_cache
+
+BRAND_NAME = "Haken Connect"
+BRAND_COLOR = "#5EC2FE"        # Light Blue
+BRAND_COLOR_DARK = "#24a9f0"
+ACCENT_BG = "#F3FAFF"
+MUTED = "#6b7280"
+
+
+def _minify(markup: str) -> str:
+    markup = re.sub(r"<!--.*?-->|/\*.*?\*/", "", markup, flags=re.S)
+    markup = re.sub(r">\s+<", "><", markup)
+    return re.sub(r"\s+", " ", markup).strip()
+
+
+# =============================================================================
+# CSS (Theme + components + mascot)
+# =============================================================================
+@lru_cache(maxsize=None)
+def page_css() -> str:
+    return _minify(f"""
+<style>
+:root {{
+  --brand: {BRAND_COLOR};
+  --brand-dark: {BRAND_COLOR_DARK};
+  --muted: {MUTED};
+}}
+.main .block-container {{
+  padding-top: 0.8rem;
+  padding-bottom: 3rem;
+}}
+body {{
+  background: linear-gradient(180deg, rgba(94,194,254,0.10), rgba(94,194,254,0.02));
+}}
+.brand-hero {{
+  position: relative;
+  padding: 20px 24px 16px 24px;
+  border-radius: 18px;
+  background: radial-gradient(1200px 300px at 20% -10%, rgba(94,194,254,0.35), transparent),
+              linear-gradient(180deg, #fff, #fff);
+  border: 1px solid #e9eef5;
+  box-shadow: 0 6px 24px rgba(21,126,179,0.08);
+  margin-bottom: 14px;
+}}
+.brand-row {{ display:flex; align-items:center; gap:14px; flex-wrap:wrap; }}
+.brand-badge {{
+  display:flex; align-items:center; gap:10px;
+  padding:10px 14px; border-radius: 999px;
+  background: {ACCENT_BG}; border: 1px solid rgba(94,194,254,0.25);
+  font-weight:700; color:#0f172a;
+}}
+.brand-badge .dot {{
+  width:10px; height:10px; border-radius:999px; background:{BRAND_COLOR};
+  box-shadow: 0 0 0 3px rgba(94,194,254,0.25);
+}}
+.brand-sub {{ color:#334155; font-size:13px; margin-left:2px; }}
+.brand-wave {{ position:absolute; inset:auto 0 0 0; height:52px; overflow:hidden; }}
+.brand-wave svg {{ display:block; width:100%; height:100%; }}
+.card {{padding:14px 16px; border:1px solid #e9ecef; border-radius:14px; margin-bottom:12px; background:#fff;}}
+.card-grid {{display:grid; grid-template-columns: 1fr 3.5fr 3.5fr; gap:16px;}}
+.rank {{font-size:44px; font-weight:800; letter-spacing:1px; line-height:1; margin:2px 0 8px 0; color:#0f172a;}}
+.fee {{font-size:12px; color:var(--muted); margin-top:2px;}}
+.label {{font-size:12px; color:#6c757d; margin-right:6px;}}
+.meta {{font-size:14px; color:#111; margin-bottom:6px;}}
+.company {{font-size:20px; font-weight:700; margin-left:8px; color:#0f172a;}}
+.blurred {{filter: blur(8px); text-shadow: 0 0 12px rgba(0,0,0,0.25); user-select:none;}}
+.right-wrap {{display:flex; flex-direction:column; height:100%;}}
+.job {{flex:1 1 auto; white-space:pre-wrap;}}
+.right-actions {{flex:0 0 auto; text-align:right; margin-top:12px;}}
+.badge {{
+  display:inline-block; padding:2px 10px; font-size:12px; border-radius:999px;
+  background: {ACCENT_BG}; color:#0f172a; border:1px solid rgba(94,194,254,0.28);
+}}
+.stTabs [role="tablist"] button[role="tab"] {{
+  border-radius: 10px 10px 0 0 !important;
+  background: #ffffffaa;
+  border: 1px solid #e9eef5; margin-right: 6px;
+}}
+.stTabs [role="tablist"] button[aria-selected="true"] {{
+  border-bottom-color: #ffffff;
+  color:#0f172a; box-shadow: 0 -2px 0 var(--brand) inset;
+}}
+.stButton>button {{
+  border-radius: 10px; border:1px solid var(--brand);
+  background: var(--brand); color:#fff; font-weight:700; padding: 8px 14px;
+  box-shadow: 0 6px 16px rgba(94,194,254,0.35);
+}}
+.stButton>button:hover {{ background: var(--brand-dark); border-color: var(--brand-dark); }}
+.sidebar .sidebar-content, section[data-testid="stSidebar"]>div {{
+  background: linear-gradient(180deg, #ffffff, #f9fcff);
+  border-right: 1px solid #e9eef5;
+}}
+.hc-mascot-wrap{{
+  position: fixed;
+  top: 14px;
+  right: 18px;
+  width: clamp(110px, 15vw, 180px);
+  z-index: 9999;
+  user-select: none;
+  pointer-events: none;
+  filter: drop-shadow(0 8px 22px rgba(30,144,255,.35));
+  animation: hc-float 4s ease-in-out infinite;
+}}
+.hc-mascot-wrap svg{{
+  width: 100%;
+  height: auto;
+  display: block;
+  shape-rendering: geometricPrecision;
+  text-rendering: geometricPrecision;
+  image-rendering: optimizeQuality;
+}}
+@keyframes hc-float{{
+  0%{{ transform: translateY(0) }}
+  50%{{ transform: translateY(-6px) }}
+  100%{{ transform: translateY(0) }}
+}}
+.hc-mascot-tip{{
+  position: fixed;
+  top: calc(14px + clamp(110px, 15vw, 180px) + 8px);
+  right: 22px;
+  background: #fff;
+  border: 1px solid #e6f3ff;
+  padding: 6px 10px;
+  border-radius: 10px;
+  font-size: 12px;
+  color: #0f172a;
+  box-shadow: 0 8px 18px rgba(94,194,254,.18);
+}}
+.hc-mascot-tip b{{ color:#1377c8; }}
+</style>
+""")
+
+
+# =============================================================================
+# Mascot
+# =============================================================================
+@lru_cache(maxsize=None)
+def mascot_svg(fill: str = BRAND_COLOR) -> str:
+    return _minify(f"""
+<svg viewBox="0 0 512 512" xmlns="http://www.w3.org/2000/svg"
+     aria-label="Haken Connect Mascot" role="img">
+  <!-- Body -->
+  <path d="M170 180c0-46 36-84 82-84s82 38 82 84v18c28 10 44 34 44 61
+           0 38-35 68-90 68h-72c-55 0-90-30-90-68 0-29 18-54 48-62v-17z"
+        fill="{fill}"/>
+  <!-- Belly -->
+  <ellipse cx="252" cy="274" rx="66" ry="56" fill="#fff" fill-opacity=".92"/>
+  <!-- Muzzle -->
+  <ellipse cx="252" cy="206" rx="34" ry="24" fill="#fff"/>
+  <!-- Nose & Eyes -->
+  <circle cx="268" cy="206" r="5" fill="#0f172a"/>
+  <circle cx="230" cy="186" r="6" fill="#0f172a"/>
+  <circle cx="286" cy="186" r="6" fill="#0f172a"/>
+  <path d="M238 212c8 8 20 8 28 0" stroke="#0f172a" stroke-width="3" stroke-linecap="round"/>
+  <!-- Ears -->
+  <path d="M198 138c-12-10-30-12-44-4 6 18 23 28 40 26l4-22z" fill="{fill}"/>
+  <path d="M306 138c12-10 30-12 44-4-6 18-23 28-40 26l-4-22z" fill="{fill}"/>
+  <!-- Arms & Legs -->
+  <path d="M166 258c-18 10-32 22-42 36 13-8 29-14 46-18l-4-8z" fill="{fill}"/>
+  <path d="M338 258c18 10 32 22 42 36-13-8-29-14-46-18l4-8z" fill="{fill}"/>
+  <path d="M206 354c-2 22-8 44-18 64 10-12 19-27 25-43l-7-21z" fill="{fill}"/>
+  <path d="M298 354c2 22 8 44 18 64-10-12-19-27-25-43l7-21z" fill="{fill}"/>
+  <!-- Magnifying glass (right hand) -->
+  <g transform="translate(332,236) rotate(20)">
+    <circle cx="44" cy="44" r="36" fill="#fff" stroke="#0f172a" stroke-width="6"/>
+    <circle cx="44" cy="44" r="18" fill="{fill}" fill-opacity=".35"/>
+    <rect x="38" y="76" width="12" height="34" rx="6" fill="#0f172a"/>
+  </g>
+  <!-- Friendly cheek -->
+  <circle cx="214" cy="196" r="7" fill="#FDB4C8" fill-opacity=".9"/>
+  <!-- Line accents -->
+  <path d="M170 198v-18" stroke="{fill}" stroke-width="6" stroke-linecap="round"/>
+  <path d="M334 198v-18" stroke="{fill}" stroke-width="6" stroke-linecap="round"/>
+</svg>
+""")
+
+
+@lru_cache(maxsize=None)
+def mascot_html(show_tip: bool = True, color: str = BRAND_COLOR, size_css: str = None) -> str:
+    wrap_style = f'style="{size_css}"' if size_css else ""
+    html = f'<div class="hc-mascot-wrap" {wrap_style}>{mascot_svg(color)}</div>'
+    if show_tip:
+        html += f'<div class="hc-mascot-tip">🔎 <b>{BRAND_NAME}</b> で発見！</div>'
+    return html
+
+
+# =============================================================================
+# Brand hero
+# =============================================================================
+@lru_cache(maxsize=None)
+def hero_html() -> str:
+    return _minify(f"""
+<div class="brand-hero">
+  <div class="brand-row">
+    <div class="brand-badge"><span class="dot"></span> {BRAND_NAME}</div>
+    <div class="brand-sub">社内β / 企業ランクと要件でスマートにアプローチ</div>
+  </div>
+  <div class="brand-wave">
+    <svg viewBox="0 0 1440 140" preserveAspectRatio="none" xmlns="http://www.w3.org/2000/svg">
+      <defs>
+        <linearGradient id="g1" x1="0" x2="0" y1="0" y2="1">
+          <stop offset="0%" stop-color="{BRAND_COLOR}" stop-opacity="0.35"/>
+          <stop offset="100%" stop-color="{BRAND_COLOR}" stop-opacity="0"/>
+        </linearGradient>
+      </defs>
+      <path d="M0,60 C240,140 420,0 720,60 C1020,120 1200,40 1440,90 L1440,140 L0,140 Z" fill="url(#g1)"/>
+    </svg>
+  </div>
+</div>
+""")
+
+
+@lru_cache(maxsize=None)
+def chrome_html(show_tip: bool = True) -> str:
+    """トップページの固定部分（CSS＋ヒーロー＋マスコット）を1つの要素にまとめたもの。"""
+    return page_css() + hero_html() + mascot_html(show_tip)